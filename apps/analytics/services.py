@@ -35,6 +35,27 @@ class AnalyticsService(BaseService):
         # Обновляем метрики в реальном времени
         self.update_realtime_metrics('reservations_created', 1)
 
+    def track_reservations_created(self, reservations):
+        """Отслеживание создания нескольких броней одной вставкой"""
+        if not reservations:
+            return
+
+        ConversionEvent.objects.using('analytics').bulk_create([
+            ConversionEvent(
+                event_type='reservation_created',
+                reservation_id=reservation.id,
+                user_id=reservation.user_id,
+                metadata={
+                    'product_id': reservation.product_id,
+                    'quantity': reservation.quantity,
+                    'total_price': float(reservation.total_price),
+                }
+            )
+            for reservation in reservations
+        ])
+
+        self.update_realtime_metrics('reservations_created', len(reservations))
+
     def track_reservation_confirmed(self, reservation):
         """Отслеживание подтверждения бронирования"""
         self._create_conversion_event(
@@ -51,6 +72,29 @@ class AnalyticsService(BaseService):
         self.update_realtime_metrics('reservations_confirmed', 1)
         self.update_realtime_metrics('revenue', float(reservation.total_price))
 
+    def track_reservations_confirmed(self, reservations):
+        """Отслеживание подтверждения нескольких броней одной вставкой"""
+        if not reservations:
+            return
+
+        ConversionEvent.objects.using('analytics').bulk_create([
+            ConversionEvent(
+                event_type='reservation_confirmed',
+                reservation_id=reservation.id,
+                user_id=reservation.user_id,
+                metadata={
+                    'product_id': reservation.product_id,
+                    'total_price': float(reservation.total_price),
+                }
+            )
+            for reservation in reservations
+        ])
+
+        self.update_realtime_metrics('reservations_confirmed', len(reservations))
+        self.update_realtime_metrics(
+            'revenue', sum(float(reservation.total_price) for reservation in reservations)
+        )
+
     def track_reservation_cancelled(self, reservation):
         """Отслеживание отмены бронирования"""
         self._create_conversion_event(
@@ -65,6 +109,46 @@ class AnalyticsService(BaseService):
 
         self.update_realtime_metrics('reservations_cancelled', 1)
 
+    def track_reservations_cancelled(self, reservations):
+        """Отслеживание отмены нескольких броней одной вставкой"""
+        if not reservations:
+            return
+
+        ConversionEvent.objects.using('analytics').bulk_create([
+            ConversionEvent(
+                event_type='reservation_cancelled',
+                reservation_id=reservation.id,
+                user_id=reservation.user_id,
+                metadata={
+                    'product_id': reservation.product_id,
+                    'reason': 'user_cancelled',
+                }
+            )
+            for reservation in reservations
+        ])
+
+        self.update_realtime_metrics('reservations_cancelled', len(reservations))
+
+    def track_reservations_expired(self, reservations):
+        """Отслеживание истечения нескольких броней одной вставкой"""
+        if not reservations:
+            return
+
+        ConversionEvent.objects.using('analytics').bulk_create([
+            ConversionEvent(
+                event_type='reservation_cancelled',
+                reservation_id=reservation.id,
+                user_id=reservation.user_id,
+                metadata={
+                    'product_id': reservation.product_id,
+                    'reason': 'expired',
+                }
+            )
+            for reservation in reservations
+        ])
+
+        self.update_realtime_metrics('reservations_cancelled', len(reservations))
+
     def track_page_view(self, path: str, user_id: Optional[int] = None,
                         session_id: Optional[str] = None, timestamp: Optional[str] = None):
         """Отслеживание просмотров страниц"""
@@ -0,0 +1,92 @@
+"""
+Диспетчер доменных событий.
+
+Сервисы и сигналы не вызывают уведомления и аналитику напрямую, а
+публикуют доменное событие через dispatcher.emit(). Внутри единицы
+работы (dispatcher.unit_of_work()) события копятся и схлопываются по
+ключу (идентификатор агрегата, тип события), поэтому одно и то же
+изменение, пришедшее и из сервиса, и из post_save, обрабатывается
+один раз. Обработчики с after_commit=False (запись в outbox)
+выполняются в конце транзакции, остальные (аналитика) - после commit.
+"""
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+import threading
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class EventDispatcher:
+    """Сбор, дедупликация и рассылка доменных событий"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Tuple[Callable[[Any], None], bool]]] = defaultdict(list)
+        self._local = threading.local()
+
+    def register(self, event_type: str, handler: Callable[[Any], None], after_commit: bool = False):
+        """Регистрация обработчика события"""
+        self._handlers[event_type].append((handler, after_commit))
+
+    def on(self, event_type: str, after_commit: bool = False):
+        """Декоратор для регистрации обработчика"""
+        def decorator(handler):
+            self.register(event_type, handler, after_commit)
+            return handler
+        return decorator
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Транзакция, в которой события копятся и рассылаются один раз.
+
+        Вложенные единицы работы присоединяются к внешней.
+        """
+        if getattr(self._local, 'pending', None) is not None:
+            with transaction.atomic():
+                yield
+            return
+
+        self._local.pending = {}
+        try:
+            with transaction.atomic():
+                yield
+                pending, self._local.pending = self._local.pending, None
+                for event_type, payload in pending.values():
+                    self._dispatch(event_type, payload)
+        finally:
+            self._local.pending = None
+
+    def emit(self, event_type: str, payload: Any, aggregate_id: Any = None):
+        """
+        Публикация события.
+
+        Вне единицы работы событие рассылается сразу (обработчики
+        after_commit - после фиксации текущей транзакции).
+        """
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            self._dispatch(event_type, payload)
+            return
+
+        if aggregate_id is None:
+            aggregate_id = self._aggregate_id(payload)
+        pending.setdefault((aggregate_id, event_type), (event_type, payload))
+
+    def _aggregate_id(self, payload: Any):
+        if isinstance(payload, (list, tuple)):
+            return tuple(str(obj.pk) for obj in payload)
+        return str(payload.pk)
+
+    def _dispatch(self, event_type: str, payload: Any):
+        for handler, after_commit in self._handlers.get(event_type, []):
+            if after_commit:
+                transaction.on_commit(lambda h=handler: h(payload), robust=True)
+            else:
+                handler(payload)
+
+
+dispatcher = EventDispatcher()
@@ -35,6 +35,16 @@ class ReservationExpiredError(BaseBusinessException):
     default_code = "reservation_expired"
 
 
+class AdmissionQueuedError(BaseBusinessException):
+    """Запрос на бронь не допущен, клиент поставлен в очередь"""
+    default_message = "Слишком много запросов на этот товар, вы в очереди"
+    default_code = "admission_queued"
+
+    def __init__(self, message=None, code=None, position=None):
+        super().__init__(message, code)
+        self.position = position
+
+
 class ReservationLimitExceededError(BaseBusinessException):
     """Превышен лимит бронирований"""
     default_message = "Превышен лимит активных бронирований"
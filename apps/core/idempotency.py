@@ -0,0 +1,92 @@
+"""
+Поддержка заголовка Idempotency-Key для изменяющих операций API.
+
+Первый ответ на запрос с ключом сохраняется в кеше (Redis) на
+IDEMPOTENCY_KEY_TTL_SECONDS. Повтор с тем же ключом возвращает
+сохраненный ответ без обращения к БД, а параллельный дубль ждет
+завершения первого запроса не дольше IDEMPOTENCY_WAIT_SECONDS.
+"""
+from functools import wraps
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def idempotent(view_method):
+    """Декоратор действия ViewSet, учитывающий Idempotency-Key"""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(idempotency_key) > 255:
+            return Response(
+                {'error': 'Слишком длинный Idempotency-Key', 'code': 'invalid_idempotency_key'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache_key = f"idempotency:{request.user.pk}:{request.method}:{request.path}:{idempotency_key}"
+        lock_key = f"{cache_key}:lock"
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is None:
+            if cache.add(lock_key, 1, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS):
+                try:
+                    response = view_method(self, request, *args, **kwargs)
+                    # Ошибки сервера и 429 не сохраняем - клиент может повторить
+                    if response.status_code < 500 and response.status_code != 429:
+                        cache.set(cache_key, {
+                            'fingerprint': fingerprint,
+                            'status': response.status_code,
+                            'data': response.data,
+                        }, timeout=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+                    return response
+                finally:
+                    cache.delete(lock_key)
+
+            stored = _wait_for_result(cache_key, lock_key)
+            if stored is None:
+                return Response(
+                    {'error': 'Запрос с этим ключом еще выполняется', 'code': 'idempotency_in_progress'},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+        if stored['fingerprint'] != fingerprint:
+            return Response(
+                {'error': 'Idempotency-Key уже использован с другим запросом', 'code': 'idempotency_key_reused'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+
+        return Response(stored['data'], status=stored['status'], headers={REPLAYED_HEADER: 'true'})
+
+    return wrapper
+
+
+def _fingerprint(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def _wait_for_result(cache_key: str, lock_key: str):
+    """Ожидание результата параллельного запроса с тем же ключом"""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return stored
+        if not cache.get(lock_key):
+            # Первый запрос завершился без сохраненного ответа
+            return None
+        time.sleep(0.05)
+    return None
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from apps.reservations.archive import ReservationArchiveService
+
+
+class Command(BaseCommand):
+    help = 'Move old confirmed/cancelled/expired reservations to compressed archive segments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Archive reservations created more than this many days ago'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Reservations per archive segment'
+        )
+
+    def handle(self, *args, **options):
+        count = ReservationArchiveService().archive(options['days'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {count} reservations'))
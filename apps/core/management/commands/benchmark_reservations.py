@@ -0,0 +1,112 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.reservations.benchmark import FlashSaleBenchmark, OPERATIONS
+
+
+class Command(BaseCommand):
+    help = 'Run a flash-sale contention benchmark against ReservationService on the local database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Number of concurrent workers')
+        parser.add_argument(
+            '--mode',
+            choices=['thread', 'process'],
+            help='Run workers as threads or forked processes'
+        )
+        parser.add_argument('--operations', type=int, help='Operations per worker')
+        parser.add_argument('--duration', type=float, help='Stop after this many seconds')
+        parser.add_argument('--users', type=int, help='Number of benchmark users')
+        parser.add_argument('--hot-products', type=int, help='Number of hot products')
+        parser.add_argument('--cold-products', type=int, help='Number of cold products')
+        parser.add_argument('--hot-stock', type=int, help='Initial stock of each hot product')
+        parser.add_argument('--cold-stock', type=int, help='Initial stock of each cold product')
+        parser.add_argument('--hot-ratio', type=float, help='Share of reservations that target hot products')
+        parser.add_argument('--quantity', type=int, help='Quantity per reservation')
+        parser.add_argument(
+            '--mix',
+            help='Operation weights, e.g. create=70,confirm=20,cancel=10'
+        )
+        parser.add_argument('--seed', type=int, help='Random seed')
+        parser.add_argument(
+            '--admission',
+            action='store_true',
+            help='Create reservations through admission control, as the API does'
+        )
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--keep', action='store_true', help='Keep benchmark data after the run')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Run even when DEBUG is off (writes benchmark rows to the database)'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Benchmark writes to the database; use --force when DEBUG is off')
+
+        benchmark = FlashSaleBenchmark(
+            workers=options['workers'],
+            mode=options['mode'],
+            operations=options['operations'],
+            duration=options['duration'],
+            users=options['users'],
+            hot_products=options['hot_products'],
+            cold_products=options['cold_products'],
+            hot_stock=options['hot_stock'],
+            cold_stock=options['cold_stock'],
+            hot_ratio=options['hot_ratio'],
+            quantity=options['quantity'],
+            mix=self._parse_mix(options['mix']) if options['mix'] else None,
+            seed=options['seed'],
+            admission=options['admission'],
+        )
+
+        try:
+            benchmark.setup()
+            report = benchmark.run()
+        finally:
+            if not options['keep']:
+                benchmark.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._write_report(report)
+
+        if report['oversold']:
+            raise CommandError(f"Oversell detected for {len(report['oversold'])} products")
+
+    def _parse_mix(self, value):
+        try:
+            mix = {name: float(weight) for name, weight in (part.split('=') for part in value.split(','))}
+        except ValueError:
+            raise CommandError(f'Invalid --mix value: {value}')
+        unknown = set(mix) - set(OPERATIONS)
+        if unknown:
+            raise CommandError(f'Unknown operations in --mix: {", ".join(sorted(unknown))}')
+        return {operation: mix.get(operation, 0) for operation in OPERATIONS}
+
+    def _write_report(self, report):
+        self.stdout.write(
+            f"Run {report['run_id']}: {report['workers']} {report['mode']} workers, "
+            f"{report['elapsed_seconds']}s"
+        )
+        for operation, stats in report['operations'].items():
+            outcomes = ', '.join(f'{name}={count}' for name, count in sorted(stats['outcomes'].items()))
+            self.stdout.write(
+                f"  {operation:<8} count={stats['count']:<6} p50={stats['p50_ms']}ms "
+                f"p99={stats['p99_ms']}ms  {outcomes}"
+            )
+        self.stdout.write(
+            f"Throughput: {report['throughput']} ops/s (p50={report['p50_ms']}ms, p99={report['p99_ms']}ms)"
+        )
+        self.stdout.write(
+            f"Lock wait: ~{report['lock_wait_seconds']}s (max {report['max_lock_waiters']} waiting sessions)"
+        )
+        self.stdout.write(f"Deadlocks: {report['deadlocks']}")
+        self.stdout.write(f"Stock drift: {len(report['stock_drift'])} products")
+
+        style = self.style.ERROR if report['oversold'] else self.style.SUCCESS
+        self.stdout.write(style(f"Oversold products: {len(report['oversold'])}"))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+import time
+import logging
+from apps.reservations.scheduler import ReservationExpiryScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Start reservation expiry worker driven by Redis sorted set'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.RESERVATION_EXPIRY_POLL_SECONDS,
+            help='Polling interval in seconds'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RESERVATION_EXPIRY_CHUNK_SIZE,
+            help='Maximum number of reservations expired per iteration'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        batch_size = options['batch_size']
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Starting reservation expiry worker (interval: {interval}s)')
+        )
+
+        scheduler = ReservationExpiryScheduler()
+
+        try:
+            while True:
+                try:
+                    expired = scheduler.run_once(batch_size)
+                except Exception as e:
+                    logger.error(f"Error expiring scheduled reservations: {e}")
+                    expired = 0
+
+                if expired:
+                    logger.info(f"Expired {expired} scheduled reservations")
+
+                # Полная пачка - сразу забираем следующую
+                if expired < batch_size:
+                    time.sleep(interval)
+
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Reservation expiry worker stopped'))
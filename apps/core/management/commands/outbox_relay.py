@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+import time
+import logging
+from apps.notifications.outbox import OutboxRelay
+from apps.notifications.producer import close_producer
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Start outbox relay publishing domain events to Kafka'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.OUTBOX_RELAY_POLL_SECONDS,
+            help='Polling interval in seconds when outbox is empty'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_RELAY_BATCH_SIZE,
+            help='Maximum number of events published per batch'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        batch_size = options['batch_size']
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Starting outbox relay (batch size: {batch_size})')
+        )
+
+        relay = OutboxRelay()
+
+        try:
+            while True:
+                try:
+                    published = relay.relay_batch(batch_size)
+                except Exception as e:
+                    logger.error(f"Error relaying outbox events: {e}")
+                    published = 0
+
+                # Полная пачка - сразу забираем следующую
+                if published < batch_size:
+                    time.sleep(interval)
+
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Outbox relay stopped'))
+        finally:
+            close_producer()
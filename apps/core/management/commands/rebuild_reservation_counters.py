@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.reservations.counters import ReservationCounterService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user reservation counters from the reservations table'
+
+    def handle(self, *args, **options):
+        count = ReservationCounterService().rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt reservation counters for {count} users')
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.reservations.stats import ReservationStatsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily reservation statistics buckets from the reservations table'
+
+    def handle(self, *args, **options):
+        count = ReservationStatsService().rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} reservation stats buckets')
+        )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+import time
+import logging
+from apps.reservations.group_commit import ReservationGroupCommitService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Start worker that applies queued async reservation requests in per-product batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.RESERVATION_GROUP_COMMIT_INTERVAL_MS,
+            help='Polling interval in milliseconds'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RESERVATION_GROUP_COMMIT_BATCH_SIZE,
+            help='Maximum number of requests applied per product in one transaction'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        batch_size = options['batch_size']
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Starting reservation group commit worker (interval: {interval}ms)')
+        )
+
+        service = ReservationGroupCommitService()
+
+        try:
+            while True:
+                try:
+                    processed = service.run_once(batch_size)
+                except Exception as e:
+                    logger.error(f"Error applying queued reservation requests: {e}")
+                    processed = 0
+
+                if processed:
+                    logger.info(f"Applied {processed} queued reservation requests")
+                else:
+                    # Очереди пусты - ждем, пока накопятся заявки
+                    time.sleep(interval / 1000)
+
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Reservation group commit worker stopped'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from apps.reservations.partitions import ReservationPartitionService
+
+
+class Command(BaseCommand):
+    help = 'Manage monthly partitions of the reservations table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Convert the reservations table to a partitioned one (run once)'
+        )
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=None,
+            help='Number of future monthly partitions to pre-create'
+        )
+        parser.add_argument(
+            '--retention',
+            type=int,
+            default=None,
+            help='Detach partitions older than this many months'
+        )
+        parser.add_argument(
+            '--no-detach',
+            action='store_true',
+            help='Only create partitions, do not detach old ones'
+        )
+
+    def handle(self, *args, **options):
+        service = ReservationPartitionService()
+
+        if options['convert']:
+            service.convert()
+            self.stdout.write(self.style.SUCCESS('Reservations table converted to monthly partitions'))
+        elif not service.is_partitioned():
+            self.stdout.write(self.style.WARNING('Reservations table is not partitioned, use --convert'))
+            return
+
+        created = service.ensure_partitions(options['ahead'])
+        detached = [] if options['no_detach'] else service.detach_old(options['retention'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Partitions created: {len(created)}, detached: {", ".join(detached) or "none"}'
+            )
+        )
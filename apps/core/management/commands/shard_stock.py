@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from apps.products.services import ProductService
+
+
+class Command(BaseCommand):
+    help = 'Split stock of a hot product into N slot rows (0 or 1 to merge back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_id', type=int, help='Product ID')
+        parser.add_argument(
+            '--slots',
+            type=int,
+            default=8,
+            help='Number of stock slots'
+        )
+
+    def handle(self, *args, **options):
+        stock = ProductService().shard_stock(options['product_id'], options['slots'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Product {stock.product_id} stock uses {stock.slot_count or "no"} slots'
+            )
+        )
@@ -1,3 +1,61 @@
 from django.db import models
 
-# Create your models here.
+
+class ChangeTrackingMixin:
+    """
+    Отслеживание изменений полей модели без повторного чтения из БД.
+
+    Значения полей из tracked_fields (attname, например 'status' или
+    'product_id') запоминаются при загрузке экземпляра (from_db) и после
+    каждого save(). Обработчики сигналов узнают прежнее значение через
+    previous_value()/has_changed() вместо SELECT по первичному ключу.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self, fields=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name in self.tracked_fields if fields is None else fields:
+            # Отложенные (deferred) поля не загружены и не отслеживаются
+            if name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+
+    def previous_value(self, field: str):
+        """Значение поля на момент загрузки или последнего сохранения"""
+        return self.__dict__.get('_loaded_values', {}).get(field)
+
+    def has_changed(self, field: str) -> bool:
+        """Изменилось ли поле; для несохраненного экземпляра - всегда True"""
+        loaded = self.__dict__.get('_loaded_values', {})
+        if field not in loaded:
+            return True
+        return loaded[field] != getattr(self, field)
+
+    @property
+    def changed_fields(self):
+        """{поле: (прежнее значение, текущее значение)} для измененных полей"""
+        return {
+            name: (self.previous_value(name), getattr(self, name))
+            for name in self.tracked_fields
+            if self.has_changed(name)
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = [
+                self._meta.get_field(name).attname for name in update_fields
+                if self._meta.get_field(name).attname in self.tracked_fields
+            ]
+        self._snapshot_tracked_fields(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_tracked_fields()
@@ -1,6 +1,14 @@
-from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination, LimitOffsetPagination
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from django.db.models import Q
 from collections import OrderedDict
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+import base64
+import binascii
+import json
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -32,13 +40,13 @@ class StandardResultsSetPagination(PageNumberPagination):
         if not self.page.has_previous():
             return None
         url = self.request.build_absolute_uri()
-        return self.replace_query_param(url, self.page_query_param, 1)
+        return replace_query_param(url, self.page_query_param, 1)
 
     def get_last_link(self):
         if not self.page.has_next():
             return None
         url = self.request.build_absolute_uri()
-        return self.replace_query_param(
+        return replace_query_param(
             url,
             self.page_query_param,
             self.page.paginator.num_pages
@@ -56,4 +64,157 @@ class SmallResultsSetPagination(PageNumberPagination):
     """Пагинация для маленьких наборов данных"""
     page_size = 10
     page_size_query_param = 'page_size'
-    max_page_size = 50
\ No newline at end of file
+    max_page_size = 50
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по (-created_at, id).
+
+    Страница выбирается условием на ключ последней строки предыдущей
+    страницы, а не OFFSET, и без COUNT(*), поэтому глубокие страницы
+    стоят как первая. Курсоры непрозрачные, общего числа строк нет.
+    Включается параметром cursor (пустое значение - первая страница)
+    в видах, которые ее поддерживают. Порядок фиксирован: запрос
+    с ordering отклоняется.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering = ('-created_at', 'id')
+    invalid_cursor_message = 'Неверный курсор'
+    ordering_not_supported_message = 'Параметр ordering не поддерживается вместе с cursor'
+
+    @classmethod
+    def is_requested(cls, request) -> bool:
+        return cls.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.ordering_query_param):
+            raise ValidationError({self.ordering_query_param: self.ordering_not_supported_message})
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+        ordering = [self._invert(field) for field in self.ordering] if reverse else self.ordering
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('links', OrderedDict([
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+            ])),
+            ('pagination', OrderedDict([
+                ('page_size', self.page_size),
+                ('has_next', self.has_next),
+                ('has_previous', self.has_previous),
+            ])),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'links': {
+                    'type': 'object',
+                    'properties': {
+                        'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                        'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                    },
+                },
+                'pagination': {
+                    'type': 'object',
+                    'properties': {
+                        'page_size': {'type': 'integer'},
+                        'has_next': {'type': 'boolean'},
+                        'has_previous': {'type': 'boolean'},
+                    },
+                },
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self._position(self.page[0]), reverse=True)
+
+    def decode_cursor(self, request) -> Tuple[Optional[List[str]], bool]:
+        """Позиция и направление из параметра cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(encoded + padding))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position: List[str], reverse: bool) -> str:
+        payload = {'p': position, 'r': 1} if reverse else {'p': position}
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        return encoded.decode().rstrip('=')
+
+    def _link(self, position: List[str], reverse: bool) -> str:
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def _position(self, item: Any) -> List[str]:
+        values = [getattr(item, field.lstrip('-')) for field in self.ordering]
+        return [value.isoformat() if isinstance(value, datetime) else str(value) for value in values]
+
+    def _invert(self, field: str) -> str:
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _after(self, position: List[str], reverse: bool) -> Q:
+        """
+        Условие "строго после позиции" в порядке сортировки.
+
+        Отдельное нестрогое условие на первое поле позволяет Postgres
+        читать индекс диапазоном, а не разбирать OR целиком.
+        """
+        ordering = [self._invert(field) for field in self.ordering] if reverse else list(self.ordering)
+        lookups = [
+            (field.lstrip('-'), 'lt' if field.startswith('-') else 'gt', value)
+            for field, value in zip(ordering, position)
+        ]
+
+        condition = Q()
+        for index, (name, lookup, value) in enumerate(lookups):
+            equal = {prefix_name: prefix_value for prefix_name, _, prefix_value in lookups[:index]}
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+
+        first_name, first_lookup, first_value = lookups[0]
+        return Q(**{f'{first_name}__{first_lookup}e': first_value}) & condition
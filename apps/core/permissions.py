@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import permissions
 from rest_framework.permissions import BasePermission
 
@@ -51,14 +52,11 @@ class CanCreateReservation(BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
 
-        # Проверяем лимиты пользователя
+        # Проверяем лимиты пользователя по счетчикам (Redis, без COUNT)
         if view.action == 'create':
-            from apps.reservations.models import Reservation, ReservationStatus
-            active_count = Reservation.objects.filter(
-                user=request.user,
-                status=ReservationStatus.PENDING
-            ).count()
+            from apps.reservations.counters import ReservationCounterService
+            counters = ReservationCounterService().get(request.user.id)
 
-            return active_count < 5  # MAX_RESERVATION_PER_USER
+            return counters['pending'] < settings.MAX_RESERVATION_PER_USER
 
         return True
\ No newline at end of file
@@ -12,6 +12,18 @@ class BaseViewSet(ModelViewSet):
     """Базовый ViewSet с общей функциональностью"""
 
     pagination_class = StandardResultsSetPagination
+    # Курсорная пагинация, включаемая параметром запроса (см. KeysetPagination)
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator')
+            and self.keyset_pagination_class is not None
+            and self.keyset_pagination_class.is_requested(self.request)
+        ):
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
 
     def handle_exception(self, exc):
         """Обработка исключений"""
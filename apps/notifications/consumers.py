@@ -2,7 +2,7 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from apps.reservations.models import Reservation
+from apps.reservations.models import Reservation, WaitlistEntry
 from apps.notifications.tasks import send_email_notification, send_sms_notification
 import logging
 
@@ -21,9 +21,13 @@ class ReservationEventConsumer:
 
         handler_map = {
             'reservation_created': self.handle_reservation_created,
+            'reservation_batch_created': self.handle_reservation_batch_created,
             'reservation_confirmed': self.handle_reservation_confirmed,
             'reservation_cancelled': self.handle_reservation_cancelled,
+            'reservation_reduced': self.handle_reservation_reduced,
             'reservation_expired': self.handle_reservation_expired,
+            'waitlist_allocated': self.handle_waitlist_allocated,
+            'reservation_reminder': self.handle_reservation_reminder,
         }
 
         handler = handler_map.get(event_type)
@@ -47,6 +51,10 @@ class ReservationEventConsumer:
                 id=reservation_id
             )
 
+            # Бронь из очереди ожидания - письмо отправит handle_waitlist_allocated
+            if WaitlistEntry.objects.filter(reservation_id=reservation.id).exists():
+                return
+
             # Отправляем email подтверждение
             send_email_notification.delay(
                 to_email=reservation.user.email,
@@ -64,21 +72,42 @@ class ReservationEventConsumer:
                 }
             )
 
-            # Планируем напоминание за 5 минут до истечения
-            from apps.reservations.tasks import send_reservation_reminder
-            from datetime import timedelta
-            from django.utils import timezone
-
-            reminder_time = reservation.expires_at - timedelta(minutes=5)
-            if reminder_time > timezone.now():
-                send_reservation_reminder.apply_async(
-                    args=[str(reservation.id)],
-                    eta=reminder_time
-                )
-
         except Reservation.DoesNotExist:
             logger.error(f"Reservation {reservation_id} not found for created event")
 
+    def handle_reservation_batch_created(self, data):
+        """Обработка создания нескольких броней из корзины"""
+        reservation_ids = [item['reservation_id'] for item in data.get('reservations', [])]
+
+        reservations = list(
+            Reservation.objects.select_related('user', 'product').filter(id__in=reservation_ids)
+        )
+        if not reservations:
+            logger.error(f"Reservations {reservation_ids} not found for batch created event")
+            return
+
+        user = reservations[0].user
+
+        # Одно письмо на всю корзину
+        send_email_notification.delay(
+            to_email=user.email,
+            subject='Бронирование создано',
+            template_name='emails/reservation_batch_created.html',
+            context={
+                'reservations': [
+                    {
+                        'id': str(reservation.id),
+                        'product_name': reservation.product.name,
+                        'quantity': reservation.quantity,
+                        'total_price': float(reservation.total_price),
+                        'expires_at': reservation.expires_at.strftime('%d.%m.%Y %H:%M'),
+                    }
+                    for reservation in reservations
+                ],
+                'user': user,
+            }
+        )
+
     def handle_reservation_confirmed(self, data):
         """Обработка подтверждения бронирования"""
         reservation_id = data.get('reservation_id')
@@ -141,6 +170,33 @@ class ReservationEventConsumer:
         except Reservation.DoesNotExist:
             logger.error(f"Reservation {reservation_id} not found for cancelled event")
 
+    def handle_reservation_reduced(self, data):
+        """Обработка уменьшения брони после сокращения остатка"""
+        reservation_id = data.get('reservation_id')
+
+        try:
+            reservation = Reservation.objects.select_related('user', 'product').get(
+                id=reservation_id
+            )
+
+            send_email_notification.delay(
+                to_email=reservation.user.email,
+                subject='Количество в бронировании уменьшено',
+                template_name='emails/reservation_reduced.html',
+                context={
+                    'reservation': {
+                        'id': str(reservation.id),
+                        'product_name': reservation.product.name,
+                        'quantity': reservation.quantity,
+                        'total_price': float(reservation.total_price),
+                    },
+                    'user': reservation.user,
+                }
+            )
+
+        except Reservation.DoesNotExist:
+            logger.error(f"Reservation {reservation_id} not found for reduced event")
+
     def handle_reservation_expired(self, data):
         """Обработка истечения бронирования"""
         reservation_id = data.get('reservation_id')
@@ -165,4 +221,73 @@ class ReservationEventConsumer:
             )
 
         except Reservation.DoesNotExist:
-            logger.error(f"Reservation {reservation_id} not found for expired event")
\ No newline at end of file
+            logger.error(f"Reservation {reservation_id} not found for expired event")
+
+    def handle_reservation_reminder(self, data):
+        """Обработка напоминания о скором истечении бронирования"""
+        reservation_id = data.get('reservation_id')
+
+        try:
+            reservation = Reservation.objects.select_related('user', 'product').get(
+                id=reservation_id
+            )
+
+            send_email_notification.delay(
+                to_email=reservation.user.email,
+                subject='Бронирование скоро истечет',
+                template_name='emails/reservation_reminder.html',
+                context={
+                    'reservation': {
+                        'id': str(reservation.id),
+                        'product_name': reservation.product.name,
+                        'quantity': reservation.quantity,
+                        'expires_at': reservation.expires_at.strftime('%d.%m.%Y %H:%M'),
+                    },
+                    'user': reservation.user,
+                }
+            )
+
+            if reservation.user.phone:
+                message = (
+                    f"Бронирование #{str(reservation.id)[:8]} истекает в "
+                    f"{reservation.expires_at.strftime('%H:%M')}. Подтвердите заказ."
+                )
+                send_sms_notification.delay(reservation.user.phone, message)
+
+        except Reservation.DoesNotExist:
+            logger.error(f"Reservation {reservation_id} not found for reminder event")
+
+    def handle_waitlist_allocated(self, data):
+        """Обработка брони, созданной из очереди ожидания"""
+        reservation_id = data.get('reservation_id')
+
+        try:
+            reservation = Reservation.objects.select_related('user', 'product').get(
+                id=reservation_id
+            )
+
+            send_email_notification.delay(
+                to_email=reservation.user.email,
+                subject='Товар из листа ожидания забронирован',
+                template_name='emails/waitlist_allocated.html',
+                context={
+                    'reservation': {
+                        'id': str(reservation.id),
+                        'product_name': reservation.product.name,
+                        'quantity': reservation.quantity,
+                        'total_price': float(reservation.total_price),
+                        'expires_at': reservation.expires_at.strftime('%d.%m.%Y %H:%M'),
+                    },
+                    'user': reservation.user,
+                }
+            )
+
+            if reservation.user.phone:
+                message = (
+                    f"Товар {reservation.product.name} из листа ожидания забронирован для вас "
+                    f"до {reservation.expires_at.strftime('%H:%M')}."
+                )
+                send_sms_notification.delay(reservation.user.phone, message)
+
+        except Reservation.DoesNotExist:
+            logger.error(f"Reservation {reservation_id} not found for waitlist allocated event")
@@ -1,3 +1,37 @@
 from django.db import models
 
-# Create your models here.
+
+class OutboxEvent(models.Model):
+    """
+    Исходящее доменное событие (transactional outbox).
+
+    Записывается в той же транзакции, что и изменение брони, и
+    публикуется в Kafka отдельным процессом (команда outbox_relay).
+    Событие, не доставленное OUTBOX_RELAY_MAX_ATTEMPTS раз, получает
+    failed_at (dead letter) и больше не отправляется.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=100)
+    key = models.CharField(max_length=255, null=True, blank=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        indexes = [
+            # Очередь неопубликованных событий в порядке записи
+            models.Index(
+                fields=['id'],
+                name='outbox_unpublished_idx',
+                condition=models.Q(published_at__isnull=True, failed_at__isnull=True)
+            ),
+            models.Index(fields=['published_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.topic}:{self.key})"
@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.db import transaction, connection
+from django.db.models import F
+from django.utils import timezone
+from datetime import timedelta
+from typing import Dict, Any, List, Tuple
+
+from apps.core.services.base import BaseService
+from apps.notifications.models import OutboxEvent
+from apps.notifications.producer import get_producer, send_event
+
+
+# Идентификатор advisory-блокировки: одновременно работает один relay,
+# иначе нарушится порядок событий внутри ключа
+OUTBOX_RELAY_LOCK_ID = 7_411_001
+
+
+class OutboxRelay(BaseService):
+    """
+    Публикация событий из outbox в Kafka.
+
+    Неопубликованные события читаются пачкой в порядке записи и
+    отправляются волнами через общий producer процесса: в волне не
+    больше одного события на ключ, после волны - один flush. Если
+    сообщение по ключу не доставлено, более поздние события этого ключа
+    в пачке не отправляются и уйдут в следующем проходе после него
+    (at-least-once с сохранением порядка внутри ключа). Результаты
+    помечаются одним UPDATE. Событие, не доставленное
+    OUTBOX_RELAY_MAX_ATTEMPTS раз, переводится в dead letter (failed_at),
+    и следующие события его ключа снова публикуются.
+    """
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return 'topic' in data and 'payload' in data
+
+    def _try_lock(self) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [OUTBOX_RELAY_LOCK_ID])
+            return cursor.fetchone()[0]
+
+    @transaction.atomic
+    def relay_batch(self, batch_size: int = None) -> int:
+        """Публикация одной пачки событий. Возвращает число опубликованных"""
+        batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+
+        if not self._try_lock():
+            return 0
+
+        events = list(
+            OutboxEvent.objects.filter(
+                published_at__isnull=True, failed_at__isnull=True
+            ).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        queues: Dict[Tuple[str, str], List[OutboxEvent]] = {}
+        for event in events:
+            queues.setdefault((event.topic, event.key), []).append(event)
+
+        producer = get_producer()
+        published: List[int] = []
+        failed: List[OutboxEvent] = []
+        while queues:
+            sent = []
+            for key, queue in queues.items():
+                event = queue.pop(0)
+                sent.append((key, event, send_event(event.topic, event.key, event.payload)))
+            # Один flush на волну: ждем подтверждений до следующего события ключа
+            producer.flush()
+
+            for key, event, future in sent:
+                if future is not None and future.succeeded():
+                    published.append(event.id)
+                    if not queues[key]:
+                        del queues[key]
+                else:
+                    # Поздние события ключа не отправляем, чтобы не обогнали недоставленное
+                    failed.append(event)
+                    del queues[key]
+
+        if published:
+            OutboxEvent.objects.filter(id__in=published).update(published_at=timezone.now())
+        if failed:
+            OutboxEvent.objects.filter(id__in=[event.id for event in failed]).update(
+                attempts=F('attempts') + 1
+            )
+            self.logger.warning(f"Failed to publish {len(failed)} outbox event(s), will retry")
+
+            # Событие, которое не уходит, не должно навсегда держать свой ключ
+            dead = [
+                event for event in failed
+                if event.attempts + 1 >= settings.OUTBOX_RELAY_MAX_ATTEMPTS
+            ]
+            if dead:
+                OutboxEvent.objects.filter(id__in=[event.id for event in dead]).update(
+                    failed_at=timezone.now()
+                )
+                for event in dead:
+                    self.logger.error(
+                        f"Outbox event {event.id} ({event.topic}:{event.key}) moved to dead letter "
+                        f"after {event.attempts + 1} attempt(s)"
+                    )
+
+        self.logger.info(f"{len(published)} outbox event(s) published to Kafka")
+        return len(published)
+
+    def purge_published(self, retention_hours: int = None) -> int:
+        """Удаление опубликованных событий старше срока хранения"""
+        retention_hours = retention_hours or settings.OUTBOX_RETENTION_HOURS
+        deleted, _ = OutboxEvent.objects.filter(
+            published_at__lt=timezone.now() - timedelta(hours=retention_hours)
+        ).delete()
+        return deleted
@@ -0,0 +1,94 @@
+"""
+Общий для процесса Kafka producer.
+
+Producer создается лениво один раз на процесс (и заново после fork
+в воркерах Celery/gunicorn). Сообщения копятся в ограниченном
+буфере (KAFKA_PRODUCER_BUFFER_BYTES) и отправляются пачками по
+linger_ms/batch_size; при переполненном буфере send не ждет брокер
+дольше KAFKA_PRODUCER_MAX_BLOCK_MS, а сообщение считается сброшенным.
+Результаты доставки попадают в метрики Prometheus через callbacks.
+"""
+from django.conf import settings
+from typing import Any, Optional
+import json
+import logging
+import os
+import threading
+
+from kafka import KafkaProducer
+from kafka.errors import KafkaTimeoutError
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+KAFKA_MESSAGES = Counter(
+    'galmart_kafka_producer_messages_total',
+    'Kafka producer messages by delivery result',
+    ['topic', 'result']
+)
+
+_producer: Optional[KafkaProducer] = None
+_producer_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_producer() -> KafkaProducer:
+    """Получение producer текущего процесса"""
+    global _producer, _producer_pid
+
+    if _producer is None or _producer_pid != os.getpid():
+        with _lock:
+            if _producer is None or _producer_pid != os.getpid():
+                _producer = KafkaProducer(
+                    bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+                    value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                    key_serializer=lambda k: str(k).encode('utf-8') if k else None,
+                    acks='all',
+                    retries=5,
+                    max_in_flight_requests_per_connection=1,
+                    linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+                    batch_size=settings.KAFKA_PRODUCER_BATCH_BYTES,
+                    buffer_memory=settings.KAFKA_PRODUCER_BUFFER_BYTES,
+                    max_block_ms=settings.KAFKA_PRODUCER_MAX_BLOCK_MS,
+                )
+                _producer_pid = os.getpid()
+
+    return _producer
+
+
+def send_event(topic: str, key: Optional[str], value: Any):
+    """
+    Постановка сообщения в буфер producer без ожидания доставки.
+
+    Возвращает future доставки или None, если буфер переполнен.
+    """
+    try:
+        future = get_producer().send(topic=topic, key=key, value=value)
+    except KafkaTimeoutError:
+        KAFKA_MESSAGES.labels(topic=topic, result='dropped').inc()
+        logger.warning(f"Kafka producer buffer is full, message to {topic} dropped")
+        return None
+
+    future.add_callback(_on_delivered, topic)
+    future.add_errback(_on_failed, topic)
+    return future
+
+
+def close_producer(timeout: Optional[float] = None):
+    """Отправка оставшихся сообщений и закрытие producer"""
+    global _producer, _producer_pid
+
+    with _lock:
+        if _producer is not None and _producer_pid == os.getpid():
+            _producer.close(timeout=timeout)
+        _producer = None
+        _producer_pid = None
+
+
+def _on_delivered(topic: str, metadata):
+    KAFKA_MESSAGES.labels(topic=topic, result='delivered').inc()
+
+
+def _on_failed(topic: str, exc: Exception):
+    KAFKA_MESSAGES.labels(topic=topic, result='failed').inc()
+    logger.error(f"Failed to deliver message to {topic}: {exc}")
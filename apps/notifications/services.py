@@ -1,47 +1,47 @@
-from django.conf import settings
-from typing import Dict, Any
-import json
+from typing import Dict, Any, List, Tuple
 
 from django.utils import timezone
-from kafka import KafkaProducer
 from apps.core.services.base import BaseService
+from apps.notifications.models import OutboxEvent
 from apps.reservations.models import Reservation
 
 
 class NotificationService(BaseService):
-    """Сервис для отправки уведомлений"""
-
-    def __init__(self):
-        super().__init__()
-        self.producer = KafkaProducer(
-            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
-            key_serializer=lambda k: str(k).encode('utf-8') if k else None,
-        )
+    """
+    Сервис для отправки уведомлений.
+
+    События не отправляются в Kafka напрямую, а записываются в outbox
+    в текущей транзакции и публикуются командой outbox_relay.
+    """
 
     def validate_data(self, data: Dict[str, Any]) -> bool:
         return 'event_type' in data and 'data' in data
 
     def _send_event(self, topic: str, event_type: str, data: Dict[str, Any], key: str = None):
-        """Базовый метод отправки события в Kafka"""
-        try:
-            message = {
-                'event_type': event_type,
-                'data': data,
-                'timestamp': timezone.now().isoformat()
-            }
-
-            self.producer.send(
+        """Базовый метод отправки события"""
+        self._send_events(topic, event_type, [(data, key)])
+
+    def _send_events(self, topic: str, event_type: str, events: List[Tuple[Dict[str, Any], str]]):
+        """Запись нескольких событий в outbox одним INSERT"""
+        if not events:
+            return
+
+        timestamp = timezone.now().isoformat()
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(
                 topic=topic,
                 key=key,
-                value=message
+                event_type=event_type,
+                payload={
+                    'event_type': event_type,
+                    'data': data,
+                    'timestamp': timestamp
+                }
             )
-            self.producer.flush()
-
-            self.logger.info(f"Event sent to Kafka: {event_type}")
+            for data, key in events
+        ])
 
-        except Exception as e:
-            self.logger.error(f"Failed to send event to Kafka: {e}")
+        self.logger.info(f"{len(events)} event(s) written to outbox: {event_type}")
 
     def send_reservation_created(self, reservation: Reservation):
         """Уведомление о создании брони"""
@@ -58,6 +58,30 @@ class NotificationService(BaseService):
             key=str(reservation.user_id)
         )
 
+    def send_reservations_batch_created(self, reservations: List[Reservation]):
+        """Одно уведомление о создании нескольких броней из корзины"""
+        if not reservations:
+            return
+
+        user_id = reservations[0].user_id
+        self._send_event(
+            topic='reservation_events',
+            event_type='reservation_batch_created',
+            data={
+                'user_id': user_id,
+                'reservations': [
+                    {
+                        'reservation_id': str(reservation.id),
+                        'product_id': reservation.product_id,
+                        'quantity': reservation.quantity,
+                        'expires_at': reservation.expires_at.isoformat(),
+                    }
+                    for reservation in reservations
+                ],
+            },
+            key=str(user_id)
+        )
+
     def send_reservation_confirmed(self, reservation: Reservation):
         """Уведомление о подтверждении брони"""
         self._send_event(
@@ -83,4 +107,118 @@ class NotificationService(BaseService):
                 'product_id': reservation.product_id,
             },
             key=str(reservation.user_id)
-        )
\ No newline at end of file
+        )
+
+    def send_reservations_confirmed(self, reservations: List[Reservation]):
+        """Уведомления о подтверждении нескольких броней одной пачкой"""
+        self._send_events(
+            topic='reservation_events',
+            event_type='reservation_confirmed',
+            events=[
+                (
+                    {
+                        'reservation_id': str(reservation.id),
+                        'user_id': reservation.user_id,
+                        'product_id': reservation.product_id,
+                        'total_price': float(reservation.total_price),
+                    },
+                    str(reservation.user_id)
+                )
+                for reservation in reservations
+            ]
+        )
+
+    def send_reservations_cancelled(self, reservations: List[Reservation]):
+        """Уведомления об отмене нескольких броней одной пачкой"""
+        self._send_events(
+            topic='reservation_events',
+            event_type='reservation_cancelled',
+            events=[
+                (
+                    {
+                        'reservation_id': str(reservation.id),
+                        'user_id': reservation.user_id,
+                        'product_id': reservation.product_id,
+                    },
+                    str(reservation.user_id)
+                )
+                for reservation in reservations
+            ]
+        )
+
+    def send_reservations_reduced(self, reservations: List[Reservation]):
+        """Уведомления об уменьшении броней после сокращения остатка"""
+        self._send_events(
+            topic='reservation_events',
+            event_type='reservation_reduced',
+            events=[
+                (
+                    {
+                        'reservation_id': str(reservation.id),
+                        'user_id': reservation.user_id,
+                        'product_id': reservation.product_id,
+                        'quantity': reservation.quantity,
+                        'total_price': float(reservation.total_price),
+                    },
+                    str(reservation.user_id)
+                )
+                for reservation in reservations
+            ]
+        )
+
+    def send_reservations_expired(self, reservations: List[Reservation]):
+        """Уведомления об истечении нескольких броней одной пачкой"""
+        self._send_events(
+            topic='reservation_events',
+            event_type='reservation_expired',
+            events=[
+                (
+                    {
+                        'reservation_id': str(reservation.id),
+                        'user_id': reservation.user_id,
+                        'product_id': reservation.product_id,
+                    },
+                    str(reservation.user_id)
+                )
+                for reservation in reservations
+            ]
+        )
+
+    def send_waitlist_allocated(self, entries):
+        """Уведомления ожидающим, для которых из очереди создана бронь"""
+        self._send_events(
+            topic='reservation_events',
+            event_type='waitlist_allocated',
+            events=[
+                (
+                    {
+                        'waitlist_entry_id': entry.id,
+                        'reservation_id': str(entry.reservation_id),
+                        'user_id': entry.user_id,
+                        'product_id': entry.product_id,
+                        'quantity': entry.quantity,
+                    },
+                    str(entry.user_id)
+                )
+                for entry in entries
+            ]
+        )
+
+    def send_reservation_reminders(self, reservations: List[Reservation]):
+        """Напоминания о скором истечении броней одной пачкой"""
+        self._send_events(
+            topic='reservation_events',
+            event_type='reservation_reminder',
+            events=[
+                (
+                    {
+                        'reservation_id': str(reservation.id),
+                        'user_id': reservation.user_id,
+                        'product_id': reservation.product_id,
+                        'expires_at': reservation.expires_at.isoformat(),
+                    },
+                    str(reservation.user_id)
+                )
+                for reservation in reservations
+            ]
+        )
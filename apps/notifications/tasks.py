@@ -60,3 +60,15 @@ def send_sms_notification(self, phone_number, message):
     except Exception as exc:
         logger.error(f"Error sending SMS to {phone_number}: {exc}")
         raise
+
+
+@shared_task
+def purge_outbox_events():
+    """
+    Удаление опубликованных событий outbox старше OUTBOX_RETENTION_HOURS
+    """
+    from apps.notifications.outbox import OutboxRelay
+
+    deleted = OutboxRelay().purge_published()
+    logger.info(f"Purged {deleted} published outbox events")
+    return {'status': 'success', 'deleted': deleted}
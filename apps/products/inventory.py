@@ -0,0 +1,376 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction, models
+from django.utils import timezone
+from typing import Dict, Any, Optional, Tuple
+from redis.exceptions import RedisError
+
+from apps.core.services.base import BaseService
+from apps.products.models import ProductStock
+
+
+# Резервирование: проверка остатка и увеличение резерва одной операцией.
+# Возвращает {1, available} при успехе, {0, available} при нехватке
+# и {-1, 0}, если счетчики товара еще не загружены в Redis.
+RESERVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {-1, 0}
+end
+local quantity = tonumber(redis.call('HGET', KEYS[1], 'quantity'))
+local reserved = tonumber(redis.call('HGET', KEYS[1], 'reserved'))
+local requested = tonumber(ARGV[1])
+local available = quantity - reserved
+if available < requested then
+    return {0, available}
+end
+redis.call('HINCRBY', KEYS[1], 'reserved', requested)
+redis.call('HINCRBY', KEYS[1], 'pending_reserved', requested)
+redis.call('HSET', KEYS[1], 'touched_at', ARGV[3])
+redis.call('SADD', KEYS[2], ARGV[2])
+return {1, available - requested}
+"""
+
+# Изменение остатка и резерва (отмена, подтверждение, ручная корректировка).
+# ARGV[5] = 0 - изменение уже записано в БД и в очередь не попадает.
+# Возвращает -1, если счетчиков в Redis нет.
+ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+redis.call('HINCRBY', KEYS[1], 'quantity', ARGV[1])
+redis.call('HINCRBY', KEYS[1], 'reserved', ARGV[2])
+if ARGV[5] == '1' then
+    redis.call('HINCRBY', KEYS[1], 'pending_quantity', ARGV[1])
+    redis.call('HINCRBY', KEYS[1], 'pending_reserved', ARGV[2])
+end
+redis.call('HSET', KEYS[1], 'touched_at', ARGV[4])
+redis.call('SADD', KEYS[2], ARGV[3])
+return 1
+"""
+
+# Загрузка счетчиков из БД, только если их еще нет
+PRIME_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1],
+    'quantity', ARGV[1], 'reserved', ARGV[2], 'version', ARGV[3],
+    'pending_quantity', 0, 'pending_reserved', 0, 'touched_at', 0)
+redis.call('SADD', KEYS[2], ARGV[4])
+return 1
+"""
+
+# Забираем накопленные изменения для записи в БД и снимаем отметку "грязный"
+DRAIN_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+    return {0, 0}
+end
+local delta_quantity = tonumber(redis.call('HGET', KEYS[1], 'pending_quantity'))
+local delta_reserved = tonumber(redis.call('HGET', KEYS[1], 'pending_reserved'))
+redis.call('HSET', KEYS[1], 'pending_quantity', 0, 'pending_reserved', 0)
+redis.call('SREM', KEYS[2], ARGV[1])
+return {delta_quantity, delta_reserved}
+"""
+
+# Возврат изменений, которые не удалось записать в БД
+RESTORE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'pending_quantity', ARGV[1])
+redis.call('HINCRBY', KEYS[1], 'pending_reserved', ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+return 1
+"""
+
+# Исправление расхождения: применяется, только если с момента чтения
+# счетчиков не было новых операций и все изменения уже в БД
+REPAIR_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if redis.call('HGET', KEYS[1], 'touched_at') ~= ARGV[4] then
+    return 0
+end
+if tonumber(redis.call('HGET', KEYS[1], 'pending_quantity')) ~= 0
+    or tonumber(redis.call('HGET', KEYS[1], 'pending_reserved')) ~= 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'quantity', ARGV[1], 'reserved', ARGV[2], 'version', ARGV[3])
+return 1
+"""
+
+
+class HotInventoryService(BaseService):
+    """
+    Горячие счетчики остатков в Redis для распродаж.
+
+    Доступный остаток товара хранится в хеше рядом с ключом кеша
+    product_stock:{id}, резервирование и освобождение выполняются
+    Lua-скриптами, а изменения reserved_quantity/quantity накапливаются
+    и записываются в ProductStock пачками (write-behind).
+    Если режим выключен или Redis недоступен, методы возвращают None/False
+    и вызывающий код использует SQL-путь.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = getattr(settings, 'INVENTORY_HOT_COUNTERS_ENABLED', False)
+        self._redis = None
+        self._scripts = {}
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return 'product_id' in data and 'quantity' in data
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _script(self, name: str, source: str):
+        if name not in self._scripts:
+            self._scripts[name] = self.redis.register_script(source)
+        return self._scripts[name]
+
+    def _counters_key(self, product_id: int) -> str:
+        return cache.make_key(f"product_stock:{product_id}:counters")
+
+    def _dirty_key(self) -> str:
+        return cache.make_key("product_stock:dirty")
+
+    def _hot_key(self) -> str:
+        return cache.make_key("product_stock:hot")
+
+    def _now(self) -> str:
+        return str(int(timezone.now().timestamp()))
+
+    def reserve(self, product_id: int, quantity: int) -> Optional[Tuple[bool, int]]:
+        """
+        Резервирование в Redis.
+
+        Возвращает (успех, доступный остаток) или None, если горячий путь
+        недоступен и нужно резервировать через БД.
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            script = self._script('reserve', RESERVE_SCRIPT)
+            keys = [self._counters_key(product_id), self._dirty_key()]
+            args = [quantity, product_id, self._now()]
+
+            status, available = script(keys=keys, args=args)
+            if status == -1:
+                if not self._prime(product_id):
+                    return None
+                status, available = script(keys=keys, args=args)
+                if status == -1:
+                    return None
+
+            return status == 1, int(available)
+
+        except RedisError as e:
+            self.logger.warning(f"Hot inventory unavailable, falling back to SQL: {e}")
+            return None
+
+    def release(self, product_id: int, quantity: int) -> bool:
+        """Освобождение резерва. False - счетчиков нет, нужен SQL-путь"""
+        return self._adjust(product_id, 0, -quantity)
+
+    def commit(self, product_id: int, quantity: int) -> bool:
+        """Списание подтвержденного резерва. False - нужен SQL-путь"""
+        return self._adjust(product_id, -quantity, -quantity)
+
+    def sync_quantity(self, product_id: int, delta: int) -> bool:
+        """Учет изменения общего остатка, уже записанного в БД"""
+        return self._adjust(product_id, delta, 0, persist=False)
+
+    def get_available(self, product_id: int) -> Optional[int]:
+        """Доступный остаток из Redis или None, если счетчиков нет"""
+        counters = self.get_counters(product_id)
+        if counters is None:
+            return None
+        quantity, reserved = counters
+        return max(0, quantity - reserved)
+
+    def get_counters(self, product_id: int) -> Optional[Tuple[int, int]]:
+        """(quantity, reserved) из Redis или None, если счетчиков нет"""
+        if not self.enabled:
+            return None
+
+        try:
+            quantity, reserved = self.redis.hmget(
+                self._counters_key(product_id), 'quantity', 'reserved'
+            )
+        except RedisError as e:
+            self.logger.warning(f"Hot inventory unavailable: {e}")
+            return None
+
+        if quantity is None:
+            return None
+        return int(quantity), int(reserved)
+
+    def _adjust(self, product_id: int, delta_quantity: int, delta_reserved: int,
+                persist: bool = True) -> bool:
+        if not self.enabled:
+            return False
+
+        try:
+            result = self._script('adjust', ADJUST_SCRIPT)(
+                keys=[self._counters_key(product_id), self._dirty_key()],
+                args=[delta_quantity, delta_reserved, product_id, self._now(), int(persist)]
+            )
+            return result == 1
+
+        except RedisError as e:
+            self.logger.warning(f"Hot inventory unavailable, falling back to SQL: {e}")
+            return False
+
+    def _prime(self, product_id: int) -> bool:
+        """Загрузка счетчиков товара из ProductStock"""
+        stock = ProductStock.objects.filter(product_id=product_id).first()
+        # Шардированные остатки обслуживаются только через SQL
+        if stock is None or stock.slot_count:
+            return False
+
+        self._script('prime', PRIME_SCRIPT)(
+            keys=[self._counters_key(product_id), self._hot_key()],
+            args=[stock.quantity, stock.reserved_quantity, stock.version, product_id]
+        )
+        return True
+
+    def flush(self, batch_size: Optional[int] = None) -> int:
+        """
+        Запись накопленных изменений в ProductStock одним UPDATE на пачку товаров.
+        Возвращает количество обновленных товаров.
+        """
+        if not self.enabled:
+            return 0
+
+        batch_size = batch_size or getattr(settings, 'INVENTORY_FLUSH_BATCH_SIZE', 500)
+        product_ids = [int(pid) for pid in self.redis.srandmember(self._dirty_key(), batch_size)]
+        if not product_ids:
+            return 0
+
+        drain = self._script('drain', DRAIN_SCRIPT)
+        pipe = self.redis.pipeline()
+        for product_id in product_ids:
+            drain(keys=[self._counters_key(product_id), self._dirty_key()],
+                  args=[product_id], client=pipe)
+        drained = pipe.execute()
+
+        deltas = {
+            product_id: (int(delta_quantity), int(delta_reserved))
+            for product_id, (delta_quantity, delta_reserved) in zip(product_ids, drained)
+            if delta_quantity or delta_reserved
+        }
+        if not deltas:
+            return 0
+
+        try:
+            with transaction.atomic():
+                versions = ProductStock.objects.apply_deltas(deltas)
+        except Exception as e:
+            self.logger.error(f"Failed to flush inventory counters: {e}")
+            self._restore(deltas)
+            raise
+
+        pipe = self.redis.pipeline()
+        for product_id, version in versions.items():
+            pipe.hset(self._counters_key(product_id), 'version', version)
+            cache_keys = [f"product_stock:{product_id}", f"product_with_stock:{product_id}"]
+            pipe.delete(*[cache.make_key(key) for key in cache_keys])
+        pipe.execute()
+
+        self.logger.info(f"Flushed inventory counters for {len(versions)} products")
+        return len(versions)
+
+    def _restore(self, deltas: Dict[int, Tuple[int, int]]):
+        restore = self._script('restore', RESTORE_SCRIPT)
+        pipe = self.redis.pipeline()
+        for product_id, (delta_quantity, delta_reserved) in deltas.items():
+            restore(keys=[self._counters_key(product_id), self._dirty_key()],
+                    args=[delta_quantity, delta_reserved, product_id], client=pipe)
+        pipe.execute()
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        Поиск и исправление расхождений между Redis и БД.
+
+        Истинный резерв - сумма активных броней товара. Товары с операциями
+        за последние INVENTORY_RECONCILE_QUIET_SECONDS пропускаются, чтобы
+        не трогать брони, транзакции которых еще не завершены.
+        """
+        from apps.reservations.models import Reservation, ReservationStatus
+
+        result = {'checked': 0, 'repaired': 0, 'skipped': 0}
+        if not self.enabled:
+            return result
+
+        # Сначала записываем все накопленные изменения
+        while self.flush():
+            pass
+
+        quiet_seconds = getattr(settings, 'INVENTORY_RECONCILE_QUIET_SECONDS', 30)
+        threshold = int(timezone.now().timestamp()) - quiet_seconds
+        repair = self._script('repair', REPAIR_SCRIPT)
+
+        for raw_product_id in self.redis.smembers(self._hot_key()):
+            product_id = int(raw_product_id)
+            key = self._counters_key(product_id)
+            counters = self.redis.hgetall(key)
+            if not counters:
+                self.redis.srem(self._hot_key(), product_id)
+                continue
+
+            touched_at = counters[b'touched_at']
+            if int(touched_at) > threshold:
+                result['skipped'] += 1
+                continue
+
+            result['checked'] += 1
+            with transaction.atomic():
+                stock = ProductStock.objects.select_for_update().filter(
+                    product_id=product_id
+                ).first()
+                if stock is None:
+                    self.redis.delete(key)
+                    self.redis.srem(self._hot_key(), product_id)
+                    continue
+
+                reserved = Reservation.objects.filter(
+                    product_id=product_id,
+                    status=ReservationStatus.PENDING
+                ).aggregate(total=models.Sum('quantity'))['total'] or 0
+
+                redis_drift = (
+                    int(counters[b'quantity']) != stock.quantity or
+                    int(counters[b'reserved']) != reserved
+                )
+                db_drift = stock.reserved_quantity != reserved
+                if not (redis_drift or db_drift):
+                    continue
+
+                db_reserved = stock.reserved_quantity
+                if db_drift:
+                    stock.reserved_quantity = reserved
+                    stock.version += 1
+                    stock.save(update_fields=['reserved_quantity', 'version', 'last_updated'])
+
+                repaired = repair(
+                    keys=[key],
+                    args=[stock.quantity, reserved, stock.version, touched_at]
+                )
+
+            self.logger.warning(
+                f"Inventory drift for product {product_id}: "
+                f"redis={int(counters[b'quantity'])}/{int(counters[b'reserved'])}, "
+                f"db={stock.quantity}/{db_reserved}, expected reserved={reserved}"
+            )
+            if repaired or db_drift:
+                result['repaired'] += 1
+
+        return result
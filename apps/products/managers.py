@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, connections
 from django.utils import timezone
 
 
@@ -48,4 +48,228 @@ class CategoryManager(models.Manager):
 
     def with_products(self):
         """Категории с товарами"""
-        return self.filter(products__is_active=True).distinct()
\ No newline at end of file
+        return self.filter(products__is_active=True).distinct()
+
+
+class ProductStockManager(models.Manager):
+    """Менеджер для модели ProductStock"""
+
+    def try_reserve(self, product_id, quantity):
+        """
+        Резервирование остатка одним условным UPDATE.
+
+        Строка обновляется только если свободного остатка хватает, поэтому
+        предварительный SELECT ... FOR UPDATE не нужен. Возвращает
+        обновленный ProductStock или None, если товара недостаточно
+        (или записи об остатках нет).
+        """
+        table = self.model._meta.db_table
+        field_names = ['id', 'product_id', 'quantity', 'reserved_quantity', 'last_updated', 'version']
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} "
+                f"SET reserved_quantity = reserved_quantity + %s, version = version + 1, last_updated = %s "
+                f"WHERE product_id = %s AND slot_count = 0 AND quantity - reserved_quantity >= %s "
+                f"RETURNING {', '.join(field_names)}",
+                [quantity, timezone.now(), product_id, quantity]
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            # Для шардированного остатка резервируем в одном из слотов
+            from apps.products.models import ProductStockSlot
+            if ProductStockSlot.objects.try_apply(product_id, 0, quantity):
+                return self.filter(product_id=product_id).first()
+            return None
+        return self.model.from_db(self.db, field_names, row)
+
+    def apply_deltas(self, deltas):
+        """
+        Применение накопленных изменений остатков одним UPDATE ... FROM (VALUES ...).
+
+        deltas: {product_id: (delta_quantity, delta_reserved)}.
+        Изменения шардированных остатков применяются к слотам.
+        Возвращает {product_id: version} для обновленных строк product_stocks.
+        """
+        if not deltas:
+            return {}
+
+        table = self.model._meta.db_table
+        values_sql = ', '.join(['(%s, %s, %s)'] * len(deltas))
+        params = [timezone.now()]
+        for product_id, (delta_quantity, delta_reserved) in sorted(deltas.items()):
+            params.extend([product_id, delta_quantity, delta_reserved])
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} AS s "
+                f"SET quantity = GREATEST(0, s.quantity + v.delta_quantity), "
+                f"reserved_quantity = GREATEST(0, s.reserved_quantity + v.delta_reserved), "
+                f"version = s.version + 1, last_updated = %s "
+                f"FROM (VALUES {values_sql}) AS v(product_id, delta_quantity, delta_reserved) "
+                f"WHERE s.product_id = v.product_id AND s.slot_count = 0 "
+                f"RETURNING s.product_id, s.version",
+                params
+            )
+            versions = dict(cursor.fetchall())
+
+        sharded = {
+            product_id: delta for product_id, delta in deltas.items() if product_id not in versions
+        }
+        if sharded:
+            from apps.products.models import ProductStockSlot
+            for product_id, (delta_quantity, delta_reserved) in sorted(sharded.items()):
+                ProductStockSlot.objects.try_apply(
+                    product_id, delta_quantity, delta_reserved, strict=False
+                )
+
+        return versions
+
+
+class ProductStockSlotManager(models.Manager):
+    """
+    Менеджер слотов шардированного остатка.
+
+    Остаток горячего товара делится на N строк, и параллельные брони
+    обновляют разные строки. Изменение сначала пробует одну случайную
+    незаблокированную строку, в которую оно помещается целиком, и
+    только затем блокирует все слоты товара и раскладывает изменение
+    по нескольким строкам.
+    """
+
+    def totals(self, product_id):
+        """Суммарные (quantity, reserved_quantity) по слотам товара"""
+        result = self.filter(product_id=product_id).aggregate(
+            quantity=models.Sum('quantity'),
+            reserved_quantity=models.Sum('reserved_quantity')
+        )
+        return result['quantity'] or 0, result['reserved_quantity'] or 0
+
+    def try_apply(self, product_id, delta_quantity, delta_reserved, strict=True):
+        """
+        Применение изменения (delta_quantity, delta_reserved) к слотам товара.
+
+        При strict=True изменение применяется только целиком (резервирование),
+        иначе - насколько хватает остатков (освобождение, списание).
+        Возвращает True, если изменение применено полностью.
+        """
+        table = self.model._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} "
+                f"SET quantity = quantity + %s, reserved_quantity = reserved_quantity + %s, "
+                f"version = version + 1 "
+                f"WHERE id = ("
+                f"    SELECT id FROM {table} "
+                f"    WHERE product_id = %s "
+                f"    AND quantity + %s >= reserved_quantity + %s "
+                f"    AND reserved_quantity + %s >= 0 AND quantity + %s >= 0 "
+                f"    ORDER BY random() LIMIT 1 "
+                f"    FOR UPDATE SKIP LOCKED"
+                f") RETURNING id",
+                [delta_quantity, delta_reserved, product_id,
+                 delta_quantity, delta_reserved, delta_reserved, delta_quantity]
+            )
+            if cursor.fetchone() is not None:
+                return True
+
+            return self._apply_locked(cursor, product_id, delta_quantity, delta_reserved, strict)
+
+    def _apply_locked(self, cursor, product_id, delta_quantity, delta_reserved, strict):
+        """Раскладка изменения по всем слотам товара под блокировкой"""
+        table = self.model._meta.db_table
+        cursor.execute(
+            f"SELECT id, quantity, reserved_quantity FROM {table} "
+            f"WHERE product_id = %s ORDER BY slot FOR UPDATE",
+            [product_id]
+        )
+        slots = [list(row) for row in cursor.fetchall()]
+        if not slots:
+            return False
+
+        complete = self._allocate(slots, delta_quantity, delta_reserved)
+        if strict and not complete:
+            return False
+
+        self._write(cursor, slots)
+        return complete
+
+    def _allocate(self, slots, delta_quantity, delta_reserved):
+        """Распределение изменения по слотам [id, quantity, reserved] на месте"""
+        remaining = abs(delta_reserved)
+        if delta_reserved > 0:
+            for slot in sorted(slots, key=lambda s: s[2] - s[1]):
+                taken = min(remaining, slot[1] - slot[2])
+                slot[2] += taken
+                remaining -= taken
+        elif delta_reserved < 0:
+            for slot in sorted(slots, key=lambda s: -s[2]):
+                taken = min(remaining, slot[2])
+                slot[2] -= taken
+                remaining -= taken
+        complete = remaining == 0
+
+        remaining = abs(delta_quantity)
+        if delta_quantity > 0:
+            min(slots, key=lambda s: s[1])[1] += delta_quantity
+            remaining = 0
+        elif delta_quantity < 0:
+            for slot in sorted(slots, key=lambda s: s[2] - s[1]):
+                taken = min(remaining, slot[1] - slot[2])
+                slot[1] -= taken
+                remaining -= taken
+
+        return complete and remaining == 0
+
+    def _write(self, cursor, slots):
+        table = self.model._meta.db_table
+        values_sql = ', '.join(['(%s, %s, %s)'] * len(slots))
+        params = [value for slot in slots for value in slot]
+        cursor.execute(
+            f"UPDATE {table} AS s "
+            f"SET quantity = v.quantity, reserved_quantity = v.reserved_quantity, "
+            f"version = s.version + 1 "
+            f"FROM (VALUES {values_sql}) AS v(id, quantity, reserved_quantity) "
+            f"WHERE s.id = v.id",
+            params
+        )
+
+    def rebalance(self, product_id):
+        """
+        Равномерное перераспределение остатка и резерва по слотам.
+        Возвращает суммарные (quantity, reserved_quantity).
+        """
+        table = self.model._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, quantity, reserved_quantity FROM {table} "
+                f"WHERE product_id = %s ORDER BY slot FOR UPDATE",
+                [product_id]
+            )
+            slots = [list(row) for row in cursor.fetchall()]
+            if not slots:
+                return 0, 0
+
+            quantity = sum(slot[1] for slot in slots)
+            reserved = sum(slot[2] for slot in slots)
+            for index, (slot_quantity, slot_reserved) in enumerate(
+                    self.split(quantity, reserved, len(slots))):
+                slots[index][1] = slot_quantity
+                slots[index][2] = slot_reserved
+            self._write(cursor, slots)
+
+        return quantity, reserved
+
+    @staticmethod
+    def split(quantity, reserved, count):
+        """Деление остатка и резерва на count слотов (резерв слота не больше остатка)"""
+        return [
+            (
+                quantity // count + (1 if index < quantity % count else 0),
+                reserved // count + (1 if index < reserved % count else 0),
+            )
+            for index in range(count)
+        ]
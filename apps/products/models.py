@@ -3,6 +3,8 @@ from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
+from apps.products.managers import ProductStockManager, ProductStockSlotManager
+
 
 class Category(models.Model):
     """Категория товаров"""
@@ -78,6 +80,10 @@ class ProductStock(models.Model):
     reserved_quantity = models.PositiveIntegerField(_('reserved quantity'), default=0)
     last_updated = models.DateTimeField(auto_now=True)
     version = models.PositiveIntegerField(default=1)  # Для оптимистичной блокировки
+    # Количество слотов шардированного остатка (0 - остаток хранится в этой строке)
+    slot_count = models.PositiveSmallIntegerField(default=0)
+
+    objects = ProductStockManager()
 
     class Meta:
         db_table = 'product_stocks'
@@ -88,7 +94,37 @@ class ProductStock(models.Model):
 
     @property
     def available_quantity(self):
+        if self.slot_count:
+            # quantity/reserved_quantity шардированного остатка - сводка,
+            # обновляемая при перебалансировке; точные значения в слотах
+            quantity, reserved = ProductStockSlot.objects.totals(self.product_id)
+            return max(0, quantity - reserved)
         return max(0, self.quantity - self.reserved_quantity)
 
     def can_reserve(self, quantity):
-        return self.available_quantity >= quantity
\ No newline at end of file
+        return self.available_quantity >= quantity
+
+
+class ProductStockSlot(models.Model):
+    """Слот шардированного остатка горячего товара"""
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_slots'
+    )
+    slot = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(_('quantity'), default=0)
+    reserved_quantity = models.PositiveIntegerField(_('reserved quantity'), default=0)
+    version = models.PositiveIntegerField(default=1)
+
+    objects = ProductStockSlotManager()
+
+    class Meta:
+        db_table = 'product_stock_slots'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'slot'], name='unique_product_stock_slot'),
+        ]
+
+    @property
+    def available_quantity(self):
+        return max(0, self.quantity - self.reserved_quantity)
@@ -1,8 +1,11 @@
 from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Q, F
 from typing import List, Optional, Dict, Any
 from apps.core.services.base import BaseService
-from apps.products.models import Product, ProductStock, Category
+from apps.core.exceptions import BusinessLogicError
+from apps.products.models import Product, ProductStock, ProductStockSlot, Category
+from apps.products.inventory import HotInventoryService
 
 
 class ProductService(BaseService):
@@ -63,18 +66,129 @@ class ProductService(BaseService):
 
         return queryset.order_by('-created_at')
 
+    @transaction.atomic
     def update_stock(self, product_id: int, quantity: int) -> ProductStock:
         """Обновление остатков товара"""
         try:
             stock = ProductStock.objects.select_for_update().get(product_id=product_id)
+            if stock.slot_count:
+                # Шардированный остаток: слоты блокируются до конца транзакции,
+                # изменение раскладывается по ним целиком
+                list(ProductStockSlot.objects.select_for_update().filter(
+                    product_id=product_id
+                ).order_by('slot').values_list('id', flat=True))
+                current_quantity, _ = ProductStockSlot.objects.totals(product_id)
+                delta = quantity - current_quantity
+                if delta < 0:
+                    # Слоты не опускают остаток ниже резерва, поэтому брони
+                    # сверх нового остатка снимаются до изменения слотов
+                    from apps.reservations.services import ReservationService
+                    ReservationService().cascade_product(product_id, quantity)
+                if not ProductStockSlot.objects.try_apply(product_id, delta, 0):
+                    raise BusinessLogicError("Не удалось изменить остаток")
+            else:
+                delta = quantity - stock.quantity
             stock.quantity = quantity
             stock.version += 1
             stock.save(update_fields=['quantity', 'version', 'last_updated'])
 
+            # Горячие счетчики в Redis должны увидеть новый остаток
+            HotInventoryService().sync_quantity(product_id, delta)
+
+            if delta < 0 and not stock.slot_count:
+                # Остаток мог стать меньше резерва - снимаем лишние активные брони
+                from apps.reservations.services import ReservationService
+                if any(ReservationService().cascade_product(product_id).values()):
+                    stock.refresh_from_db()
+
+            if delta > 0:
+                from apps.reservations.waitlist import WaitlistService
+                from apps.reservations.admission import ReservationAdmissionService
+                WaitlistService().notify_stock_released([product_id])
+                ReservationAdmissionService().notify_stock_released([product_id])
+
             # Очищаем кеш
             cache.delete(f"product_stock:{product_id}")
             cache.delete(f"product_with_stock:{product_id}")
 
             return stock
         except ProductStock.DoesNotExist:
-            raise BusinessLogicError("Информация об остатках не найдена")
\ No newline at end of file
+            raise BusinessLogicError("Информация об остатках не найдена")
+
+    @transaction.atomic
+    def deactivate_product(self, product_id: int) -> Dict[str, int]:
+        """
+        Снятие товара с продажи. Активные брони товара отменяются в той же
+        транзакции набором запросов (ReservationService.cascade_product).
+        """
+        if not Product.objects.filter(id=product_id).update(is_active=False):
+            raise BusinessLogicError("Товар не найден")
+
+        from apps.reservations.services import ReservationService
+        result = ReservationService().cascade_product(product_id)
+
+        cache.delete(f"product_with_stock:{product_id}")
+        cache.delete("product_list")
+
+        self.logger.info(f"Product {product_id} deactivated, {result['cancelled']} reservations cancelled")
+        return result
+
+    @transaction.atomic
+    def shard_stock(self, product_id: int, slot_count: int) -> ProductStock:
+        """
+        Перевод остатка товара в шардированный режим с slot_count слотами.
+        slot_count <= 1 возвращает остаток в одну строку product_stocks.
+        """
+        try:
+            stock = ProductStock.objects.select_for_update().get(product_id=product_id)
+        except ProductStock.DoesNotExist:
+            raise BusinessLogicError("Информация об остатках не найдена")
+
+        if stock.slot_count:
+            stock.quantity, stock.reserved_quantity = ProductStockSlot.objects.totals(product_id)
+            ProductStockSlot.objects.filter(product_id=product_id).delete()
+
+        stock.slot_count = slot_count if slot_count > 1 else 0
+        if stock.slot_count:
+            ProductStockSlot.objects.bulk_create([
+                ProductStockSlot(
+                    product_id=product_id,
+                    slot=index,
+                    quantity=slot_quantity,
+                    reserved_quantity=slot_reserved
+                )
+                for index, (slot_quantity, slot_reserved) in enumerate(
+                    ProductStockSlot.objects.split(
+                        stock.quantity, stock.reserved_quantity, stock.slot_count
+                    )
+                )
+            ])
+
+        stock.version += 1
+        stock.save(update_fields=['quantity', 'reserved_quantity', 'slot_count', 'version', 'last_updated'])
+
+        cache.delete(f"product_stock:{product_id}")
+        cache.delete(f"product_with_stock:{product_id}")
+
+        self.logger.info(f"Stock of product {product_id} split into {stock.slot_count} slots")
+        return stock
+
+    def rebalance_stock_slots(self) -> int:
+        """
+        Выравнивание слотов шардированных остатков и обновление сводки
+        в product_stocks. Каждый товар - отдельная короткая транзакция.
+        """
+        product_ids = list(
+            ProductStock.objects.filter(slot_count__gt=0).values_list('product_id', flat=True)
+        )
+
+        for product_id in product_ids:
+            with transaction.atomic():
+                quantity, reserved = ProductStockSlot.objects.rebalance(product_id)
+                ProductStock.objects.filter(product_id=product_id).update(
+                    quantity=quantity,
+                    reserved_quantity=reserved,
+                    version=F('version') + 1
+                )
+
+        return len(product_ids)
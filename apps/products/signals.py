@@ -31,20 +31,30 @@ def product_post_save(sender, instance, created, **kwargs):
         logger.error(f"Error in product_post_save signal: {e}")
 
 
+LOW_STOCK_THRESHOLD = 5  # Порог низких остатков
+
+
 @receiver(post_save, sender=ProductStock)
 def product_stock_post_save(sender, instance, created, **kwargs):
     """Обработка после сохранения остатков товара"""
     try:
         # Очищаем кеш товара
-        cache.delete(f"product_stock:{instance.product.id}")
-        cache.delete(f"product_with_stock:{instance.product.id}")
+        cache.delete(f"product_stock:{instance.product_id}")
+        cache.delete(f"product_with_stock:{instance.product_id}")
+
+        # Точный остаток шардированного товара лежит только в слотах, его
+        # чтение - лишний SELECT на каждое сохранение; проверку пропускаем
+        if instance.slot_count:
+            logger.debug(f"Sharded product stock updated: {instance.product_id}")
+            return
 
         # Проверяем низкие остатки
-        if instance.available_quantity <= 5:  # Порог низких остатков
+        available = instance.available_quantity
+        if available <= LOW_STOCK_THRESHOLD:
             from apps.notifications.tasks import send_low_stock_alert
-            send_low_stock_alert.delay(instance.product.id, instance.available_quantity)
+            send_low_stock_alert.delay(instance.product_id, available)
 
-        logger.debug(f"Product stock updated: {instance.product.id}, available: {instance.available_quantity}")
+        logger.debug(f"Product stock updated: {instance.product_id}, available: {available}")
 
     except Exception as e:
-        logger.error(f"Error in product_stock_post_save signal: {e}")
\ No newline at end of file
+        logger.error(f"Error in product_stock_post_save signal: {e}")
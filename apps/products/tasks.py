@@ -0,0 +1,69 @@
+from celery import shared_task
+from django.utils import timezone
+from apps.products.inventory import HotInventoryService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True)
+def flush_inventory_counters(self):
+    """
+    Запись накопленных изменений горячих счетчиков в ProductStock
+    """
+    try:
+        service = HotInventoryService()
+        flushed = service.flush()
+
+        return {
+            'status': 'success',
+            'flushed_products': flushed,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error flushing inventory counters: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def reconcile_inventory_counters(self):
+    """
+    Сверка горячих счетчиков в Redis с ProductStock и активными бронями
+    """
+    try:
+        service = HotInventoryService()
+        result = service.reconcile()
+
+        logger.info(f"Inventory counters reconciled: {result}")
+
+        return {
+            'status': 'success',
+            **result,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error reconciling inventory counters: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def rebalance_stock_slots(self):
+    """
+    Перебалансировка слотов шардированных остатков
+    """
+    try:
+        from apps.products.services import ProductService
+
+        rebalanced = ProductService().rebalance_stock_slots()
+
+        return {
+            'status': 'success',
+            'rebalanced_products': rebalanced,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error rebalancing stock slots: {exc}")
+        raise
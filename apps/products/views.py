@@ -8,6 +8,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.core.views import BaseViewSet
+from apps.core.pagination import KeysetPagination
 from apps.products.models import Product, Category, ProductStock
 from apps.products.serializers import (
     ProductDetailSerializer, ProductBriefSerializer,
@@ -39,6 +40,7 @@ class ProductViewSet(BaseViewSet):
     ordering_fields = ['name', 'price', 'created_at']
     ordering = ['-created_at']
     lookup_field = 'slug'
+    keyset_pagination_class = KeysetPagination
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -49,6 +51,13 @@ class ProductViewSet(BaseViewSet):
             return ProductDetailSerializer
         return ProductBriefSerializer
 
+    def perform_update(self, serializer):
+        was_active = serializer.instance.is_active
+        product = serializer.save()
+        # Снятый с продажи товар не должен держать активные брони
+        if was_active and not product.is_active:
+            self.product_service.deactivate_product(product.id)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -216,8 +225,7 @@ class ProductStockViewSet(BaseViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        stock.quantity = new_quantity
-        stock.save()
+        stock = ProductService().update_stock(stock.product_id, new_quantity)
 
         serializer = self.get_serializer(stock)
         return Response(serializer.data)
\ No newline at end of file
@@ -0,0 +1,281 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from typing import Dict, Any, Iterable, Optional, Tuple
+from redis.exceptions import RedisError
+import time
+
+from apps.core.services.base import BaseService
+from apps.core.exceptions import InsufficientStockError, AdmissionQueuedError
+from apps.products.inventory import HotInventoryService
+from apps.products.models import ProductStock
+from apps.reservations.models import Reservation
+
+
+ADMITTED = 'admitted'
+QUEUED = 'queued'
+SOLD_OUT = 'sold_out'
+INSUFFICIENT = 'insufficient'
+
+# Решение о допуске запроса к ReservationService.
+# KEYS: корзина (tokens, inflight, inflight_units, sold_out), очередь
+# (user -> время входа), последние обращения стоящих в очереди (user -> время).
+# ARGV: user_id, quantity, now, queue_timeout, prune_limit.
+# Ответ {код, позиция}: 1 - допущен, 0 - в очереди, -1 - распродано,
+# -2 - корзины нет (нужно заполнить из БД), -3 - запрошено больше, чем
+# может освободиться (вместо позиции - свободные токены).
+ADMIT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {-2, 0}
+end
+if redis.call('HGET', KEYS[1], 'sold_out') == '1' then
+    return {-1, 0}
+end
+
+local now = tonumber(ARGV[3])
+local timeout = tonumber(ARGV[4])
+-- Ушедшие из очереди (не обращались дольше timeout) не держат места
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now - timeout, 'LIMIT', 0, tonumber(ARGV[5]))
+if #stale > 0 then
+    redis.call('ZREM', KEYS[2], unpack(stale))
+    redis.call('ZREM', KEYS[3], unpack(stale))
+end
+
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local inflight_units = tonumber(redis.call('HGET', KEYS[1], 'inflight_units') or 0)
+local quantity = tonumber(ARGV[2])
+local rank = redis.call('ZRANK', KEYS[2], ARGV[1])
+
+-- Запрос больше свободного остатка с учетом запросов в работе не
+-- дождется токенов и не должен занимать место в очереди
+if quantity > tokens + inflight_units then
+    if rank then
+        redis.call('ZREM', KEYS[2], ARGV[1])
+        redis.call('ZREM', KEYS[3], ARGV[1])
+    end
+    return {-3, math.max(tokens, 0)}
+end
+
+local ahead = rank or redis.call('ZCARD', KEYS[2])
+if tokens >= quantity and ahead < tokens then
+    redis.call('HINCRBY', KEYS[1], 'tokens', -quantity)
+    redis.call('HINCRBY', KEYS[1], 'inflight', 1)
+    redis.call('HINCRBY', KEYS[1], 'inflight_units', quantity)
+    if rank then
+        redis.call('ZREM', KEYS[2], ARGV[1])
+        redis.call('ZREM', KEYS[3], ARGV[1])
+    end
+    return {1, 0}
+end
+
+if not rank then
+    redis.call('ZADD', KEYS[2], now, ARGV[1])
+    rank = redis.call('ZRANK', KEYS[2], ARGV[1])
+end
+redis.call('ZADD', KEYS[3], now, ARGV[1])
+redis.call('EXPIRE', KEYS[2], timeout)
+redis.call('EXPIRE', KEYS[3], timeout)
+return {0, rank + 1}
+"""
+
+# Завершение допущенного запроса. ARGV: quantity, succeeded (1/0).
+# Неудачный запрос возвращает токены. Нет ни токенов, ни запросов
+# в работе - весь остаток забронирован, товар распродан.
+COMPLETE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local inflight = redis.call('HINCRBY', KEYS[1], 'inflight', -1)
+if inflight < 0 then
+    -- Корзину сбросили, пока запрос был в работе
+    redis.call('HSET', KEYS[1], 'inflight', 0)
+    inflight = 0
+end
+if redis.call('HINCRBY', KEYS[1], 'inflight_units', -tonumber(ARGV[1])) < 0 then
+    redis.call('HSET', KEYS[1], 'inflight_units', 0)
+end
+local tokens
+if ARGV[2] == '1' then
+    tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+else
+    tokens = redis.call('HINCRBY', KEYS[1], 'tokens', tonumber(ARGV[1]))
+end
+if tokens <= 0 and inflight == 0 then
+    redis.call('HSET', KEYS[1], 'sold_out', 1)
+end
+return 1
+"""
+
+
+class ReservationAdmissionService(BaseService):
+    """
+    Допуск запросов на бронь горячих товаров.
+
+    Перед ReservationService стоит корзина токенов товара в Redis
+    размером с доступный остаток: запрос, забравший токены, идет в БД,
+    остальные получают позицию в виртуальной очереди и повторяют
+    запрос позже (первыми допускаются стоящие в начале очереди).
+    Запрос больше, чем свободные токены вместе с единицами в работе,
+    сразу отклоняется как нехватка остатка.
+    Когда токенов и допущенных запросов в работе не осталось, корзина
+    помечается распроданной и запросы отклоняются без обращения
+    к Postgres. Корзина живет
+    RESERVATION_ADMISSION_BUCKET_TTL секунд и сбрасывается при
+    освобождении остатка, после чего заполняется из БД заново.
+    Без Redis запросы допускаются как раньше.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = settings.RESERVATION_ADMISSION_ENABLED
+        self.inventory = HotInventoryService()
+        self._redis = None
+        self._scripts = {}
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        required_fields = ['user_id', 'product_id', 'quantity']
+        return all(field in data for field in required_fields)
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _script(self, name: str, source: str):
+        if name not in self._scripts:
+            self._scripts[name] = self.redis.register_script(source)
+        return self._scripts[name]
+
+    def _bucket_key(self, product_id: int) -> str:
+        return cache.make_key(f"admission:{product_id}")
+
+    def _queue_keys(self, product_id: int) -> Tuple[str, str]:
+        return (
+            cache.make_key(f"admission_queue:{product_id}"),
+            cache.make_key(f"admission_queue_seen:{product_id}"),
+        )
+
+    def reserve(self, user_id: int, product_id: int, quantity: int,
+                customer_info: Optional[Dict] = None) -> Reservation:
+        """
+        Бронь через контроль допуска.
+
+        InsufficientStockError - товар распродан (без обращения к БД,
+        если это уже известно), AdmissionQueuedError - запрос не допущен,
+        в ошибке позиция в очереди.
+        """
+        from apps.reservations.services import ReservationService
+
+        decision, position = self.admit(product_id, user_id, quantity)
+        if decision == SOLD_OUT:
+            raise InsufficientStockError("Товар распродан")
+        if decision == INSUFFICIENT:
+            raise InsufficientStockError(
+                f"Недостаточно товара. Доступно: {position}, запрошено: {quantity}"
+            )
+        if decision == QUEUED:
+            raise AdmissionQueuedError(position=position)
+
+        try:
+            reservation = ReservationService().create_reservation(
+                user_id=user_id,
+                product_id=product_id,
+                quantity=quantity,
+                customer_info=customer_info
+            )
+        except InsufficientStockError:
+            # Корзина разошлась с остатком - заполняем заново из БД
+            self.reset([product_id])
+            self._prime(product_id)
+            raise
+        except Exception:
+            self.complete(product_id, quantity, succeeded=False)
+            raise
+
+        self.complete(product_id, quantity, succeeded=True)
+        return reservation
+
+    def admit(self, product_id: int, user_id: int, quantity: int) -> Tuple[str, Optional[int]]:
+        """
+        Решение о допуске: (ADMITTED | QUEUED | SOLD_OUT | INSUFFICIENT,
+        позиция в очереди или свободный остаток для INSUFFICIENT).
+        """
+        if not self.enabled:
+            return ADMITTED, None
+
+        try:
+            code, position = self._admit(product_id, user_id, quantity)
+            if code == -2:
+                self._prime(product_id)
+                code, position = self._admit(product_id, user_id, quantity)
+        except RedisError as e:
+            self.logger.warning(f"Admission control unavailable: {e}")
+            return ADMITTED, None
+
+        if code == 1 or code == -2:
+            return ADMITTED, None
+        if code == -1:
+            return SOLD_OUT, None
+        if code == -3:
+            return INSUFFICIENT, position
+        return QUEUED, position
+
+    def _admit(self, product_id: int, user_id: int, quantity: int) -> Tuple[int, int]:
+        queue_key, seen_key = self._queue_keys(product_id)
+        code, position = self._script('admit', ADMIT_SCRIPT)(
+            keys=[self._bucket_key(product_id), queue_key, seen_key],
+            args=[
+                user_id, quantity, time.time(),
+                settings.RESERVATION_ADMISSION_QUEUE_TIMEOUT,
+                settings.RESERVATION_ADMISSION_PRUNE_LIMIT,
+            ]
+        )
+        return int(code), int(position)
+
+    def _prime(self, product_id: int):
+        """Заполнение корзины доступным остатком из горячих счетчиков или БД"""
+        available = self.inventory.get_available(product_id)
+        if available is None:
+            stock = ProductStock.objects.filter(product_id=product_id).first()
+            available = stock.available_quantity if stock is not None else 0
+
+        key = self._bucket_key(product_id)
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hsetnx(key, 'tokens', available)
+            if available <= 0:
+                pipe.hsetnx(key, 'sold_out', 1)
+            pipe.expire(key, settings.RESERVATION_ADMISSION_BUCKET_TTL)
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to prime admission bucket: {e}")
+
+    def complete(self, product_id: int, quantity: int, succeeded: bool):
+        """Завершение допущенного запроса (неудачный возвращает токены)"""
+        if not self.enabled:
+            return
+        try:
+            self._script('complete', COMPLETE_SCRIPT)(
+                keys=[self._bucket_key(product_id)],
+                args=[quantity, 1 if succeeded else 0]
+            )
+        except RedisError as e:
+            self.logger.warning(f"Failed to complete admission request: {e}")
+
+    def reset(self, product_ids: Iterable[int]):
+        """Сброс корзин: следующий запрос заполнит их из БД"""
+        keys = [self._bucket_key(product_id) for product_id in product_ids]
+        if not self.enabled or not keys:
+            return
+        try:
+            self.redis.delete(*keys)
+        except RedisError as e:
+            self.logger.warning(f"Failed to reset admission buckets: {e}")
+
+    def notify_stock_released(self, product_ids: Iterable[int]):
+        """Остаток освободился или пополнен: корзины сбрасываются после commit"""
+        product_ids = list(product_ids)
+        if product_ids:
+            transaction.on_commit(lambda: self.reset(product_ids))
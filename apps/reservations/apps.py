@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReservationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reservations'
+
+    def ready(self):
+        # Регистрация обработчиков доменных событий
+        from apps.reservations import events  # noqa: F401
@@ -0,0 +1,207 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import gzip
+import json
+import uuid
+
+from apps.core.services.base import BaseService
+from apps.reservations.stats import ReservationStatsService
+from apps.reservations.models import (
+    Reservation, ReservationStatus, WaitlistEntry,
+    ReservationArchiveSegment, ReservationArchiveEntry
+)
+
+
+TERMINAL_STATUSES = (
+    ReservationStatus.CONFIRMED,
+    ReservationStatus.CANCELLED,
+    ReservationStatus.EXPIRED,
+)
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'product_id', 'product__name', 'product__sku', 'quantity',
+    'status', 'price_per_item', 'total_price', 'expires_at', 'created_at',
+    'updated_at', 'confirmed_at', 'cancelled_at', 'notes', 'customer_info',
+)
+
+
+class ArchivedHistory:
+    """
+    Архивная история пользователя как последовательность для Paginator.
+
+    Длина считается по индексу, а при взятии среза распаковываются
+    только блоки, в которые попадает страница.
+    """
+
+    def __init__(self, service: 'ReservationArchiveService', user_id: int,
+                 status: Optional[str] = None):
+        self.service = service
+        self.status = status
+        self.entries = list(
+            ReservationArchiveEntry.objects.select_related('segment').filter(
+                user_id=user_id
+            ).order_by('-max_created_at', '-id')
+        )
+
+    def _entry_count(self, entry: ReservationArchiveEntry) -> int:
+        if self.status is None:
+            return entry.row_count
+        return entry.status_counts.get(self.status, 0)
+
+    def __len__(self):
+        return sum(self._entry_count(entry) for entry in self.entries)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+
+        start, stop, _ = item.indices(len(self))
+        rows, position = [], 0
+        for entry in self.entries:
+            count = self._entry_count(entry)
+            if count and position + count > start and position < stop:
+                entry_rows = self.service.read_entry(entry)
+                if self.status is not None:
+                    entry_rows = [row for row in entry_rows if row['status'] == self.status]
+                rows.extend(entry_rows[max(start - position, 0):stop - position])
+            position += count
+            if position >= stop:
+                break
+        return rows
+
+
+class ReservationArchiveService(BaseService):
+    """
+    Перенос завершенных броней в архив.
+
+    Подтвержденные, отмененные и истекшие брони старше
+    RESERVATION_ARCHIVE_AFTER_DAYS пачками выгружаются в сжатые
+    NDJSON-сегменты и удаляются из таблицы reservations. Для каждого
+    пользователя в сегменте сохраняется запись индекса (смещение,
+    длина блока, число броней по статусам), по которой история
+    пользователя читается постранично без распаковки всего архива.
+    """
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return True
+
+    @property
+    def root(self) -> Path:
+        return Path(settings.RESERVATION_ARCHIVE_DIR)
+
+    def archive(self, older_than_days: int = None, chunk_size: int = None) -> int:
+        """Архивация всех подходящих броней. Возвращает число перенесенных"""
+        older_than_days = (
+            settings.RESERVATION_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        )
+        chunk_size = chunk_size or settings.RESERVATION_ARCHIVE_CHUNK_SIZE
+        before = timezone.now() - timedelta(days=older_than_days)
+
+        total = 0
+        while True:
+            count = self.archive_chunk(before, chunk_size)
+            total += count
+            if count < chunk_size:
+                break
+
+        if total:
+            self.logger.info(f"Archived {total} reservations created before {before.isoformat()}")
+        return total
+
+    @transaction.atomic
+    def archive_chunk(self, before, chunk_size: int) -> int:
+        """
+        Перенос одной пачки броней в новый сегмент.
+
+        Файл пишется до удаления строк в той же транзакции; при ошибке
+        транзакция откатывается, а недописанный файл удаляется.
+        """
+        rows = list(
+            Reservation.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                status__in=TERMINAL_STATUSES,
+                created_at__lt=before
+            ).order_by('user_id', '-created_at').values(*ARCHIVE_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return 0
+
+        now = timezone.now()
+        path = self.root / f"{now:%Y/%m}" / f"segment-{now:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            entries = self._write_segment(path, rows)
+
+            segment = ReservationArchiveSegment.objects.create(
+                path=str(path.relative_to(self.root)),
+                row_count=len(rows),
+                size_bytes=path.stat().st_size,
+                min_created_at=min(row['created_at'] for row in rows),
+                max_created_at=max(row['created_at'] for row in rows)
+            )
+            for entry in entries:
+                entry.segment = segment
+            ReservationArchiveEntry.objects.bulk_create(entries)
+
+            reservation_ids = [row['id'] for row in rows]
+            WaitlistEntry.objects.filter(reservation_id__in=reservation_ids).update(reservation=None)
+            Reservation.objects.delete_archived(reservation_ids, before)
+            ReservationStatsService().record_removed(rows)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+
+        return len(rows)
+
+    def _write_segment(self, path: Path, rows: List[Dict[str, Any]]) -> List[ReservationArchiveEntry]:
+        """Запись сегмента: отдельный gzip-блок на каждого пользователя"""
+        entries = []
+        offset = 0
+        with open(path, 'wb') as segment_file:
+            for user_id, user_rows in groupby(rows, key=lambda row: row['user_id']):
+                user_rows = list(user_rows)
+                payload = ''.join(
+                    json.dumps(self._archive_row(row), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+                    for row in user_rows
+                ).encode('utf-8')
+                block = gzip.compress(payload)
+                segment_file.write(block)
+
+                status_counts: Dict[str, int] = {}
+                for row in user_rows:
+                    status_counts[row['status']] = status_counts.get(row['status'], 0) + 1
+
+                entries.append(ReservationArchiveEntry(
+                    user_id=user_id,
+                    offset=offset,
+                    length=len(block),
+                    row_count=len(user_rows),
+                    status_counts=status_counts,
+                    min_created_at=user_rows[-1]['created_at'],
+                    max_created_at=user_rows[0]['created_at']
+                ))
+                offset += len(block)
+        return entries
+
+    def _archive_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        row['product_name'] = row.pop('product__name')
+        row['product_sku'] = row.pop('product__sku')
+        return row
+
+    def read_entry(self, entry: ReservationArchiveEntry) -> List[Dict[str, Any]]:
+        """Брони пользователя из одного блока сегмента (по убыванию created_at)"""
+        with open(self.root / entry.segment.path, 'rb') as segment_file:
+            segment_file.seek(entry.offset)
+            block = segment_file.read(entry.length)
+        return [json.loads(line) for line in gzip.decompress(block).decode('utf-8').splitlines()]
+
+    def user_history(self, user_id: int, status: Optional[str] = None) -> ArchivedHistory:
+        """Архивная история пользователя для постраничного чтения"""
+        return ArchivedHistory(self, user_id, status)
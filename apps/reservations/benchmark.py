@@ -0,0 +1,360 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connections, DatabaseError
+from django.db.models import Sum
+from typing import Dict, Any, List, Optional
+import math
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+
+from apps.core.services.base import BaseService
+from apps.core.exceptions import BusinessLogicError, InsufficientStockError, AdmissionQueuedError
+from apps.products.inventory import HotInventoryService
+from apps.products.models import Category, Product, ProductStock
+from apps.reservations.models import Reservation, ReservationStatus
+
+
+OPERATIONS = ('create', 'confirm', 'cancel')
+
+# SQLSTATE взаимной блокировки и ошибки сериализации в Postgres
+DEADLOCK_SQLSTATE = '40P01'
+SERIALIZATION_SQLSTATE = '40001'
+
+
+def percentile(values: List[float], share: float) -> Optional[float]:
+    """Перцентиль по ближайшему рангу для отсортированного списка"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(share * len(values)) - 1))
+    return values[index]
+
+
+def _sqlstate(error: Exception) -> Optional[str]:
+    cause = error.__cause__ or error
+    return getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+
+
+def _run_worker(options: Dict[str, Any], worker_index: int, deadline: float) -> Dict[str, Any]:
+    """
+    Цикл одного воркера: случайные операции над общим набором товаров.
+
+    Подтверждаются и отменяются только брони, созданные этим же
+    воркером, поэтому воркеры конкурируют за остаток, а не за брони.
+    """
+    from apps.reservations.services import ReservationService
+    from apps.reservations.admission import ReservationAdmissionService
+
+    service = ReservationService()
+    # Создание через контроль допуска, как в API
+    create = ReservationAdmissionService().reserve if options['admission'] else service.create_reservation
+    rng = random.Random(options['seed'] + worker_index)
+    weights = [options['mix'][operation] for operation in OPERATIONS]
+
+    latencies = {operation: [] for operation in OPERATIONS}
+    outcomes = {operation: {} for operation in OPERATIONS}
+    pending = []
+
+    try:
+        for _ in range(options['operations']):
+            if time.monotonic() >= deadline:
+                break
+
+            operation = rng.choices(OPERATIONS, weights)[0]
+            if operation != 'create' and not pending:
+                operation = 'create'
+
+            started = time.perf_counter()
+            try:
+                if operation == 'create':
+                    if rng.random() < options['hot_ratio'] or not options['cold_product_ids']:
+                        product_id = rng.choice(options['hot_product_ids'])
+                    else:
+                        product_id = rng.choice(options['cold_product_ids'])
+                    user_id = rng.choice(options['user_ids'])
+                    reservation = create(
+                        user_id=user_id, product_id=product_id, quantity=options['quantity']
+                    )
+                    pending.append((reservation.id, user_id))
+                else:
+                    reservation_id, user_id = pending.pop(rng.randrange(len(pending)))
+                    if operation == 'confirm':
+                        service.confirm_reservation(reservation_id, user_id)
+                    else:
+                        service.cancel_reservation(reservation_id, user_id)
+                outcome = 'ok'
+            except InsufficientStockError:
+                outcome = 'sold_out'
+            except AdmissionQueuedError:
+                outcome = 'queued'
+            except BusinessLogicError:
+                outcome = 'rejected'
+            except DatabaseError as e:
+                sqlstate = _sqlstate(e)
+                if sqlstate == DEADLOCK_SQLSTATE:
+                    outcome = 'deadlock'
+                elif sqlstate == SERIALIZATION_SQLSTATE:
+                    outcome = 'serialization_failure'
+                else:
+                    outcome = 'db_error'
+
+            latencies[operation].append(time.perf_counter() - started)
+            outcomes[operation][outcome] = outcomes[operation].get(outcome, 0) + 1
+    finally:
+        # Соединения потока/процесса не переживают воркер
+        connections.close_all()
+
+    return {'latencies': latencies, 'outcomes': outcomes}
+
+
+class LockWaitSampler(threading.Thread):
+    """
+    Оценка суммарного ожидания блокировок по выборкам pg_stat_activity:
+    каждые interval секунд число сессий БД, ждущих тяжелую блокировку,
+    умножается на интервал.
+    """
+
+    def __init__(self, interval: float = 0.01, using: str = 'default'):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.using = using
+        self.lock_wait_seconds = 0.0
+        self.max_waiters = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            with connections[self.using].cursor() as cursor:
+                while not self._stop_event.is_set():
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND wait_event_type = 'Lock' "
+                        "AND pid <> pg_backend_pid()"
+                    )
+                    waiters = cursor.fetchone()[0]
+                    self.lock_wait_seconds += waiters * self.interval
+                    self.max_waiters = max(self.max_waiters, waiters)
+                    self._stop_event.wait(self.interval)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class FlashSaleBenchmark(BaseService):
+    """
+    Нагрузочный стенд распродажи для ReservationService.
+
+    Создает отдельный набор пользователей и товаров (горячие с малым
+    остатком и холодные), запускает N потоков или процессов со смесью
+    create/confirm/cancel (создание напрямую или через контроль
+    допуска) против локального Postgres и считает
+    пропускную способность, p50/p99 задержек по операциям, оценку
+    ожидания блокировок, взаимные блокировки и нарушения остатка
+    (перепродажу). Результаты разных стратегий блокировок сравнимы
+    при одинаковых параметрах и seed.
+    """
+
+    DEFAULTS = {
+        'workers': 16,
+        'mode': 'thread',
+        'operations': 200,
+        'duration': 60.0,
+        'users': 500,
+        'hot_products': 1,
+        'cold_products': 20,
+        'hot_stock': 100,
+        'cold_stock': 1000,
+        'hot_ratio': 0.9,
+        'quantity': 1,
+        'mix': {'create': 70, 'confirm': 20, 'cancel': 10},
+        'seed': 0,
+        'admission': False,
+        'sample_interval': 0.01,
+    }
+
+    def __init__(self, **options):
+        super().__init__()
+        self.options = {**self.DEFAULTS, **{key: value for key, value in options.items() if value is not None}}
+        self.run_id = uuid.uuid4().hex[:8]
+        self.inventory = HotInventoryService()
+        self.category = None
+        self.initial_stock: Dict[int, int] = {}
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return data.get('mode') in ('thread', 'process') and data.get('workers', 0) > 0
+
+    def setup(self):
+        """Создание пользователей, товаров и остатков стенда"""
+        if not self.validate_data(self.options):
+            raise BusinessLogicError("Некорректные параметры нагрузочного стенда")
+
+        prefix = f"bench-{self.run_id}"
+        User = get_user_model()
+        users = User.objects.bulk_create([
+            User(username=f"{prefix}-{index}", email=f"{prefix}-{index}@bench.local")
+            for index in range(self.options['users'])
+        ])
+
+        self.category = Category.objects.create(name=f"Benchmark {self.run_id}", slug=prefix)
+        products = Product.objects.bulk_create([
+            Product(
+                name=f"Benchmark product {index}",
+                slug=f"{prefix}-{index}",
+                sku=f"BENCH-{self.run_id}-{index}",
+                category=self.category,
+                price=Decimal('100.00')
+            )
+            for index in range(self.options['hot_products'] + self.options['cold_products'])
+        ])
+        hot = products[:self.options['hot_products']]
+        ProductStock.objects.bulk_create([
+            ProductStock(
+                product=product,
+                quantity=self.options['hot_stock'] if product in hot else self.options['cold_stock']
+            )
+            for product in products
+        ])
+
+        self.initial_stock = {
+            product.id: self.options['hot_stock'] if product in hot else self.options['cold_stock']
+            for product in products
+        }
+        self.options.update(
+            user_ids=[user.id for user in users],
+            hot_product_ids=[product.id for product in hot],
+            cold_product_ids=[product.id for product in products[len(hot):]],
+        )
+
+    def run(self) -> Dict[str, Any]:
+        """Прогон нагрузки. Возвращает сводку метрик"""
+        if not self.initial_stock:
+            self.setup()
+
+        workers = self.options['workers']
+        payload = self.worker_options()
+
+        if self.options['mode'] == 'process':
+            # Дочерние процессы не должны наследовать открытые соединения
+            connections.close_all()
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+        else:
+            executor = ThreadPoolExecutor(workers)
+
+        sampler = LockWaitSampler(self.options['sample_interval'])
+        sampler.start()
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.options['duration']
+        with executor:
+            results = list(executor.map(
+                _run_worker, [payload] * workers, range(workers), [deadline] * workers
+            ))
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+
+        report = self._report(results, elapsed)
+        report['lock_wait_seconds'] = round(sampler.lock_wait_seconds, 3)
+        report['max_lock_waiters'] = sampler.max_waiters
+        report.update(self.check_stock())
+
+        self.logger.info(
+            f"Benchmark {self.run_id}: {report['throughput']} ops/s, "
+            f"{report['deadlocks']} deadlocks, {len(report['oversold'])} oversold products"
+        )
+        return report
+
+    def worker_options(self) -> Dict[str, Any]:
+        """Параметры, передаваемые каждому воркеру"""
+        return {
+            key: self.options[key]
+            for key in ('operations', 'hot_ratio', 'quantity', 'mix', 'seed', 'admission',
+                        'user_ids', 'hot_product_ids', 'cold_product_ids')
+        }
+
+    def _report(self, results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        operations = {}
+        all_latencies = []
+        total_ok = 0
+        deadlocks = 0
+        for operation in OPERATIONS:
+            latencies = sorted(
+                latency for result in results for latency in result['latencies'][operation]
+            )
+            outcomes: Dict[str, int] = {}
+            for result in results:
+                for outcome, count in result['outcomes'][operation].items():
+                    outcomes[outcome] = outcomes.get(outcome, 0) + count
+
+            all_latencies.extend(latencies)
+            total_ok += outcomes.get('ok', 0)
+            deadlocks += outcomes.get('deadlock', 0)
+            operations[operation] = {
+                'count': len(latencies),
+                'outcomes': outcomes,
+                'p50_ms': self._ms(percentile(latencies, 0.5)),
+                'p99_ms': self._ms(percentile(latencies, 0.99)),
+            }
+
+        all_latencies.sort()
+        return {
+            'run_id': self.run_id,
+            'mode': self.options['mode'],
+            'workers': self.options['workers'],
+            'elapsed_seconds': round(elapsed, 3),
+            'operations': operations,
+            'total': len(all_latencies),
+            'succeeded': total_ok,
+            'throughput': round(total_ok / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': self._ms(percentile(all_latencies, 0.5)),
+            'p99_ms': self._ms(percentile(all_latencies, 0.99)),
+            'deadlocks': deadlocks,
+        }
+
+    def _ms(self, seconds: Optional[float]) -> Optional[float]:
+        return None if seconds is None else round(seconds * 1000, 2)
+
+    def check_stock(self) -> Dict[str, Any]:
+        """
+        Проверка остатков стенда после прогона.
+
+        Перепродажа - активных (ожидающих и подтвержденных) броней
+        товара больше исходного остатка. Расхождение - доступный
+        остаток ProductStock не равен исходному за вычетом активных
+        броней (ошибка учета без перепродажи).
+        """
+        if self.inventory.enabled:
+            # Горячие счетчики записываются в ProductStock отложенно
+            self.inventory.flush()
+
+        active = dict(
+            Reservation.objects.filter(
+                product_id__in=self.initial_stock,
+                status__in=[ReservationStatus.PENDING, ReservationStatus.CONFIRMED]
+            ).values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+        )
+
+        oversold, drift = [], []
+        for stock in ProductStock.objects.filter(product_id__in=self.initial_stock):
+            initial = self.initial_stock[stock.product_id]
+            reserved = active.get(stock.product_id, 0)
+            if reserved > initial:
+                oversold.append({'product_id': stock.product_id, 'stock': initial, 'reserved': reserved})
+            if stock.available_quantity != initial - reserved:
+                drift.append({
+                    'product_id': stock.product_id,
+                    'expected_available': initial - reserved,
+                    'available': stock.available_quantity,
+                })
+        return {'oversold': oversold, 'stock_drift': drift}
+
+    def cleanup(self):
+        """Удаление данных стенда"""
+        Reservation.objects.filter(product_id__in=self.initial_stock).delete()
+        get_user_model().objects.filter(id__in=self.options.get('user_ids', [])).delete()
+        if self.category is not None:
+            self.category.delete()
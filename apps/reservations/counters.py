@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from typing import Dict, Any, Iterable
+from redis.exceptions import RedisError
+
+from apps.core.services.base import BaseService
+from apps.core.exceptions import BusinessLogicError
+from apps.reservations.models import UserReservationCounters
+
+
+# Запись зеркала счетчиков: значения с более старой версией строки
+# (commit, который завершился раньше, но дошел до Redis позже) не
+# перезаписывают более новые
+MIRROR_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'version')
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class ReservationCounterService(BaseService):
+    """
+    Счетчики броней пользователя по статусам с зеркалом в Redis.
+
+    Источник истины - строка user_reservation_counters, которая
+    меняется в транзакции смены статуса. После commit значения
+    копируются в хеш Redis вместе с версией строки, откуда их читают
+    проверка прав, статистика и сериализаторы без обращения к БД.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._redis = None
+        self._mirror_script = None
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return 'user_id' in data
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _key(self, user_id: int) -> str:
+        return cache.make_key(f"user_reservation_counters:{user_id}")
+
+    def acquire_pending(self, user_id: int, count: int = 1):
+        """Резервирование места под активные брони с проверкой лимита"""
+        limit = settings.MAX_RESERVATION_PER_USER
+        counters = None
+        if count <= limit:
+            counters = UserReservationCounters.objects.try_acquire_pending(user_id, count, limit)
+
+        if counters is None:
+            raise BusinessLogicError(f"Превышен лимит активных броней: {limit}")
+
+        self._mirror_on_commit({user_id: counters})
+
+    def release_pending(self, counts: Dict[int, int]):
+        """Возврат мест, занятых acquire_pending под брони, которые не созданы"""
+        deltas = {user_id: {'pending': -count} for user_id, count in counts.items() if count}
+        if deltas:
+            self._mirror_on_commit(UserReservationCounters.objects.apply_deltas(deltas))
+
+    def record_transitions(self, transitions: Iterable):
+        """
+        Учет смены статусов: transitions - пары (user_id, (from_status, to_status)).
+        """
+        deltas: Dict[int, Dict[str, int]] = {}
+        for user_id, (from_status, to_status) in transitions:
+            user_deltas = deltas.setdefault(user_id, {})
+            user_deltas[from_status] = user_deltas.get(from_status, 0) - 1
+            user_deltas[to_status] = user_deltas.get(to_status, 0) + 1
+
+        self._mirror_on_commit(UserReservationCounters.objects.apply_deltas(deltas))
+
+    def record_transition(self, user_id: int, from_status: str, to_status: str):
+        self.record_transitions([(user_id, (from_status, to_status))])
+
+    def get(self, user_id: int) -> Dict[str, int]:
+        """Счетчики пользователя: из Redis, при промахе - из БД"""
+        try:
+            mirrored = self.redis.hgetall(self._key(user_id))
+            if mirrored:
+                return {
+                    field: int(mirrored[field.encode()])
+                    for field in UserReservationCounters.objects.STATUS_FIELDS
+                }
+        except RedisError as e:
+            self.logger.warning(f"Failed to read reservation counters from Redis: {e}")
+
+        try:
+            row = UserReservationCounters.objects.get(user_id=user_id)
+            counters = {**row.as_dict(), 'version': row.version}
+        except UserReservationCounters.DoesNotExist:
+            counters = UserReservationCounters.objects.apply_deltas({user_id: {}})[user_id]
+
+        self._mirror({user_id: counters})
+        return {field: counters[field] for field in UserReservationCounters.objects.STATUS_FIELDS}
+
+    def rebuild(self) -> int:
+        """Пересчет всех счетчиков и сброс зеркала"""
+        with transaction.atomic():
+            user_ids = UserReservationCounters.objects.rebuild()
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.delete(self._key(user_id))
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to reset reservation counters mirror: {e}")
+
+        return len(user_ids)
+
+    def _mirror_on_commit(self, counters: Dict[int, Dict[str, int]]):
+        if counters:
+            transaction.on_commit(lambda: self._mirror(counters))
+
+    def _mirror(self, counters: Dict[int, Dict[str, int]]):
+        try:
+            if self._mirror_script is None:
+                self._mirror_script = self.redis.register_script(MIRROR_SCRIPT)
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id, values in counters.items():
+                fields = [
+                    item for field in UserReservationCounters.objects.STATUS_FIELDS
+                    for item in (field, values[field])
+                ]
+                self._mirror_script(
+                    keys=[self._key(user_id)],
+                    args=[values['version'], settings.RESERVATION_COUNTERS_MIRROR_TTL, *fields],
+                    client=pipe
+                )
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to mirror reservation counters to Redis: {e}")
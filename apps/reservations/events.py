@@ -0,0 +1,130 @@
+"""
+Обработчики доменных событий бронирований.
+
+Уведомления пишутся в outbox в той же транзакции, аналитика и
+read-модель списка броней в Redis обновляются после commit.
+"""
+from apps.core.events import dispatcher
+from apps.notifications.services import NotificationService
+from apps.analytics.services import AnalyticsService
+from apps.reservations.read_model import ReservationReadModel
+
+
+@dispatcher.on('reservation_created')
+def publish_reservation_created(reservation):
+    NotificationService().send_reservation_created(reservation)
+
+
+@dispatcher.on('reservation_created', after_commit=True)
+def track_reservation_created(reservation):
+    AnalyticsService().track_reservation_created(reservation)
+
+
+@dispatcher.on('reservations_batch_created')
+def publish_reservations_batch_created(reservations):
+    NotificationService().send_reservations_batch_created(reservations)
+
+
+@dispatcher.on('reservations_batch_created', after_commit=True)
+def track_reservations_batch_created(reservations):
+    AnalyticsService().track_reservations_created(reservations)
+
+
+@dispatcher.on('reservation_confirmed')
+def publish_reservation_confirmed(reservation):
+    NotificationService().send_reservation_confirmed(reservation)
+
+
+@dispatcher.on('reservation_confirmed', after_commit=True)
+def track_reservation_confirmed(reservation):
+    AnalyticsService().track_reservation_confirmed(reservation)
+
+
+@dispatcher.on('reservations_confirmed')
+def publish_reservations_confirmed(reservations):
+    NotificationService().send_reservations_confirmed(reservations)
+
+
+@dispatcher.on('reservations_confirmed', after_commit=True)
+def track_reservations_confirmed(reservations):
+    AnalyticsService().track_reservations_confirmed(reservations)
+
+
+@dispatcher.on('reservation_cancelled')
+def publish_reservation_cancelled(reservation):
+    NotificationService().send_reservation_cancelled(reservation)
+
+
+@dispatcher.on('reservation_cancelled', after_commit=True)
+def track_reservation_cancelled(reservation):
+    AnalyticsService().track_reservation_cancelled(reservation)
+
+
+@dispatcher.on('reservations_cancelled')
+def publish_reservations_cancelled(reservations):
+    NotificationService().send_reservations_cancelled(reservations)
+
+
+@dispatcher.on('reservations_cancelled', after_commit=True)
+def track_reservations_cancelled(reservations):
+    AnalyticsService().track_reservations_cancelled(reservations)
+
+
+@dispatcher.on('reservations_reduced')
+def publish_reservations_reduced(reservations):
+    NotificationService().send_reservations_reduced(reservations)
+
+
+@dispatcher.on('reservation_expired')
+def publish_reservation_expired(reservation):
+    NotificationService().send_reservations_expired([reservation])
+
+
+@dispatcher.on('reservation_expired', after_commit=True)
+def track_reservation_expired(reservation):
+    AnalyticsService().track_reservations_expired([reservation])
+
+
+@dispatcher.on('reservations_expired')
+def publish_reservations_expired(reservations):
+    NotificationService().send_reservations_expired(reservations)
+
+
+@dispatcher.on('reservations_expired', after_commit=True)
+def track_reservations_expired(reservations):
+    AnalyticsService().track_reservations_expired(reservations)
+
+
+@dispatcher.on('waitlist_allocated')
+def publish_waitlist_allocated(entries):
+    NotificationService().send_waitlist_allocated(entries)
+
+
+@dispatcher.on('reservation_created', after_commit=True)
+def view_reservation_created(reservation):
+    ReservationReadModel().record_created([reservation])
+
+
+@dispatcher.on('reservations_batch_created', after_commit=True)
+def view_reservations_batch_created(reservations):
+    ReservationReadModel().record_created(reservations)
+
+
+@dispatcher.on('reservation_confirmed', after_commit=True)
+@dispatcher.on('reservation_cancelled', after_commit=True)
+@dispatcher.on('reservation_expired', after_commit=True)
+def view_reservation_transition(reservation):
+    ReservationReadModel().record_transitions([reservation])
+
+
+@dispatcher.on('reservations_confirmed', after_commit=True)
+@dispatcher.on('reservations_cancelled', after_commit=True)
+@dispatcher.on('reservations_expired', after_commit=True)
+def view_reservations_transition(reservations):
+    ReservationReadModel().record_transitions(reservations)
+
+
+@dispatcher.on('reservations_reduced', after_commit=True)
+def view_reservations_reduced(reservations):
+    # Количество и сумма не патчатся - представление пересоберется при чтении
+    ReservationReadModel().invalidate(*{reservation.user_id for reservation in reservations})
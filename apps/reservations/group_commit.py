@@ -0,0 +1,216 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from typing import Dict, Any, List, Optional
+from redis.exceptions import RedisError
+import json
+import uuid
+
+from apps.core.services.base import BaseService
+from apps.core.exceptions import BaseBusinessException, BusinessLogicError
+from apps.reservations.services import ReservationService
+
+
+# Забираем из очереди товара пачку заявок; пустой товар убираем из списка ожидающих
+POP_BATCH_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+end
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[2])
+end
+return items
+"""
+
+# Снимаем блокировку товара, только если она еще наша
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+QUEUED = 'queued'
+RESERVED = 'reserved'
+REJECTED = 'rejected'
+
+
+class ReservationGroupCommitService(BaseService):
+    """
+    Асинхронные брони с групповой фиксацией по товару.
+
+    POST /api/reservations/?async=1 кладет заявку в список Redis своего
+    товара и сразу отвечает квитанцией. Обработчик (команда
+    reservation_group_commit_worker) каждые несколько миллисекунд
+    забирает накопившиеся заявки товара и создает брони одной
+    транзакцией с одним изменением остатка, поэтому распродажа одного
+    товара не выстраивает очередь транзакций на строке product_stocks.
+
+    Результат записывается в квитанцию (GET /api/reservations/tickets/<id>/)
+    и публикуется в канал пользователя reservation_tickets:<user_id>.
+    Заявки, забранные обработчиком, который упал до фиксации, теряются:
+    квитанция остается в статусе queued до истечения срока хранения.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._redis = None
+        self._pop_batch = None
+        self._release_lock = None
+        self.reservation_service = ReservationService()
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return all(field in data for field in ('user_id', 'product_id', 'quantity'))
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _queue_key(self, product_id: int) -> str:
+        return cache.make_key(f"reservation_requests:{product_id}")
+
+    def _products_key(self) -> str:
+        return cache.make_key('reservation_request_products')
+
+    def _lock_key(self, product_id: int) -> str:
+        return cache.make_key(f"reservation_requests_lock:{product_id}")
+
+    def _ticket_key(self, ticket: str) -> str:
+        return cache.make_key(f"reservation_ticket:{ticket}")
+
+    def _channel(self, user_id: int) -> str:
+        return cache.make_key(f"reservation_tickets:{user_id}")
+
+    def submit(self, user_id: int, product_id: int, quantity: int,
+               customer_info: Optional[Dict] = None) -> Optional[str]:
+        """
+        Постановка заявки в очередь товара. Возвращает номер квитанции
+        или None, если Redis недоступен и бронировать нужно синхронно.
+        """
+        ticket = uuid.uuid4().hex
+        request = {
+            'ticket': ticket,
+            'user_id': user_id,
+            'quantity': quantity,
+            'customer_info': customer_info or {},
+        }
+
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(self._ticket_key(ticket), mapping={
+                'status': QUEUED,
+                'user_id': user_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'created_at': timezone.now().isoformat(),
+            })
+            pipe.expire(self._ticket_key(ticket), settings.RESERVATION_GROUP_COMMIT_TICKET_TTL)
+            pipe.rpush(self._queue_key(product_id), json.dumps(request, ensure_ascii=False))
+            pipe.sadd(self._products_key(), product_id)
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to enqueue reservation request: {e}")
+            return None
+
+        return ticket
+
+    def get_ticket(self, ticket: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """Состояние заявки или None, если квитанции нет или она чужая"""
+        try:
+            data = self.redis.hgetall(self._ticket_key(ticket))
+        except RedisError as e:
+            self.logger.warning(f"Failed to read reservation ticket: {e}")
+            return None
+
+        data = {field.decode(): value.decode() for field, value in data.items()}
+        # Квитанция без владельца - результат, записанный после истечения срока
+        if data.get('user_id') != str(user_id):
+            return None
+
+        return {
+            'ticket': ticket,
+            'status': data['status'],
+            'product_id': int(data['product_id']),
+            'quantity': int(data['quantity']),
+            'reservation_id': data.get('reservation_id'),
+            'error': data.get('error'),
+            'code': data.get('code'),
+            'created_at': data['created_at'],
+            'processed_at': data.get('processed_at'),
+        }
+
+    def pending_products(self) -> List[int]:
+        """Товары, в очередях которых есть заявки"""
+        return [int(product_id) for product_id in self.redis.smembers(self._products_key())]
+
+    def run_once(self, batch_size: Optional[int] = None) -> int:
+        """Один проход по всем товарам с заявками. Возвращает число обработанных заявок"""
+        batch_size = batch_size or settings.RESERVATION_GROUP_COMMIT_BATCH_SIZE
+        return sum(self.drain(product_id, batch_size) for product_id in self.pending_products())
+
+    def drain(self, product_id: int, batch_size: Optional[int] = None) -> int:
+        """
+        Обработка пачки заявок одного товара одной транзакцией.
+
+        Товар обрабатывает один обработчик за раз (блокировка в Redis),
+        поэтому заявки применяются в порядке поступления.
+        """
+        batch_size = batch_size or settings.RESERVATION_GROUP_COMMIT_BATCH_SIZE
+        token = uuid.uuid4().hex
+        if not self.redis.set(self._lock_key(product_id), token, nx=True,
+                              ex=settings.RESERVATION_GROUP_COMMIT_LOCK_TIMEOUT):
+            return 0
+
+        try:
+            if self._pop_batch is None:
+                self._pop_batch = self.redis.register_script(POP_BATCH_SCRIPT)
+            requests = [
+                json.loads(item) for item in self._pop_batch(
+                    keys=[self._queue_key(product_id), self._products_key()],
+                    args=[batch_size, product_id]
+                )
+            ]
+            if not requests:
+                return 0
+
+            try:
+                results = self.reservation_service.create_product_reservations(product_id, requests)
+            except BaseBusinessException as e:
+                results = [e] * len(requests)
+            except Exception as e:
+                self.logger.error(f"Failed to process reservation requests for product {product_id}: {e}")
+                results = [BusinessLogicError("Не удалось обработать заявку на бронь")] * len(requests)
+
+            self._publish(requests, results)
+            return len(requests)
+        finally:
+            if self._release_lock is None:
+                self._release_lock = self.redis.register_script(RELEASE_LOCK_SCRIPT)
+            self._release_lock(keys=[self._lock_key(product_id)], args=[token])
+
+    def _publish(self, requests: List[Dict[str, Any]], results: List[Any]):
+        """Запись результатов в квитанции и публикация в каналы пользователей"""
+        processed_at = timezone.now().isoformat()
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for request, result in zip(requests, results):
+                if isinstance(result, BaseBusinessException):
+                    outcome = {'status': REJECTED, 'error': result.message, 'code': result.code}
+                else:
+                    outcome = {'status': RESERVED, 'reservation_id': str(result.id)}
+                outcome['processed_at'] = processed_at
+
+                ticket_key = self._ticket_key(request['ticket'])
+                pipe.hset(ticket_key, mapping=outcome)
+                pipe.expire(ticket_key, settings.RESERVATION_GROUP_COMMIT_TICKET_TTL)
+                pipe.publish(
+                    self._channel(request['user_id']),
+                    json.dumps({'ticket': request['ticket'], **outcome}, ensure_ascii=False)
+                )
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to publish reservation request results: {e}")
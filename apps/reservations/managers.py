@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, connections
 from django.utils import timezone
 from datetime import timedelta
 
@@ -74,4 +74,519 @@ class ReservationManager(models.Manager):
             total_revenue=models.Sum('total_price'),
             count=models.Count('id'),
             avg_order_value=models.Avg('total_price')
-        )
\ No newline at end of file
+        )
+
+    def hot_window_start(self):
+        """
+        Нижняя граница created_at для активных броней.
+
+        Бронь живет RESERVATION_TIMEOUT_MINUTES, поэтому активные брони
+        лежат в последних партициях; условие по created_at позволяет
+        Postgres не просматривать остальные.
+        """
+        from django.conf import settings
+        return timezone.now() - timedelta(hours=settings.RESERVATION_HOT_WINDOW_HOURS)
+
+    def claim_expired(self, now, limit, reservation_ids=None, since=None):
+        """
+        Перевод пачки просроченных броней в статус expired одним запросом.
+
+        Строки выбираются через FOR UPDATE SKIP LOCKED, поэтому несколько
+        обработчиков могут работать параллельно, не ожидая друг друга.
+        Возвращает список переведенных броней (только основные поля).
+        since ограничивает поиск бронями, созданными не раньше этого момента.
+        """
+        from apps.reservations.models import ReservationStatus
+
+        table = self.model._meta.db_table
+        field_names = [
+            'id', 'user_id', 'product_id', 'quantity', 'status',
+            'total_price', 'expires_at', 'cancelled_at', 'updated_at', 'created_at'
+        ]
+        filter_sql = ''
+        params = [ReservationStatus.PENDING, now]
+        if reservation_ids is not None:
+            filter_sql += 'AND id = ANY(%s::uuid[]) '
+            params.append([str(reservation_id) for reservation_id in reservation_ids])
+        if since is not None:
+            filter_sql += 'AND created_at >= %s '
+            params.append(since)
+        params.extend([limit, ReservationStatus.EXPIRED, now, now])
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"WITH due AS ("
+                f"    SELECT id, created_at FROM {table} "
+                f"    WHERE status = %s AND expires_at < %s {filter_sql}"
+                f"    ORDER BY expires_at "
+                f"    LIMIT %s "
+                f"    FOR UPDATE SKIP LOCKED"
+                f") "
+                f"UPDATE {table} AS r "
+                f"SET status = %s, cancelled_at = %s, updated_at = %s "
+                f"FROM due WHERE r.id = due.id AND r.created_at = due.created_at "
+                f"RETURNING {', '.join('r.' + name for name in field_names)}",
+                params
+            )
+            rows = cursor.fetchall()
+
+        return [self.model.from_db(self.db, field_names, row) for row in rows]
+
+    def claim_reminders(self, now, lead, limit):
+        """
+        Отметка пачки активных броней, которым пора отправить напоминание.
+
+        Берутся брони, истекающие в ближайшие lead, без отметки
+        reminder_sent_at; строки выбираются через FOR UPDATE SKIP LOCKED.
+        Возвращает отмеченные брони (только основные поля).
+        """
+        from apps.reservations.models import ReservationStatus
+
+        table = self.model._meta.db_table
+        field_names = ['id', 'user_id', 'product_id', 'quantity', 'total_price', 'expires_at']
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"WITH due AS ("
+                f"    SELECT id, created_at FROM {table} "
+                f"    WHERE status = %s AND reminder_sent_at IS NULL "
+                f"    AND expires_at > %s AND expires_at <= %s AND created_at >= %s "
+                f"    ORDER BY expires_at "
+                f"    LIMIT %s "
+                f"    FOR UPDATE SKIP LOCKED"
+                f") "
+                f"UPDATE {table} AS r SET reminder_sent_at = %s "
+                f"FROM due WHERE r.id = due.id AND r.created_at = due.created_at "
+                f"RETURNING {', '.join('r.' + name for name in field_names)}",
+                [ReservationStatus.PENDING, now, now + lead, self.hot_window_start(), limit, now]
+            )
+            rows = cursor.fetchall()
+
+        return [self.model.from_db(self.db, field_names, row) for row in rows]
+
+    def transition(self, reservation_id, to_status, now, user_id=None, expired=None, stock_factors=None):
+        """
+        Перевод одной активной брони в статус to_status без блокировок.
+
+        Переход - один условный UPDATE (compare-and-set по status='pending'),
+        успех определяется числом измененных строк. expired работает как в
+        transition_pending. stock_factors=(по quantity, по reserved_quantity) -
+        множители количества брони, на которые тем же запросом меняется
+        строка product_stocks (кроме шардированной). Бронь сначала ищется
+        в окне активных (hot_window_start), при промахе - по всей таблице,
+        чтобы старую активную бронь тоже можно было перевести. Возвращает
+        (бронь или None, применено ли изменение остатка).
+        """
+        from apps.reservations.models import ReservationStatus
+        from apps.products.models import ProductStock
+
+        table = self.model._meta.db_table
+        fields = self.model._meta.concrete_fields
+        timestamp_field = 'confirmed_at' if to_status == ReservationStatus.CONFIRMED else 'cancelled_at'
+
+        conditions = "id = %s AND status = %s "
+        condition_params = [str(reservation_id), ReservationStatus.PENDING]
+        if user_id is not None:
+            conditions += "AND user_id = %s "
+            condition_params.append(user_id)
+        if expired is not None:
+            conditions += f"AND expires_at {'<' if expired else '>='} %s "
+            condition_params.append(now)
+
+        row = None
+        for since in (self.hot_window_start(), None):
+            window_sql = "AND created_at >= %s " if since is not None else ""
+            window_params = [since] if since is not None else []
+            update_sql = (
+                f"UPDATE {table} SET status = %s, {timestamp_field} = %s, updated_at = %s "
+                f"WHERE {conditions}{window_sql}"
+                f"RETURNING {', '.join(field.column for field in fields)}"
+            )
+            params = [to_status, now, now, *condition_params, *window_params]
+
+            if stock_factors is None:
+                sql = update_sql
+            else:
+                stock_table = ProductStock._meta.db_table
+                sql = (
+                    f"WITH r AS ({update_sql}), "
+                    f"s AS ("
+                    f"    UPDATE {stock_table} AS s "
+                    f"    SET quantity = GREATEST(0, s.quantity + %s * r.quantity), "
+                    f"    reserved_quantity = GREATEST(0, s.reserved_quantity + %s * r.quantity), "
+                    f"    version = s.version + 1, last_updated = %s "
+                    f"    FROM r WHERE s.product_id = r.product_id AND s.slot_count = 0 "
+                    f"    RETURNING s.product_id"
+                    f") "
+                    f"SELECT r.*, EXISTS (SELECT 1 FROM s) FROM r"
+                )
+                params.extend([*stock_factors, now])
+
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+            if row is not None:
+                break
+
+        if row is None:
+            return None, False
+
+        connection = connections[self.db]
+        values = [
+            field.from_db_value(value, None, connection) if hasattr(field, 'from_db_value') else value
+            for field, value in zip(fields, row)
+        ]
+        reservation = self.model.from_db(self.db, [field.attname for field in fields], values)
+        return reservation, stock_factors is not None and row[len(fields)]
+
+    def transition_pending(self, reservation_ids, user_id, to_status, now, expired=None):
+        """
+        Перевод нескольких активных броней пользователя в статус to_status.
+
+        expired=True берет только просроченные брони, expired=False - только
+        действующие, None - любые. Строки блокируются в порядке id (без взаимных
+        блокировок между параллельными пакетами). Брони сначала ищутся в окне
+        активных (hot_window_start), не найденные там - по всей таблице.
+        Возвращает список переведенных броней (только основные поля).
+        """
+        from apps.reservations.models import ReservationStatus
+
+        if not reservation_ids:
+            return []
+
+        table = self.model._meta.db_table
+        timestamp_field = 'confirmed_at' if to_status == ReservationStatus.CONFIRMED else 'cancelled_at'
+        field_names = [
+            'id', 'user_id', 'product_id', 'quantity', 'status', 'total_price',
+            'expires_at', 'confirmed_at', 'cancelled_at', 'updated_at', 'created_at'
+        ]
+        expiry_sql = ''
+        expiry_params = []
+        if expired is not None:
+            expiry_sql = f"AND expires_at {'<' if expired else '>='} %s "
+            expiry_params.append(now)
+
+        rows = []
+        remaining = {str(reservation_id) for reservation_id in reservation_ids}
+        for since in (self.hot_window_start(), None):
+            window_sql = "AND created_at >= %s " if since is not None else ""
+            window_params = [since] if since is not None else []
+
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(
+                    f"WITH locked AS ("
+                    f"    SELECT id, created_at FROM {table} "
+                    f"    WHERE id = ANY(%s::uuid[]) AND user_id = %s AND status = %s "
+                    f"    {window_sql}{expiry_sql}"
+                    f"    ORDER BY id "
+                    f"    FOR UPDATE"
+                    f") "
+                    f"UPDATE {table} AS r "
+                    f"SET status = %s, {timestamp_field} = %s, updated_at = %s "
+                    f"FROM locked WHERE r.id = locked.id AND r.created_at = locked.created_at "
+                    f"RETURNING {', '.join('r.' + name for name in field_names)}",
+                    [
+                        sorted(remaining), user_id, ReservationStatus.PENDING,
+                        *window_params, *expiry_params, to_status, now, now
+                    ]
+                )
+                rows.extend(cursor.fetchall())
+
+            remaining -= {str(row[0]) for row in rows}
+            if not remaining:
+                break
+
+        return [self.model.from_db(self.db, field_names, row) for row in rows]
+
+    def cut_pending(self, product_id, excess, now):
+        """
+        Отмена или уменьшение активных броней товара одним UPDATE.
+
+        excess=None отменяет все активные брони товара. Иначе с самых
+        новых броней снимается excess единиц: бронь, целиком попавшая
+        в превышение, отменяется, последняя затронутая - уменьшается.
+        Строки блокируются в порядке id; окно активных здесь не
+        применяется, каскад должен видеть все активные брони товара.
+        Возвращает пары (бронь, снятое количество); у уменьшенных броней
+        статус остается pending.
+        """
+        from apps.reservations.models import ReservationStatus
+
+        table = self.model._meta.db_table
+        field_names = [
+            'id', 'user_id', 'product_id', 'quantity', 'status', 'price_per_item',
+            'total_price', 'expires_at', 'cancelled_at', 'updated_at', 'created_at'
+        ]
+        cancel_sql = "cut.released = cut.quantity"
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"WITH locked AS ("
+                f"    SELECT id, created_at, quantity FROM {table} "
+                f"    WHERE product_id = %s AND status = %s "
+                f"    ORDER BY id "
+                f"    FOR UPDATE"
+                f"), cut AS ("
+                f"    SELECT id, created_at, quantity, "
+                f"           LEAST(quantity, COALESCE(%s::bigint - (SUM(quantity) OVER newest - quantity), quantity)) "
+                f"               AS released "
+                f"    FROM locked "
+                f"    WINDOW newest AS (ORDER BY created_at DESC, id DESC)"
+                f") "
+                f"UPDATE {table} AS r "
+                f"SET status = CASE WHEN {cancel_sql} THEN %s ELSE r.status END, "
+                f"cancelled_at = CASE WHEN {cancel_sql} THEN %s ELSE r.cancelled_at END, "
+                f"quantity = CASE WHEN {cancel_sql} THEN r.quantity ELSE r.quantity - cut.released END, "
+                f"total_price = CASE WHEN {cancel_sql} THEN r.total_price "
+                f"    ELSE r.price_per_item * (r.quantity - cut.released) END, "
+                f"updated_at = %s "
+                f"FROM cut WHERE r.id = cut.id AND r.created_at = cut.created_at AND cut.released > 0 "
+                f"RETURNING {', '.join('r.' + name for name in field_names)}, cut.released",
+                [
+                    product_id, ReservationStatus.PENDING, excess,
+                    ReservationStatus.CANCELLED, now, now
+                ]
+            )
+            rows = cursor.fetchall()
+
+        return [
+            (self.model.from_db(self.db, field_names, row[:-1]), row[-1])
+            for row in rows
+        ]
+
+    def delete_archived(self, reservation_ids, before):
+        """
+        Удаление перенесенных в архив броней одним DELETE.
+
+        Условие по created_at отсекает секции с более новыми бронями.
+        Возвращает число удаленных строк.
+        """
+        if not reservation_ids:
+            return 0
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.model._meta.db_table} "
+                f"WHERE id = ANY(%s::uuid[]) AND created_at < %s",
+                [[str(reservation_id) for reservation_id in reservation_ids], before]
+            )
+            return cursor.rowcount
+
+
+class UserReservationCountersManager(models.Manager):
+    """Менеджер для счетчиков броней пользователя по статусам"""
+
+    STATUS_FIELDS = ('pending', 'confirmed', 'cancelled', 'expired')
+
+    def _ensure(self, cursor, user_ids):
+        """
+        Создание отсутствующих строк счетчиков по текущим броням.
+
+        Выполняется один раз на пользователя; существующие строки не меняются.
+        """
+        from apps.reservations.models import Reservation
+
+        counters_table = self.model._meta.db_table
+        reservations_table = Reservation._meta.db_table
+        cursor.execute(
+            f"INSERT INTO {counters_table} "
+            f"(user_id, {', '.join(self.STATUS_FIELDS)}, version, updated_at) "
+            f"SELECT u.user_id, "
+            f"{', '.join('COUNT(r.id) FILTER (WHERE r.status = %s)' for _ in self.STATUS_FIELDS)}, 1, %s "
+            f"FROM unnest(%s::bigint[]) AS u(user_id) "
+            f"LEFT JOIN {reservations_table} AS r ON r.user_id = u.user_id "
+            f"GROUP BY u.user_id "
+            f"ON CONFLICT (user_id) DO NOTHING",
+            [*self.STATUS_FIELDS, timezone.now(), list(user_ids)]
+        )
+
+    def try_acquire_pending(self, user_id, count, limit):
+        """
+        Увеличение числа активных броней, если не превышен лимит.
+
+        Строка счетчиков блокируется до конца транзакции, поэтому
+        параллельные брони одного пользователя не превысят лимит.
+        Возвращает значения счетчиков с version или None при превышении
+        лимита.
+        """
+        table = self.model._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            for attempt in range(2):
+                cursor.execute(
+                    f"UPDATE {table} SET pending = pending + %s, version = version + 1, updated_at = %s "
+                    f"WHERE user_id = %s AND pending + %s <= %s "
+                    f"RETURNING {', '.join(self.STATUS_FIELDS)}, version",
+                    [count, timezone.now(), user_id, count, limit]
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    return dict(zip((*self.STATUS_FIELDS, 'version'), row))
+
+                # Строки может еще не быть - создаем из текущих броней и повторяем
+                if attempt == 0:
+                    self._ensure(cursor, [user_id])
+
+        return None
+
+    def apply_deltas(self, deltas):
+        """
+        Применение изменений счетчиков одним UPDATE.
+
+        deltas: {user_id: {'pending': -1, 'confirmed': 1, ...}}.
+        Вызывается после смены статуса в той же транзакции: для
+        пользователей без строки она создается по уже измененным броням.
+        Возвращает {user_id: {status: value, 'version': version}}.
+        """
+        if not deltas:
+            return {}
+
+        table = self.model._meta.db_table
+        user_ids = sorted(deltas)
+        values_sql = ', '.join(
+            f"(%s::bigint, {', '.join(['%s::integer'] * len(self.STATUS_FIELDS))})"
+            for _ in user_ids
+        )
+        params = [timezone.now()]
+        for user_id in user_ids:
+            params.append(user_id)
+            params.extend(deltas[user_id].get(field, 0) for field in self.STATUS_FIELDS)
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} AS c SET "
+                f"{', '.join(f'{field} = GREATEST(0, c.{field} + v.{field})' for field in self.STATUS_FIELDS)}, "
+                f"version = c.version + 1, updated_at = %s "
+                f"FROM (VALUES {values_sql}) AS v(user_id, {', '.join(self.STATUS_FIELDS)}) "
+                f"WHERE c.user_id = v.user_id "
+                f"RETURNING c.user_id, {', '.join('c.' + field for field in self.STATUS_FIELDS)}, c.version",
+                params
+            )
+            fields = (*self.STATUS_FIELDS, 'version')
+            result = {row[0]: dict(zip(fields, row[1:])) for row in cursor.fetchall()}
+
+            missing = [user_id for user_id in user_ids if user_id not in result]
+            if missing:
+                self._ensure(cursor, missing)
+                cursor.execute(
+                    f"SELECT user_id, {', '.join(self.STATUS_FIELDS)}, version FROM {table} "
+                    f"WHERE user_id = ANY(%s::bigint[])",
+                    [missing]
+                )
+                result.update({row[0]: dict(zip(fields, row[1:])) for row in cursor.fetchall()})
+
+        return result
+
+    def rebuild(self):
+        """Пересчет всех счетчиков по таблице броней"""
+        from apps.reservations.models import Reservation
+
+        counters_table = self.model._meta.db_table
+        reservations_table = Reservation._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {counters_table} "
+                f"(user_id, {', '.join(self.STATUS_FIELDS)}, version, updated_at) "
+                f"SELECT user_id, "
+                f"{', '.join('COUNT(*) FILTER (WHERE status = %s)' for _ in self.STATUS_FIELDS)}, 1, %s "
+                f"FROM {reservations_table} GROUP BY user_id "
+                f"ON CONFLICT (user_id) DO UPDATE SET "
+                f"{', '.join(f'{field} = EXCLUDED.{field}' for field in self.STATUS_FIELDS)}, "
+                f"version = {counters_table}.version + 1, updated_at = EXCLUDED.updated_at "
+                f"RETURNING user_id",
+                [*self.STATUS_FIELDS, timezone.now()]
+            )
+            user_ids = [row[0] for row in cursor.fetchall()]
+
+            # Пользователи, у которых не осталось броней
+            cursor.execute(
+                f"UPDATE {counters_table} SET "
+                f"{', '.join(f'{field} = 0' for field in self.STATUS_FIELDS)}, "
+                f"version = version + 1, updated_at = %s "
+                f"WHERE user_id NOT IN (SELECT DISTINCT user_id FROM {reservations_table}) "
+                f"RETURNING user_id",
+                [timezone.now()]
+            )
+            user_ids.extend(row[0] for row in cursor.fetchall())
+
+        return user_ids
+
+
+class ReservationDailyStatsManager(models.Manager):
+    """Менеджер для дневных корзин статистики броней"""
+
+    def apply_deltas(self, deltas, slots):
+        """
+        Добавление изменений в корзины одним INSERT ... ON CONFLICT.
+
+        deltas: {(day, status): (count, amount)}. Слот выбирается по
+        pg_backend_pid(), поэтому в пределах транзакции это одна и та же
+        строка каждой корзины; строки блокируются в порядке ключей.
+        """
+        deltas = {key: value for key, value in deltas.items() if any(value)}
+        if not deltas:
+            return
+
+        table = self.model._meta.db_table
+        keys = sorted(deltas)
+        values_sql = ', '.join('(%s::date, %s, %s::bigint, %s::numeric)' for _ in keys)
+        params = [slots]
+        for day, status in keys:
+            count, amount = deltas[(day, status)]
+            params.extend([day, status, count, amount])
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (day, status, slot, count, amount) "
+                f"SELECT v.day, v.status, mod(pg_backend_pid(), %s), v.count, v.amount "
+                f"FROM (VALUES {values_sql}) AS v(day, status, count, amount) "
+                f"ORDER BY v.day, v.status "
+                f"ON CONFLICT (day, status, slot) DO UPDATE SET "
+                f"count = {table}.count + EXCLUDED.count, amount = {table}.amount + EXCLUDED.amount",
+                params
+            )
+
+    def compact(self, before):
+        """Сложение слотов корзин за дни до before в слот 0"""
+        table = self.model._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"WITH moved AS ("
+                f"    DELETE FROM {table} WHERE day < %s AND slot <> 0 "
+                f"    RETURNING day, status, count, amount"
+                f") "
+                f"INSERT INTO {table} (day, status, slot, count, amount) "
+                f"SELECT day, status, 0, SUM(count), SUM(amount) FROM moved "
+                f"GROUP BY day, status ORDER BY day, status "
+                f"ON CONFLICT (day, status, slot) DO UPDATE SET "
+                f"count = {table}.count + EXCLUDED.count, amount = {table}.amount + EXCLUDED.amount",
+                [before]
+            )
+            return cursor.rowcount
+
+    def rebuild(self, time_zone):
+        """
+        Пересчет всех корзин по таблице броней.
+
+        Таблица статистики блокируется от записи: транзакции, уже
+        изменившие корзины, завершаются до пересчета, а начатые позже
+        допишут свои изменения после него.
+        """
+        from apps.reservations.models import Reservation
+
+        table = self.model._meta.db_table
+        reservations_table = Reservation._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"INSERT INTO {table} (day, status, slot, count, amount) "
+                f"SELECT (created_at AT TIME ZONE %s)::date AS day, status, 0, "
+                f"COUNT(*), COALESCE(SUM(total_price), 0) "
+                f"FROM {reservations_table} GROUP BY 1, 2",
+                [time_zone]
+            )
+            return cursor.rowcount
@@ -6,6 +6,11 @@ from datetime import timedelta
 from django.utils.translation import gettext_lazy as _
 import uuid
 
+from apps.core.models import ChangeTrackingMixin
+from apps.reservations.managers import (
+    ReservationManager, UserReservationCountersManager, ReservationDailyStatsManager
+)
+
 
 class ReservationStatus(models.TextChoices):
     PENDING = 'pending', _('Pending')
@@ -14,7 +19,7 @@ class ReservationStatus(models.TextChoices):
     EXPIRED = 'expired', _('Expired')
 
 
-class Reservation(models.Model):
+class Reservation(ChangeTrackingMixin, models.Model):
     """Модель бронирования"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
@@ -52,11 +57,17 @@ class Reservation(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     confirmed_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
 
     # Дополнительная информация
     notes = models.TextField(_('notes'), blank=True)
     customer_info = models.JSONField(_('customer info'), default=dict, blank=True)
 
+    objects = ReservationManager()
+
+    # Прежний статус нужен обработчикам сигналов
+    tracked_fields = ('status',)
+
     class Meta:
         db_table = 'reservations'
         indexes = [
@@ -66,8 +77,16 @@ class Reservation(models.Model):
             models.Index(fields=['expires_at']),
             models.Index(fields=['created_at']),
             models.Index(fields=['-created_at']),
+            # Курсорная пагинация броней пользователя
+            models.Index(fields=['user', '-created_at', 'id'], name='reservation_user_keyset_idx'),
             models.Index(fields=['user', 'status']),
             models.Index(fields=['product', 'status']),
+            # Поиск броней, которым пора отправить напоминание
+            models.Index(
+                fields=['expires_at'],
+                name='reservation_reminder_due_idx',
+                condition=models.Q(status='pending', reminder_sent_at__isnull=True)
+            ),
         ]
         constraints = [
             models.CheckConstraint(
@@ -91,4 +110,198 @@ class Reservation(models.Model):
 
     @property
     def is_expired(self):
-        return timezone.now() > self.expires_at
\ No newline at end of file
+        return timezone.now() > self.expires_at
+
+
+class UserReservationCounters(models.Model):
+    """
+    Счетчики броней пользователя по статусам.
+
+    Обновляются в той же транзакции, что и смена статуса брони, и
+    заменяют COUNT(*) при проверке лимита и в статистике пользователя.
+    version растет с каждым изменением строки и упорядочивает записи
+    в зеркало Redis.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='reservation_counters'
+    )
+    pending = models.PositiveIntegerField(default=0)
+    confirmed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    expired = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserReservationCountersManager()
+
+    class Meta:
+        db_table = 'user_reservation_counters'
+
+    def __str__(self):
+        return f"Counters for user {self.user_id}"
+
+    @property
+    def total(self):
+        return self.pending + self.confirmed + self.cancelled + self.expired
+
+    def as_dict(self):
+        return {
+            'pending': self.pending,
+            'confirmed': self.confirmed,
+            'cancelled': self.cancelled,
+            'expired': self.expired,
+        }
+
+
+class ReservationDailyStats(models.Model):
+    """
+    Число и сумма броней по локальному дню создания и статусу.
+
+    Корзина (day, status) разбита на слоты: транзакция пишет в слот
+    своего соединения, поэтому параллельные брони не ждут одну строку.
+    Значения отдельного слота могут быть отрицательными, итог
+    корзины - сумма по слотам.
+    """
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=ReservationStatus.choices)
+    slot = models.PositiveSmallIntegerField(default=0)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    objects = ReservationDailyStatsManager()
+
+    class Meta:
+        db_table = 'reservation_daily_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status', 'slot'], name='unique_reservation_stats_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
+
+
+class WaitlistStatus(models.TextChoices):
+    WAITING = 'waiting', _('Waiting')
+    ALLOCATED = 'allocated', _('Allocated')
+    CANCELLED = 'cancelled', _('Cancelled')
+
+
+class WaitlistEntry(models.Model):
+    """
+    Место в очереди ожидания распроданного товара.
+
+    Освободившийся остаток распределяется между ожидающими в порядке
+    постановки в очередь (по id), для каждого создается обычная бронь.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries'
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries'
+    )
+    quantity = models.PositiveIntegerField(
+        _('quantity'),
+        validators=[MinValueValidator(1)]
+    )
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=WaitlistStatus.choices,
+        default=WaitlistStatus.WAITING
+    )
+    # Без внешнего ключа в БД: таблица броней может быть секционирована
+    reservation = models.OneToOneField(
+        Reservation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name='waitlist_entry'
+    )
+    customer_info = models.JSONField(_('customer info'), default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    allocated_at = models.DateTimeField(null=True, blank=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'reservation_waitlist'
+        indexes = [
+            models.Index(
+                fields=['product', 'id'],
+                name='waitlist_waiting_idx',
+                condition=models.Q(status='waiting')
+            ),
+            models.Index(fields=['user', 'status']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'product'],
+                condition=models.Q(status='waiting'),
+                name='unique_waiting_entry_per_product'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Waitlist #{self.id}: user {self.user_id}, product {self.product_id}"
+
+
+class ReservationArchiveSegment(models.Model):
+    """
+    Файл архива завершенных броней (NDJSON, сжатый gzip).
+
+    Брони пользователя внутри сегмента лежат отдельным gzip-блоком,
+    поэтому для чтения истории одного пользователя распаковывается
+    только его блок.
+    """
+    id = models.BigAutoField(primary_key=True)
+    path = models.CharField(_('path'), max_length=500, unique=True)
+    row_count = models.PositiveIntegerField(_('row count'))
+    size_bytes = models.PositiveBigIntegerField(_('size in bytes'))
+    min_created_at = models.DateTimeField()
+    max_created_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'reservation_archive_segments'
+
+    def __str__(self):
+        return self.path
+
+
+class ReservationArchiveEntry(models.Model):
+    """Индекс архива: блок сегмента с бронями одного пользователя"""
+    id = models.BigAutoField(primary_key=True)
+    segment = models.ForeignKey(
+        ReservationArchiveSegment,
+        on_delete=models.CASCADE,
+        related_name='entries'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_reservation_entries'
+    )
+    offset = models.PositiveBigIntegerField()
+    length = models.PositiveIntegerField()
+    row_count = models.PositiveIntegerField()
+    status_counts = models.JSONField(default=dict)
+    min_created_at = models.DateTimeField()
+    max_created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'reservation_archive_entries'
+        indexes = [
+            models.Index(fields=['user', '-max_created_at']),
+        ]
+
+    def __str__(self):
+        return f"Archive entry #{self.id}: user {self.user_id}, {self.row_count} rows"
@@ -0,0 +1,212 @@
+from datetime import datetime
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from apps.core.services.base import BaseService
+from apps.core.exceptions import BusinessLogicError
+from apps.reservations.models import Reservation
+
+
+def month_start(value: datetime, shift: int = 0) -> datetime:
+    """Начало месяца value, сдвинутого на shift месяцев"""
+    index = value.year * 12 + value.month - 1 + shift
+    return value.replace(
+        year=index // 12, month=index % 12 + 1, day=1,
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+class ReservationPartitionService(BaseService):
+    """
+    Помесячное секционирование таблицы reservations по created_at.
+
+    convert() однократно превращает обычную таблицу в секционированную:
+    существующие строки становятся одной секцией reservations_legacy,
+    новые брони попадают в месячные секции reservations_pYYYYMM.
+    ensure_partitions() заранее создает секции на несколько месяцев
+    вперед, detach_old() отсоединяет секции старше срока хранения
+    (таблицы остаются в БД для архивации).
+    """
+
+    LEGACY_PARTITION = 'reservations_legacy'
+    DEFAULT_PARTITION = 'reservations_default'
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return True
+
+    @property
+    def table(self) -> str:
+        return Reservation._meta.db_table
+
+    def partition_name(self, start: datetime) -> str:
+        return f"{self.table}_p{start:%Y%m}"
+
+    def is_partitioned(self) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+                [self.table]
+            )
+            return cursor.fetchone()[0]
+
+    def partitions(self) -> List[Tuple[str, Optional[datetime]]]:
+        """Секции таблицы с верхней границей (None для секции по умолчанию)"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname, "
+                "       (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \\(''([^'']+)''\\)'))[1]::timestamptz "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s) "
+                "ORDER BY 2 NULLS LAST",
+                [self.table]
+            )
+            return cursor.fetchall()
+
+    @transaction.atomic
+    def convert(self) -> str:
+        """
+        Перевод reservations в секционированную таблицу.
+
+        Выполняется под ACCESS EXCLUSIVE блокировкой без копирования
+        данных: старая таблица подключается секцией до начала следующего
+        месяца. Первичный ключ становится (id, created_at), внешние ключи
+        на брони из других таблиц удаляются (Postgres не поддерживает их
+        для секционированных таблиц без ключа секционирования).
+        """
+        if self.is_partitioned():
+            raise BusinessLogicError("Таблица бронирований уже секционирована")
+
+        table, legacy = self.table, self.LEGACY_PARTITION
+        bound = month_start(timezone.now(), 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+            # ALTER TABLE невозможен при отложенных проверках внешних ключей
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+            # Определения индексов и внешних ключей до переименования
+            cursor.execute(
+                "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x "
+                "JOIN pg_class i ON i.oid = x.indexrelid "
+                "WHERE x.indrelid = %s::regclass AND NOT x.indisprimary",
+                [table]
+            )
+            indexes = cursor.fetchall()
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [table]
+            )
+            foreign_keys = cursor.fetchall()
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE confrelid = %s::regclass AND contype = 'f'",
+                [table]
+            )
+            inbound_keys = cursor.fetchall()
+
+            for referencing_table, name in inbound_keys:
+                cursor.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT "{name}"')
+
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+            # Первичный ключ секции (id, created_at) создается при подключении
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                [legacy]
+            )
+            cursor.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT "{cursor.fetchone()[0]}"')
+            for name, _ in indexes:
+                cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_legacy"')
+
+            cursor.execute(
+                f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                f"PARTITION BY RANGE (created_at)"
+            )
+            cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)")
+            # Определения сняты до переименования и ссылаются на новую таблицу
+            for _, definition in indexes:
+                cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+            cursor.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {legacy} "
+                f"FOR VALUES FROM (MINVALUE) TO (%s)",
+                [bound]
+            )
+            cursor.execute(f"CREATE TABLE {self.DEFAULT_PARTITION} PARTITION OF {table} DEFAULT")
+
+        self.ensure_partitions()
+
+        self.logger.info(f"Table {table} converted to monthly partitions, legacy rows until {bound:%Y-%m}")
+        return legacy
+
+    @transaction.atomic
+    def ensure_partitions(self, months_ahead: int = None) -> List[str]:
+        """Создание месячных секций от текущего месяца на months_ahead вперед"""
+        months_ahead = settings.RESERVATION_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+
+        if not self.is_partitioned():
+            return []
+
+        covered_until = max(
+            (upper for _, upper in self.partitions() if upper is not None),
+            default=None
+        )
+        now = timezone.now()
+        start = month_start(now)
+        if covered_until is not None and covered_until > start:
+            start = month_start(covered_until)
+
+        created = []
+        with connection.cursor() as cursor:
+            while start <= month_start(now, months_ahead):
+                end = month_start(start, 1)
+                name = self.partition_name(start)
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {self.table} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [start, end]
+                )
+                created.append(name)
+                start = end
+
+        if created:
+            self.logger.info(f"Reservation partitions created: {', '.join(created)}")
+        return created
+
+    @transaction.atomic
+    def detach_old(self, retention_months: int = None) -> List[str]:
+        """
+        Отсоединение секций, целиком лежащих раньше срока хранения.
+
+        Отсоединенные таблицы остаются в БД и больше не участвуют
+        в запросах к reservations.
+        """
+        retention_months = (
+            settings.RESERVATION_PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+        )
+
+        if not self.is_partitioned():
+            return []
+
+        cutoff = month_start(timezone.now(), -retention_months)
+        detached = []
+        with connection.cursor() as cursor:
+            for name, upper in self.partitions():
+                if upper is not None and upper <= cutoff:
+                    cursor.execute(f"ALTER TABLE {self.table} DETACH PARTITION {name}")
+                    detached.append(name)
+
+        if detached:
+            self.logger.info(f"Reservation partitions detached: {', '.join(detached)}")
+        return detached
+
+    def maintain(self) -> Dict[str, List[str]]:
+        """Плановое обслуживание: новые секции вперед и отсоединение старых"""
+        return {
+            'created': self.ensure_partitions(),
+            'detached': self.detach_old(),
+        }
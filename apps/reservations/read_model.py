@@ -0,0 +1,239 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from typing import Dict, Any, Iterable, List, Optional
+from redis.exceptions import RedisError
+import json
+
+from apps.core.services.base import BaseService
+from apps.reservations.models import Reservation, ReservationStatus
+
+
+# Слияние измененных полей с сохраненным представлением брони.
+# Отсутствующее представление не создается.
+PATCH_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current then
+    return 0
+end
+local row = cjson.decode(current)
+for field, value in pairs(cjson.decode(ARGV[2])) do
+    row[field] = value
+end
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(row))
+return 1
+"""
+
+COMPLETE_FIELD = '_complete'
+MUTABLE_FIELDS = ('status', 'updated_at', 'confirmed_at', 'cancelled_at')
+
+
+class ReservationReadModel(BaseService):
+    """
+    Read-модель списка броней пользователя в Redis.
+
+    Последние RESERVATION_READ_MODEL_SIZE броней пользователя хранятся
+    готовым JSON (хеш id -> бронь и zset порядка по created_at) и
+    отдаются my_reservations и историей без JOIN с товарами и
+    сериализации. Создание брони дописывает представление, смена
+    статуса патчит его Lua-скриптом. Холодный пользователь строится из
+    БД при первом чтении; пользователь с большим числом броней
+    читается из БД. Остатки товара в представлении - на момент записи.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._redis = None
+        self._patch = None
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return 'user_id' in data
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _rows_key(self, user_id: int) -> str:
+        return cache.make_key(f"reservation_view:{user_id}")
+
+    def _order_key(self, user_id: int) -> str:
+        return cache.make_key(f"reservation_view_order:{user_id}")
+
+    def get_items(self, user_id: int, status: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Брони пользователя (новые сначала) из read-модели.
+        None - представление неполное или Redis недоступен, читать из БД.
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hgetall(self._rows_key(user_id))
+            pipe.zrevrange(self._order_key(user_id), 0, -1)
+            rows, order = pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to read reservations view from Redis: {e}")
+            return None
+
+        if rows:
+            if rows.get(COMPLETE_FIELD.encode()) != b'1':
+                return None
+            items = [json.loads(rows[reservation_id]) for reservation_id in order if reservation_id in rows]
+        else:
+            items = self.build(user_id)
+            if items is None:
+                return None
+
+        if status:
+            items = [item for item in items if item['status'] == status]
+        return items
+
+    def build(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Построение представления из БД. None, если броней больше лимита"""
+        from apps.reservations.serializers import ReservationSnapshotSerializer
+
+        size = settings.RESERVATION_READ_MODEL_SIZE
+        reservations = list(
+            Reservation.objects.filter(user_id=user_id).select_related(
+                'product__category', 'product__stock'
+            ).order_by('-created_at')[:size + 1]
+        )
+        complete = len(reservations) <= size
+        items = ReservationSnapshotSerializer(reservations[:size], many=True).data
+
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(self._rows_key(user_id), self._order_key(user_id))
+            pipe.hset(self._rows_key(user_id), COMPLETE_FIELD, '1' if complete else '0')
+            if items:
+                pipe.hset(self._rows_key(user_id), mapping={
+                    item['id']: json.dumps(item, ensure_ascii=False) for item in items
+                })
+                pipe.zadd(self._order_key(user_id), {
+                    str(reservation.id): reservation.created_at.timestamp()
+                    for reservation in reservations[:size]
+                })
+            self._expire(pipe, user_id)
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to write reservations view to Redis: {e}")
+
+        return list(items) if complete else None
+
+    def record_created(self, reservations: Iterable[Reservation]):
+        """Добавление новых броней в представления, уже построенные в Redis"""
+        from apps.reservations.serializers import ReservationSnapshotSerializer
+
+        by_user: Dict[int, List[Reservation]] = {}
+        for reservation in reservations:
+            by_user.setdefault(reservation.user_id, []).append(reservation)
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in by_user:
+                pipe.hlen(self._rows_key(user_id))
+            sizes = dict(zip(by_user, pipe.execute()))
+
+            pipe = self.redis.pipeline(transaction=True)
+            for user_id, user_reservations in by_user.items():
+                if not sizes[user_id]:
+                    # Холодное представление построится при чтении
+                    continue
+                # В хеше кроме броней хранится признак полноты
+                if sizes[user_id] - 1 + len(user_reservations) > settings.RESERVATION_READ_MODEL_SIZE:
+                    # Представление переполнено - пересоберем из БД при чтении
+                    pipe.delete(self._rows_key(user_id), self._order_key(user_id))
+                    continue
+
+                items = ReservationSnapshotSerializer(user_reservations, many=True).data
+                pipe.hset(self._rows_key(user_id), mapping={
+                    item['id']: json.dumps(item, ensure_ascii=False) for item in items
+                })
+                pipe.zadd(self._order_key(user_id), {
+                    str(reservation.id): reservation.created_at.timestamp()
+                    for reservation in user_reservations
+                })
+                self._expire(pipe, user_id)
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to update reservations view in Redis: {e}")
+            self.invalidate(*by_user)
+
+    def record_transitions(self, reservations: Iterable[Reservation]):
+        """Патч статуса и отметок времени в сохраненных представлениях"""
+        if self._patch is None:
+            self._patch = self.redis.register_script(PATCH_SCRIPT)
+
+        datetime_field = serializers.DateTimeField()
+        reservations = list(reservations)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for reservation in reservations:
+                # Берем только загруженные поля: брони из RETURNING неполные
+                changes = {
+                    field: reservation.__dict__[field]
+                    for field in MUTABLE_FIELDS if field in reservation.__dict__
+                }
+                changes = {
+                    field: datetime_field.to_representation(value) if value and field != 'status' else value
+                    for field, value in changes.items()
+                }
+                self._patch(
+                    keys=[self._rows_key(reservation.user_id)],
+                    args=[str(reservation.id), json.dumps(changes)],
+                    client=pipe
+                )
+            pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to patch reservations view in Redis: {e}")
+            self.invalidate(*{reservation.user_id for reservation in reservations})
+
+    def invalidate(self, *user_ids: int):
+        try:
+            keys = [key for user_id in user_ids for key in (self._rows_key(user_id), self._order_key(user_id))]
+            if keys:
+                self.redis.delete(*keys)
+        except RedisError as e:
+            self.logger.warning(f"Failed to invalidate reservations view in Redis: {e}")
+
+    def present(self, items: List[Dict[str, Any]], user) -> List[Dict[str, Any]]:
+        """Дополнение сохраненных броней пользователем и полями, зависящими от времени"""
+        from apps.users.serializers import UserSerializer
+
+        user_data = UserSerializer(user).data
+        now = timezone.now()
+        results = []
+        for item in items:
+            pending = item['status'] == ReservationStatus.PENDING
+            expires_at = parse_datetime(item['expires_at'])
+            is_expired = now > expires_at
+            remaining = max(0, int((expires_at - now).total_seconds()))
+            results.append({
+                'id': item['id'],
+                'user': user_data,
+                'product': item['product'],
+                'quantity': item['quantity'],
+                'status': item['status'],
+                'status_display': str(ReservationStatus(item['status']).label),
+                'price_per_item': item['price_per_item'],
+                'total_price': item['total_price'],
+                'expires_at': item['expires_at'],
+                'created_at': item['created_at'],
+                'updated_at': item['updated_at'],
+                'confirmed_at': item['confirmed_at'],
+                'cancelled_at': item['cancelled_at'],
+                'is_expired': is_expired,
+                'time_remaining': (0 if is_expired else remaining) if pending else None,
+                'can_confirm': pending and not is_expired,
+                'can_cancel': pending,
+                'notes': item['notes'],
+                'customer_info': item['customer_info'],
+            })
+        return results
+
+    def _expire(self, pipe, user_id: int):
+        pipe.expire(self._rows_key(user_id), settings.RESERVATION_READ_MODEL_TTL)
+        pipe.expire(self._order_key(user_id), settings.RESERVATION_READ_MODEL_TTL)
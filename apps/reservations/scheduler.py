@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from typing import Dict, Any, Iterable, List
+from redis.exceptions import RedisError
+
+from apps.core.services.base import BaseService
+from apps.reservations.models import Reservation, ReservationStatus
+
+
+# Атомарно забираем пачку броней, срок которых уже наступил
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+
+class ReservationExpiryScheduler(BaseService):
+    """
+    Планировщик истечения броней на сортированном множестве Redis.
+
+    Каждая бронь попадает в ZSET с expires_at в качестве score, а
+    обработчик (команда expiry_worker) раз в RESERVATION_EXPIRY_POLL_SECONDS
+    забирает наступившие элементы пачками. Периодическая задача
+    cleanup_expired_reservations остается страховкой на случай потери
+    элементов или недоступности Redis.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._redis = None
+        self._pop_due = None
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return 'reservation_id' in data and 'expires_at' in data
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _key(self) -> str:
+        return cache.make_key('reservation_expiry')
+
+    def schedule(self, reservations: Iterable[Reservation]):
+        """Добавление броней в расписание истечения"""
+        mapping = {
+            str(reservation.id): reservation.expires_at.timestamp()
+            for reservation in reservations
+        }
+        if not mapping:
+            return
+
+        try:
+            self.redis.zadd(self._key(), mapping)
+        except RedisError as e:
+            self.logger.warning(f"Failed to schedule reservation expiry, sweep will handle it: {e}")
+
+    def unschedule(self, *reservation_ids):
+        """Удаление броней из расписания (подтверждение или отмена)"""
+        if not reservation_ids:
+            return
+
+        try:
+            self.redis.zrem(self._key(), *[str(reservation_id) for reservation_id in reservation_ids])
+        except RedisError as e:
+            self.logger.warning(f"Failed to unschedule reservation expiry: {e}")
+
+    def pop_due(self, batch_size: int) -> List[str]:
+        """Забрать из расписания брони с наступившим сроком"""
+        if self._pop_due is None:
+            self._pop_due = self.redis.register_script(POP_DUE_SCRIPT)
+
+        due = self._pop_due(
+            keys=[self._key()],
+            args=[timezone.now().timestamp(), batch_size]
+        )
+        return [member.decode() for member in due]
+
+    def run_once(self, batch_size: int = None) -> int:
+        """Одна итерация обработчика: истечение наступивших броней"""
+        from apps.reservations.services import ReservationService
+
+        batch_size = batch_size or settings.RESERVATION_EXPIRY_CHUNK_SIZE
+        reservation_ids = self.pop_due(batch_size)
+        if not reservation_ids:
+            return 0
+
+        try:
+            count = ReservationService().expire_due_reservations(
+                chunk_size=batch_size,
+                reservation_ids=reservation_ids
+            )
+        except Exception:
+            # Возвращаем элементы в расписание для повторной попытки
+            self.redis.zadd(self._key(), {
+                reservation_id: timezone.now().timestamp() for reservation_id in reservation_ids
+            })
+            raise
+
+        if count < len(reservation_ids):
+            # Бронь может истечь на долю секунды позже score - перепланируем
+            self.schedule(
+                Reservation.objects.filter(
+                    id__in=reservation_ids,
+                    status=ReservationStatus.PENDING
+                ).only('id', 'expires_at')
+            )
+
+        return count
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.utils import timezone
-from apps.reservations.models import Reservation, ReservationStatus
+from apps.reservations.models import Reservation, ReservationStatus, WaitlistEntry
 from apps.products.serializers import ProductBriefSerializer
 from apps.users.serializers import UserSerializer
 
@@ -33,6 +33,66 @@ class ReservationCreateSerializer(serializers.Serializer):
         return value
 
 
+class ReservationItemSerializer(serializers.Serializer):
+    """Позиция корзины для пакетного бронирования"""
+
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=100)
+
+
+class ReservationBatchCreateSerializer(serializers.Serializer):
+    """Сериализатор для пакетного бронирования корзины"""
+
+    items = ReservationItemSerializer(many=True, allow_empty=False, max_length=20)
+    customer_info = serializers.JSONField(required=False, default=dict)
+
+
+class ReservationIdsSerializer(serializers.Serializer):
+    """Сериализатор списка броней для пакетного подтверждения/отмены"""
+
+    reservation_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=50
+    )
+
+
+class ReservationBatchResultSerializer(serializers.Serializer):
+    """Результат пакетной операции по одной брони"""
+
+    id = serializers.UUIDField()
+    status = serializers.CharField()
+    error = serializers.CharField(required=False)
+
+
+class WaitlistJoinSerializer(serializers.Serializer):
+    """Сериализатор постановки в очередь ожидания"""
+
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=100)
+    customer_info = serializers.JSONField(required=False, default=dict)
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    """Запись в очереди ожидания"""
+
+    product = ProductBriefSerializer(read_only=True)
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            'id', 'product', 'quantity', 'status', 'position', 'reservation',
+            'created_at', 'allocated_at', 'cancelled_at'
+        ]
+        read_only_fields = fields
+
+    def get_position(self, obj):
+        """Позиция в очереди для ожидающей записи"""
+        from apps.reservations.waitlist import WaitlistService
+        return WaitlistService().position(obj)
+
+
 class ReservationSerializer(serializers.ModelSerializer):
     """Основной сериализатор бронирования"""
 
@@ -81,6 +141,23 @@ class ReservationSerializer(serializers.ModelSerializer):
         return obj.status == ReservationStatus.PENDING
 
 
+class ReservationSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Неизменяемая во времени часть ReservationSerializer для read-модели
+    в Redis (без пользователя и вычисляемых от текущего времени полей)
+    """
+
+    product = ProductBriefSerializer(read_only=True)
+
+    class Meta:
+        model = Reservation
+        fields = [
+            'id', 'product', 'quantity', 'status', 'price_per_item', 'total_price',
+            'expires_at', 'created_at', 'updated_at', 'confirmed_at', 'cancelled_at',
+            'notes', 'customer_info'
+        ]
+
+
 class ReservationUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для обновления бронирования"""
 
@@ -1,6 +1,6 @@
 from datetime import timedelta
 
-from django.db import transaction, models
+from django.db import transaction
 from django.utils import timezone
 from django.core.cache import cache
 from django.conf import settings
@@ -10,58 +10,60 @@ import uuid
 
 from apps.core.services.base import BaseService
 from apps.core.exceptions import BusinessLogicError, InsufficientStockError
-from apps.products.models import Product, ProductStock
+from apps.products.models import Product, ProductStock, ProductStockSlot
+from apps.products.inventory import HotInventoryService
 from apps.reservations.models import Reservation, ReservationStatus
-from apps.notifications.services import NotificationService
-from apps.analytics.services import AnalyticsService
+from apps.reservations.scheduler import ReservationExpiryScheduler
+from apps.reservations.counters import ReservationCounterService
+from apps.reservations.stats import ReservationStatsService
+from apps.reservations.waitlist import WaitlistService
+from apps.reservations.admission import ReservationAdmissionService
+from apps.core.events import dispatcher
 
 
 class ReservationService(BaseService):
     """Сервис для работы с бронированиями"""
 
+    # Повторы групповой брони, если остаток в Redis или слотах изменился
+    GROUP_RESERVE_ATTEMPTS = 3
+
     def __init__(self):
         super().__init__()
-        self.notification_service = NotificationService()
-        self.analytics_service = AnalyticsService()
+        self.inventory = HotInventoryService()
+        self.expiry_scheduler = ReservationExpiryScheduler()
+        self.counters = ReservationCounterService()
+        self.stats = ReservationStatsService()
+        self.waitlist = WaitlistService()
+        self.admission = ReservationAdmissionService()
 
     def validate_data(self, data: Dict[str, Any]) -> bool:
         """Валидация данных для создания брони"""
         required_fields = ['user_id', 'product_id', 'quantity']
         return all(field in data for field in required_fields)
 
-    @transaction.atomic
+    @dispatcher.unit_of_work()
     def create_reservation(self, user_id: int, product_id: int, quantity: int,
                            customer_info: Optional[Dict] = None) -> Reservation:
         """
-        Создание бронирования с проверкой остатков
+        Создание бронирования с проверкой остатков.
+
+        Товар читается без блокировки, а остаток резервируется в Redis
+        (горячие счетчики) или одним условным UPDATE по product_stocks,
+        поэтому параллельные брони одного товара не ждут друг друга
+        на SELECT ... FOR UPDATE.
         """
         try:
-            # Получаем продукт с блокировкой для обновления
-            product = Product.objects.select_for_update().get(
-                id=product_id,
-                is_active=True
-            )
-
-            # Получаем остатки с оптимистичной блокировкой
-            stock = ProductStock.objects.select_for_update().get(product=product)
-
-            # Проверяем возможность резервирования
-            if not stock.can_reserve(quantity):
-                raise InsufficientStockError(
-                    f"Недостаточно товара. Доступно: {stock.available_quantity}, запрошено: {quantity}"
-                )
+            product = Product.objects.get(id=product_id, is_active=True)
+        except Product.DoesNotExist:
+            raise BusinessLogicError("Товар не найден или неактивен")
 
-            # Проверяем лимиты пользователя
-            active_reservations_count = Reservation.objects.filter(
-                user_id=user_id,
-                status=ReservationStatus.PENDING
-            ).count()
+        # Проверяем лимиты пользователя до обращения к остаткам
+        self.counters.acquire_pending(user_id)
 
-            if active_reservations_count >= settings.MAX_RESERVATION_PER_USER:
-                raise BusinessLogicError(
-                    f"Превышен лимит активных броней: {settings.MAX_RESERVATION_PER_USER}"
-                )
+        # Резервируем товар
+        reserved_in_redis = self._reserve_stock(product_id, quantity)
 
+        try:
             # Создаем бронирование
             reservation = Reservation.objects.create(
                 user_id=user_id,
@@ -73,114 +75,547 @@ class ReservationService(BaseService):
                     minutes=settings.RESERVATION_TIMEOUT_MINUTES
                 )
             )
+            self.stats.record_created([reservation])
+        except Exception:
+            # Резерв в Redis не откатывается вместе с транзакцией
+            if reserved_in_redis:
+                self.inventory.release(product_id, quantity)
+            raise
 
-            # Резервируем товар
-            stock.reserved_quantity += quantity
-            stock.version += 1
-            stock.save(update_fields=['reserved_quantity', 'version', 'last_updated'])
+        # Планируем точное истечение брони после фиксации транзакции
+        transaction.on_commit(lambda: self.expiry_scheduler.schedule([reservation]))
 
-            # Очищаем кеш продукта
-            cache.delete(f"product_stock:{product_id}")
+        # Очищаем кеш продукта
+        cache.delete(f"product_stock:{product_id}")
 
-            # Отправляем уведомление
-            self.notification_service.send_reservation_created(reservation)
+        # Уведомление и аналитика (один раз на единицу работы)
+        dispatcher.emit('reservation_created', reservation)
 
-            # Записываем в аналитику
-            self.analytics_service.track_reservation_created(reservation)
+        self.logger.info(f"Reservation created: {reservation.id}")
+        return reservation
 
-            self.logger.info(f"Reservation created: {reservation.id}")
-            return reservation
+    @dispatcher.unit_of_work()
+    def create_reservations_batch(self, user_id: int, items: List[Dict[str, int]],
+                                  customer_info: Optional[Dict] = None) -> List[Reservation]:
+        """
+        Бронирование нескольких товаров по принципу "все или ничего".
 
-        except Product.DoesNotExist:
-            raise BusinessLogicError("Товар не найден или неактивен")
-        except ProductStock.DoesNotExist:
-            raise BusinessLogicError("Информация об остатках товара не найдена")
+        Строки product_stocks блокируются одним SELECT ... FOR UPDATE
+        в порядке возрастания product_id (без взаимных блокировок между
+        корзинами), резерв записывается одним UPDATE, брони - одним INSERT,
+        а в Kafka уходит одно агрегированное событие.
+        """
+        # Объединяем повторяющиеся товары и фиксируем порядок блокировок
+        quantities: Dict[int, int] = {}
+        for item in items:
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+        product_ids = sorted(quantities)
+
+        if not product_ids:
+            raise BusinessLogicError("Корзина пуста")
+
+        products = Product.objects.in_bulk(product_ids, field_name='id')
+        inactive = [pid for pid in product_ids if pid not in products or not products[pid].is_active]
+        if inactive:
+            raise BusinessLogicError(f"Товары не найдены или неактивны: {inactive}")
+
+        # Проверяем лимиты пользователя с учетом всей корзины
+        self.counters.acquire_pending(user_id, len(product_ids))
+
+        reserved_in_redis = self._reserve_stock_batch(quantities)
 
-    @transaction.atomic
-    def confirm_reservation(self, reservation_id: uuid.UUID, user_id: int) -> Reservation:
-        """Подтверждение бронирования"""
         try:
-            reservation = Reservation.objects.select_for_update().get(
-                id=reservation_id,
-                user_id=user_id,
-                status=ReservationStatus.PENDING
-            )
+            expires_at = timezone.now() + timedelta(minutes=settings.RESERVATION_TIMEOUT_MINUTES)
+            reservations = Reservation.objects.bulk_create([
+                Reservation(
+                    user_id=user_id,
+                    product=products[product_id],
+                    quantity=quantities[product_id],
+                    price_per_item=products[product_id].price,
+                    total_price=products[product_id].price * quantities[product_id],
+                    customer_info=customer_info or {},
+                    expires_at=expires_at
+                )
+                for product_id in product_ids
+            ])
+            self.stats.record_created(reservations)
+        except Exception:
+            for product_id in reserved_in_redis:
+                self.inventory.release(product_id, quantities[product_id])
+            raise
 
-            if reservation.is_expired:
-                # Автоматически отменяем просроченную бронь
-                return self.cancel_reservation(reservation_id, user_id, auto_cancel=True)
+        transaction.on_commit(lambda: self.expiry_scheduler.schedule(reservations))
+        cache.delete_many([f"product_stock:{product_id}" for product_id in product_ids])
 
-            # Подтверждаем бронь
-            reservation.status = ReservationStatus.CONFIRMED
-            reservation.confirmed_at = timezone.now()
-            reservation.save(update_fields=['status', 'confirmed_at', 'updated_at'])
+        # Одно событие на всю корзину
+        dispatcher.emit('reservations_batch_created', reservations)
 
-            # Уменьшаем общий остаток и резерв
-            stock = ProductStock.objects.select_for_update().get(
-                product=reservation.product
-            )
-            stock.quantity -= reservation.quantity
-            stock.reserved_quantity -= reservation.quantity
-            stock.version += 1
-            stock.save(update_fields=['quantity', 'reserved_quantity', 'version', 'last_updated'])
+        self.logger.info(f"Batch of {len(reservations)} reservations created for user {user_id}")
+        return reservations
 
-            # Очищаем кеш
-            cache.delete(f"product_stock:{reservation.product.id}")
+    @dispatcher.unit_of_work()
+    def create_product_reservations(self, product_id: int, requests: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Групповое бронирование одного товара по заявкам разных пользователей.
+
+        Лимиты проверяются в порядке возрастания user_id (счетчики, затем
+        остаток - тот же порядок блокировок, что у одиночной брони), затем
+        заявки в порядке поступления принимаются, пока хватает остатка.
+        Резерв всех принятых заявок берется одним изменением остатка,
+        брони создаются одним INSERT. Возвращает для каждой заявки бронь
+        или исключение с причиной отказа.
+        """
+        try:
+            product = Product.objects.get(id=product_id, is_active=True)
+        except Product.DoesNotExist:
+            return [BusinessLogicError("Товар не найден или неактивен")] * len(requests)
 
-            # Отправляем уведомления
-            self.notification_service.send_reservation_confirmed(reservation)
+        results: List[Any] = [None] * len(requests)
+        for index in sorted(range(len(requests)), key=lambda i: (requests[i]['user_id'], i)):
+            try:
+                self.counters.acquire_pending(requests[index]['user_id'])
+            except BusinessLogicError as e:
+                results[index] = e
+        admitted = [index for index, result in enumerate(results) if result is None]
+
+        accepted, reserved_in_redis, available = [], [], 0
+        for attempt in range(self.GROUP_RESERVE_ATTEMPTS):
+            available = self._available_quantity(product_id)
+            accepted = []
+            for index in admitted:
+                if requests[index]['quantity'] <= available:
+                    available -= requests[index]['quantity']
+                    accepted.append(index)
+            if not accepted:
+                break
 
-            # Аналитика
-            self.analytics_service.track_reservation_confirmed(reservation)
+            try:
+                reserved_in_redis = self._reserve_stock_batch({
+                    product_id: sum(requests[index]['quantity'] for index in accepted)
+                })
+                break
+            except InsufficientStockError:
+                # Остаток в Redis или слотах забрала параллельная одиночная бронь
+                accepted = []
+
+        # Непринятым заявкам возвращаем места в лимите пользователя
+        released: Dict[int, int] = {}
+        for index in admitted:
+            if index not in accepted:
+                results[index] = InsufficientStockError(
+                    f"Недостаточно товара. Доступно: {available}, "
+                    f"запрошено: {requests[index]['quantity']}"
+                )
+                user_id = requests[index]['user_id']
+                released[user_id] = released.get(user_id, 0) + 1
+        self.counters.release_pending(released)
 
-            self.logger.info(f"Reservation confirmed: {reservation.id}")
-            return reservation
+        if not accepted:
+            return results
 
-        except Reservation.DoesNotExist:
-            raise BusinessLogicError("Бронирование не найдено")
+        total = sum(requests[index]['quantity'] for index in accepted)
+        try:
+            expires_at = timezone.now() + timedelta(minutes=settings.RESERVATION_TIMEOUT_MINUTES)
+            reservations = Reservation.objects.bulk_create([
+                Reservation(
+                    user_id=requests[index]['user_id'],
+                    product=product,
+                    quantity=requests[index]['quantity'],
+                    price_per_item=product.price,
+                    total_price=product.price * requests[index]['quantity'],
+                    customer_info=requests[index].get('customer_info') or {},
+                    expires_at=expires_at
+                )
+                for index in accepted
+            ])
+            self.stats.record_created(reservations)
+        except Exception:
+            if reserved_in_redis:
+                self.inventory.release(product_id, total)
+            raise
+
+        transaction.on_commit(lambda: self.expiry_scheduler.schedule(reservations))
+        cache.delete(f"product_stock:{product_id}")
+
+        # Уведомления адресные - отдельное событие на каждого пользователя
+        by_user: Dict[int, List[Reservation]] = {}
+        for index, reservation in zip(accepted, reservations):
+            results[index] = reservation
+            by_user.setdefault(reservation.user_id, []).append(reservation)
+        for user_reservations in by_user.values():
+            dispatcher.emit('reservations_batch_created', user_reservations)
+
+        self.logger.info(
+            f"Group of {len(reservations)} reservations created for product {product_id}, "
+            f"{len(requests) - len(reservations)} rejected"
+        )
+        return results
+
+    def _available_quantity(self, product_id: int) -> int:
+        """
+        Доступный остаток товара для групповой брони. Строка обычного
+        остатка блокируется до конца транзакции; счетчики в Redis и слоты
+        не блокируются и проверяются повторно при резервировании.
+        """
+        available = self.inventory.get_available(product_id)
+        if available is not None:
+            return available
+
+        stock = ProductStock.objects.select_for_update().filter(product_id=product_id).first()
+        if stock is None:
+            raise BusinessLogicError("Информация об остатках товара не найдена")
+        if stock.slot_count:
+            quantity, reserved = ProductStockSlot.objects.totals(product_id)
+            return max(0, quantity - reserved)
+        return stock.available_quantity
+
+    def _reserve_stock_batch(self, quantities: Dict[int, int]) -> List[int]:
+        """
+        Резервирование нескольких товаров в порядке возрастания product_id.
+        Возвращает товары, резерв которых взят в Redis.
+        """
+        product_ids = sorted(quantities)
+        reserved_in_redis = []
+        sql_quantities = {}
 
-    @transaction.atomic
-    def cancel_reservation(self, reservation_id: uuid.UUID, user_id: int,
-                           auto_cancel: bool = False) -> Reservation:
-        """Отмена бронирования"""
         try:
-            reservation = Reservation.objects.select_for_update().get(
-                id=reservation_id,
-                user_id=user_id if not auto_cancel else models.Q()
+            for product_id in product_ids:
+                hot_result = self.inventory.reserve(product_id, quantities[product_id])
+                if hot_result is None:
+                    sql_quantities[product_id] = quantities[product_id]
+                    continue
+
+                reserved, available = hot_result
+                if not reserved:
+                    raise InsufficientStockError(
+                        f"Недостаточно товара {product_id}. "
+                        f"Доступно: {available}, запрошено: {quantities[product_id]}"
+                    )
+                reserved_in_redis.append(product_id)
+
+            if sql_quantities:
+                stocks = {
+                    stock.product_id: stock
+                    for stock in ProductStock.objects.select_for_update().filter(
+                        product_id__in=sql_quantities
+                    ).order_by('product_id')
+                }
+
+                plain_quantities = {}
+                for product_id, quantity in sql_quantities.items():
+                    stock = stocks.get(product_id)
+                    if stock is None:
+                        raise BusinessLogicError(
+                            f"Информация об остатках товара {product_id} не найдена"
+                        )
+                    # Шардированный остаток резервируется в слотах без блокировки сводки
+                    if stock.slot_count:
+                        reserved = ProductStockSlot.objects.try_apply(product_id, 0, quantity)
+                    else:
+                        reserved = stock.can_reserve(quantity)
+                        plain_quantities[product_id] = quantity
+                    if not reserved:
+                        raise InsufficientStockError(
+                            f"Недостаточно товара {product_id}. "
+                            f"Доступно: {stock.available_quantity}, запрошено: {quantity}"
+                        )
+
+                ProductStock.objects.apply_deltas({
+                    product_id: (0, quantity) for product_id, quantity in plain_quantities.items()
+                })
+
+        except Exception:
+            for product_id in reserved_in_redis:
+                self.inventory.release(product_id, quantities[product_id])
+            raise
+
+        return reserved_in_redis
+
+    def _reserve_stock(self, product_id: int, quantity: int) -> bool:
+        """
+        Резервирование остатка: через горячие счетчики в Redis, а если они
+        выключены или Redis недоступен - условным UPDATE в БД.
+        Возвращает True, если резерв взят в Redis.
+        """
+        hot_result = self.inventory.reserve(product_id, quantity)
+        if hot_result is not None:
+            reserved, available = hot_result
+            if not reserved:
+                raise InsufficientStockError(
+                    f"Недостаточно товара. Доступно: {available}, запрошено: {quantity}"
+                )
+            return True
+
+        stock = ProductStock.objects.try_reserve(product_id, quantity)
+        if stock is None:
+            raise self._insufficient_stock_error(product_id, quantity)
+        return False
+
+    def _insufficient_stock_error(self, product_id: int, quantity: int) -> Exception:
+        """Ошибка для неудавшегося резервирования с текущим доступным остатком"""
+        stock = ProductStock.objects.filter(product_id=product_id).first()
+        if stock is None:
+            return BusinessLogicError("Информация об остатках товара не найдена")
+
+        return InsufficientStockError(
+            f"Недостаточно товара. Доступно: {stock.available_quantity}, запрошено: {quantity}"
+        )
+
+    @dispatcher.unit_of_work()
+    def confirm_reservation(self, reservation_id: uuid.UUID, user_id: int) -> Reservation:
+        """
+        Подтверждение бронирования.
+
+        Переход выполняется условным UPDATE без SELECT ... FOR UPDATE;
+        просроченная бронь вместо подтверждения истекает.
+        """
+        now = timezone.now()
+        reservation, stock_applied = Reservation.objects.transition(
+            reservation_id, ReservationStatus.CONFIRMED, now, user_id=user_id, expired=False,
+            stock_factors=None if self.inventory.enabled else (-1, -1)
+        )
+        if reservation is None:
+            # Автоматически отменяем просроченную бронь
+            reservation, stock_applied = Reservation.objects.transition(
+                reservation_id, ReservationStatus.EXPIRED, now, user_id=user_id, expired=True,
+                stock_factors=None if self.inventory.enabled else (0, -1)
             )
+            if reservation is None:
+                raise BusinessLogicError("Бронирование не найдено")
+
+        self._finish_transition(reservation, stock_applied)
+        return reservation
 
-            if reservation.status not in [ReservationStatus.PENDING]:
+    @dispatcher.unit_of_work()
+    def cancel_reservation(self, reservation_id: uuid.UUID, user_id: int,
+                           auto_cancel: bool = False) -> Reservation:
+        """Отмена бронирования (условным UPDATE, без блокировки строки)"""
+        reservation, stock_applied = Reservation.objects.transition(
+            reservation_id,
+            ReservationStatus.EXPIRED if auto_cancel else ReservationStatus.CANCELLED,
+            timezone.now(),
+            user_id=None if auto_cancel else user_id,
+            stock_factors=None if self.inventory.enabled else (0, -1)
+        )
+        if reservation is None:
+            lookup = {'id': reservation_id} if auto_cancel else {'id': reservation_id, 'user_id': user_id}
+            if Reservation.objects.filter(**lookup).exists():
                 raise BusinessLogicError("Нельзя отменить уже обработанную бронь")
+            raise BusinessLogicError("Бронирование не найдено")
 
-            # Отменяем бронь
-            new_status = ReservationStatus.EXPIRED if auto_cancel else ReservationStatus.CANCELLED
-            reservation.status = new_status
-            reservation.cancelled_at = timezone.now()
-            reservation.save(update_fields=['status', 'cancelled_at', 'updated_at'])
+        self._finish_transition(reservation, stock_applied)
+        return reservation
 
+    def _finish_transition(self, reservation: Reservation, stock_applied: bool):
+        """Остатки, счетчики, расписание и события после смены статуса одной брони"""
+        quantities = {reservation.product_id: reservation.quantity}
+        if reservation.status == ReservationStatus.CONFIRMED:
+            # Уменьшаем общий остаток и резерв
+            if not stock_applied:
+                self._commit_stock_many(quantities)
+        elif stock_applied:
+            self.waitlist.notify_stock_released(quantities)
+            self.admission.notify_stock_released(quantities)
+        else:
             # Освобождаем резерв
-            stock = ProductStock.objects.select_for_update().get(
-                product=reservation.product
-            )
-            stock.reserved_quantity -= reservation.quantity
-            stock.version += 1
-            stock.save(update_fields=['reserved_quantity', 'version', 'last_updated'])
+            self._release_stock_many(quantities)
 
-            # Очищаем кеш
-            cache.delete(f"product_stock:{reservation.product.id}")
+        self.counters.record_transition(reservation.user_id, ReservationStatus.PENDING, reservation.status)
+        self.stats.record_transitions([reservation], ReservationStatus.PENDING)
 
-            # Уведомления
-            if not auto_cancel:
-                self.notification_service.send_reservation_cancelled(reservation)
+        # Бронь больше не должна истекать по расписанию
+        transaction.on_commit(lambda: self.expiry_scheduler.unschedule(reservation.id))
 
-            # Аналитика
-            self.analytics_service.track_reservation_cancelled(reservation)
+        # Очищаем кеш
+        cache.delete(f"product_stock:{reservation.product_id}")
 
-            self.logger.info(f"Reservation {'expired' if auto_cancel else 'cancelled'}: {reservation.id}")
-            return reservation
+        # Уведомления и аналитика
+        event_types = {
+            ReservationStatus.CONFIRMED: 'reservation_confirmed',
+            ReservationStatus.CANCELLED: 'reservation_cancelled',
+            ReservationStatus.EXPIRED: 'reservation_expired',
+        }
+        dispatcher.emit(event_types[reservation.status], reservation)
 
-        except Reservation.DoesNotExist:
-            raise BusinessLogicError("Бронирование не найдено")
+        self.logger.info(f"Reservation {reservation.status}: {reservation.id}")
+
+    @dispatcher.unit_of_work()
+    def confirm_reservations_batch(self, reservation_ids: List[uuid.UUID],
+                                   user_id: int) -> List[Dict[str, Any]]:
+        """
+        Подтверждение нескольких броней одной транзакцией.
+
+        Действующие брони подтверждаются, просроченные - истекают (как при
+        одиночном подтверждении). Остатки меняются одним UPDATE на пачку
+        товаров, события уходят пачкой. Возвращает результат по каждой брони.
+        """
+        now = timezone.now()
+        confirmed = Reservation.objects.transition_pending(
+            reservation_ids, user_id, ReservationStatus.CONFIRMED, now, expired=False
+        )
+        expired = Reservation.objects.transition_pending(
+            reservation_ids, user_id, ReservationStatus.EXPIRED, now, expired=True
+        )
+
+        self._commit_stock_many(self._quantities_by_product(confirmed))
+        self._release_stock_many(self._quantities_by_product(expired))
+        self._finish_batch_transition(confirmed, ReservationStatus.CONFIRMED)
+        self._finish_batch_transition(expired, ReservationStatus.EXPIRED)
+
+        dispatcher.emit('reservations_confirmed', confirmed)
+        dispatcher.emit('reservations_expired', expired)
+
+        self.logger.info(f"Batch confirm for user {user_id}: {len(confirmed)} confirmed, {len(expired)} expired")
+        return self._batch_results(reservation_ids, confirmed + expired)
+
+    @dispatcher.unit_of_work()
+    def cancel_reservations_batch(self, reservation_ids: List[uuid.UUID],
+                                  user_id: int) -> List[Dict[str, Any]]:
+        """Отмена нескольких броней одной транзакцией"""
+        cancelled = Reservation.objects.transition_pending(
+            reservation_ids, user_id, ReservationStatus.CANCELLED, timezone.now()
+        )
+
+        self._release_stock_many(self._quantities_by_product(cancelled))
+        self._finish_batch_transition(cancelled, ReservationStatus.CANCELLED)
+
+        dispatcher.emit('reservations_cancelled', cancelled)
+
+        self.logger.info(f"Batch cancel for user {user_id}: {len(cancelled)} cancelled")
+        return self._batch_results(reservation_ids, cancelled)
+
+    @dispatcher.unit_of_work()
+    def cascade_product(self, product_id: int, quantity: Optional[int] = None) -> Dict[str, int]:
+        """
+        Приведение активных броней товара в соответствие с товаром и остатком.
+
+        У неактивного товара отменяются все активные брони, у товара с
+        остатком меньше резерва - самые новые брони на величину превышения
+        (последняя затронутая бронь уменьшается). quantity - новый
+        остаток, если он еще не записан (шардированный остаток). Брони
+        меняются одним UPDATE, резерв снимается одним изменением остатка,
+        события уходят пачкой.
+        """
+        product = Product.objects.filter(id=product_id).first()
+        if product is None:
+            raise BusinessLogicError("Товар не найден")
+
+        excess = None
+        if product.is_active:
+            excess = self._reserve_excess(product_id, quantity)
+            if excess <= 0:
+                return {'cancelled': 0, 'reduced': 0}
+
+        cut = Reservation.objects.cut_pending(product_id, excess, timezone.now())
+        if not cut:
+            return {'cancelled': 0, 'reduced': 0}
+
+        cancelled = [reservation for reservation, _ in cut if reservation.status == ReservationStatus.CANCELLED]
+        reduced = [reservation for reservation, _ in cut if reservation.status == ReservationStatus.PENDING]
+        released = sum(quantity for _, quantity in cut)
+
+        # Снятый резерв не становится доступным остатком, поэтому
+        # очереди ожидания и допуск к брони не оповещаются
+        if not self.inventory.release(product_id, released):
+            ProductStock.objects.apply_deltas({product_id: (0, -released)})
+
+        self._finish_batch_transition(cancelled, ReservationStatus.CANCELLED)
+        self.stats.record_amount_changes(
+            (reservation, -reservation.price_per_item * quantity)
+            for reservation, quantity in cut if reservation.status == ReservationStatus.PENDING
+        )
+        cache.delete(f"product_stock:{product_id}")
+
+        dispatcher.emit('reservations_cancelled', cancelled)
+        if reduced:
+            dispatcher.emit('reservations_reduced', reduced)
+
+        self.logger.info(
+            f"Product {product_id} cascade: {len(cancelled)} reservations cancelled, "
+            f"{len(reduced)} reduced, {released} units released"
+        )
+        return {'cancelled': len(cancelled), 'reduced': len(reduced)}
+
+    def _reserve_excess(self, product_id: int, quantity: Optional[int] = None) -> int:
+        """
+        На сколько резерв товара превышает его остаток (строка остатка
+        блокируется). quantity заменяет текущий остаток товара.
+        """
+        counters = self.inventory.get_counters(product_id)
+        if counters is None:
+            stock = ProductStock.objects.select_for_update().filter(product_id=product_id).first()
+            if stock is None:
+                return 0
+            if stock.slot_count:
+                counters = ProductStockSlot.objects.totals(product_id)
+            else:
+                counters = (stock.quantity, stock.reserved_quantity)
+
+        current_quantity, reserved = counters
+        return reserved - (current_quantity if quantity is None else quantity)
+
+    def _quantities_by_product(self, reservations: List[Reservation]) -> Dict[int, int]:
+        quantities: Dict[int, int] = {}
+        for reservation in reservations:
+            quantities[reservation.product_id] = (
+                quantities.get(reservation.product_id, 0) + reservation.quantity
+            )
+        return quantities
+
+    def _finish_batch_transition(self, reservations: List[Reservation], to_status: str):
+        """Счетчики, расписание истечения и кеш после пакетной смены статуса"""
+        if not reservations:
+            return
+
+        self.counters.record_transitions(
+            (reservation.user_id, (ReservationStatus.PENDING, to_status))
+            for reservation in reservations
+        )
+        self.stats.record_transitions(reservations, ReservationStatus.PENDING)
+        reservation_ids = [reservation.id for reservation in reservations]
+        transaction.on_commit(lambda: self.expiry_scheduler.unschedule(*reservation_ids))
+        cache.delete_many(list({f"product_stock:{reservation.product_id}" for reservation in reservations}))
+
+    def _batch_results(self, reservation_ids: List[uuid.UUID],
+                       processed: List[Reservation]) -> List[Dict[str, Any]]:
+        statuses = {str(reservation.id): reservation.status for reservation in processed}
+        results = []
+        for reservation_id in dict.fromkeys(str(reservation_id) for reservation_id in reservation_ids):
+            if reservation_id in statuses:
+                results.append({'id': reservation_id, 'status': statuses[reservation_id]})
+            else:
+                results.append({
+                    'id': reservation_id,
+                    'status': 'failed',
+                    'error': "Бронирование не найдено или уже обработано"
+                })
+        return results
+
+    def send_due_reminders(self, batch_size: Optional[int] = None) -> int:
+        """
+        Напоминания о скором истечении броней пачками.
+
+        Брони, истекающие в ближайшие RESERVATION_REMINDER_LEAD_MINUTES,
+        отмечаются reminder_sent_at, а события напоминаний пишутся в outbox
+        в той же транзакции, поэтому каждое напоминание уходит один раз.
+        """
+        batch_size = batch_size or settings.RESERVATION_REMINDER_BATCH_SIZE
+        lead = timedelta(minutes=settings.RESERVATION_REMINDER_LEAD_MINUTES)
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                reservations = Reservation.objects.claim_reminders(timezone.now(), lead, batch_size)
+                if reservations:
+                    from apps.notifications.services import NotificationService
+                    NotificationService().send_reservation_reminders(reservations)
+            total += len(reservations)
+            if len(reservations) < batch_size:
+                break
+
+        if total:
+            self.logger.info(f"Sent {total} reservation reminders")
+        return total
 
     def get_user_reservations(self, user_id: int, status: Optional[str] = None) -> List[Reservation]:
         """Получение списка бронирований пользователя"""
@@ -193,21 +628,91 @@ class ReservationService(BaseService):
 
     def cleanup_expired_reservations(self) -> int:
         """Очистка просроченных бронирований (для Celery задачи)"""
-        expired_reservations = Reservation.objects.filter(
-            status=ReservationStatus.PENDING,
-            expires_at__lt=timezone.now()
-        ).select_related('product')
+        return self.expire_due_reservations()
 
-        count = 0
-        for reservation in expired_reservations:
-            try:
-                self.cancel_reservation(
-                    reservation.id,
-                    reservation.user_id,
-                    auto_cancel=True
-                )
-                count += 1
-            except Exception as e:
-                self.logger.error(f"Error cancelling expired reservation {reservation.id}: {e}")
+    def expire_due_reservations(self, chunk_size: Optional[int] = None,
+                                reservation_ids: Optional[List[uuid.UUID]] = None) -> int:
+        """
+        Истечение просроченных броней пачками.
 
-        return count
\ No newline at end of file
+        Каждая пачка - отдельная короткая транзакция: захват строк с
+        SKIP LOCKED и смена статуса одним UPDATE ... RETURNING, одно
+        освобождение резерва на товар и пакетная отправка событий.
+        """
+        chunk_size = chunk_size or settings.RESERVATION_EXPIRY_CHUNK_SIZE
+
+        # Брони из расписания ищем только в последних партициях; страховочная
+        # очистка без списка просматривает всю таблицу
+        since = Reservation.objects.hot_window_start() if reservation_ids is not None else None
+
+        total = 0
+        while True:
+            count = self._expire_chunk(chunk_size, reservation_ids, since)
+            total += count
+            if count < chunk_size:
+                break
+
+        if total:
+            self.logger.info(f"Expired {total} reservations")
+        return total
+
+    @dispatcher.unit_of_work()
+    def _expire_chunk(self, chunk_size: int,
+                      reservation_ids: Optional[List[uuid.UUID]] = None,
+                      since=None) -> int:
+        """Истечение одной пачки броней"""
+        expired = Reservation.objects.claim_expired(
+            now=timezone.now(),
+            limit=chunk_size,
+            reservation_ids=reservation_ids,
+            since=since
+        )
+        if not expired:
+            return 0
+
+        quantities = self._quantities_by_product(expired)
+        self._release_stock_many(quantities)
+        self.counters.record_transitions(
+            (reservation.user_id, (ReservationStatus.PENDING, ReservationStatus.EXPIRED))
+            for reservation in expired
+        )
+        self.stats.record_transitions(expired, ReservationStatus.PENDING)
+
+        cache.delete_many([f"product_stock:{product_id}" for product_id in quantities])
+
+        dispatcher.emit('reservations_expired', expired)
+
+        return len(expired)
+
+    def _commit_stock_many(self, quantities: Dict[int, int]):
+        """
+        Списание остатка и резерва по нескольким товарам: через горячие
+        счетчики, а для остальных товаров - одним UPDATE.
+        """
+        sql_quantities = {
+            product_id: quantity
+            for product_id, quantity in quantities.items()
+            if not self.inventory.commit(product_id, quantity)
+        }
+        ProductStock.objects.apply_deltas({
+            product_id: (-quantity, -quantity) for product_id, quantity in sql_quantities.items()
+        })
+
+    def _release_stock_many(self, quantities: Dict[int, int]):
+        """
+        Освобождение резерва по нескольким товарам: через горячие счетчики,
+        а для остальных товаров - одним UPDATE.
+        """
+        sql_quantities = {
+            product_id: quantity
+            for product_id, quantity in quantities.items()
+            if not self.inventory.release(product_id, quantity)
+        }
+        ProductStock.objects.apply_deltas({
+            product_id: (0, -quantity) for product_id, quantity in sql_quantities.items()
+        })
+
+        # Освободившийся остаток распределяется по очередям ожидания
+        # и снова открывает допуск к брони
+        self.waitlist.notify_stock_released(quantities)
+        self.admission.notify_stock_released(quantities)
@@ -4,8 +4,7 @@ from django.utils import timezone
 from django.core.cache import cache
 from apps.reservations.models import Reservation, ReservationStatus
 from apps.products.models import ProductStock
-from apps.notifications.services import NotificationService
-from apps.analytics.services import AnalyticsService
+from apps.core.events import dispatcher
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,39 +14,26 @@ logger = logging.getLogger(__name__)
 def reservation_post_save(sender, instance, created, **kwargs):
     """Обработка после сохранения бронирования"""
     try:
-        notification_service = NotificationService()
-        analytics_service = AnalyticsService()
-
         if created:
             # Новое бронирование создано
             logger.info(f"Reservation created: {instance.id}")
 
-            # Отправляем событие в Kafka
-            notification_service.send_reservation_created(instance)
-
-            # Планируем напоминание за 5 минут до истечения
-            from apps.reservations.tasks import send_reservation_reminder
-            from datetime import timedelta
-
-            reminder_time = instance.expires_at - timedelta(minutes=5)
-            if reminder_time > timezone.now():
-                send_reservation_reminder.apply_async(
-                    args=[str(instance.id)],
-                    eta=reminder_time
-                )
+            # Событие схлопывается с событием из ReservationService;
+            # напоминание отправит периодическая задача send_reservation_reminders
+            dispatcher.emit('reservation_created', instance)
 
         else:
             # Бронирование обновлено
-            # Проверяем изменение статуса
-            if hasattr(instance, '_original_status'):
-                if instance._original_status != instance.status:
-                    if instance.status == ReservationStatus.CONFIRMED:
-                        notification_service.send_reservation_confirmed(instance)
-                        analytics_service.track_reservation_confirmed(instance)
+            # Проверяем изменение статуса (прежний статус запомнен при загрузке)
+            if instance.has_changed('status'):
+                if instance.status == ReservationStatus.CONFIRMED:
+                    dispatcher.emit('reservation_confirmed', instance)
 
-                    elif instance.status in [ReservationStatus.CANCELLED, ReservationStatus.EXPIRED]:
-                        notification_service.send_reservation_cancelled(instance)
-                        analytics_service.track_reservation_cancelled(instance)
+                elif instance.status == ReservationStatus.CANCELLED:
+                    dispatcher.emit('reservation_cancelled', instance)
+
+                elif instance.status == ReservationStatus.EXPIRED:
+                    dispatcher.emit('reservation_expired', instance)
 
         # Обновляем кеш статистики
         cache.delete('reservation_stats')
@@ -61,16 +47,8 @@ def reservation_post_save(sender, instance, created, **kwargs):
 def reservation_pre_save(sender, instance, **kwargs):
     """Обработка перед сохранением бронирования"""
     try:
-        # Сохраняем оригинальный статус для отслеживания изменений
-        if instance.pk:
-            try:
-                original = Reservation.objects.get(pk=instance.pk)
-                instance._original_status = original.status
-            except Reservation.DoesNotExist:
-                instance._original_status = None
-
         # Валидация бизнес-правил
-        if instance.status == ReservationStatus.CONFIRMED:
+        if instance.status == ReservationStatus.CONFIRMED and instance.has_changed('status'):
             if instance.expires_at and timezone.now() > instance.expires_at:
                 logger.warning(f"Attempting to confirm expired reservation: {instance.id}")
                 instance.status = ReservationStatus.EXPIRED
@@ -85,14 +63,10 @@ def reservation_post_delete(sender, instance, **kwargs):
     try:
         # Освобождаем зарезервированный товар
         if instance.status == ReservationStatus.PENDING:
-            stock = ProductStock.objects.select_for_update().get(
-                product=instance.product
-            )
-            stock.reserved_quantity = max(0, stock.reserved_quantity - instance.quantity)
-            stock.save(update_fields=['reserved_quantity', 'last_updated'])
+            ProductStock.objects.apply_deltas({instance.product_id: (0, -instance.quantity)})
 
             # Очищаем кеш
-            cache.delete(f"product_stock:{instance.product.id}")
+            cache.delete(f"product_stock:{instance.product_id}")
 
         # Очищаем связанный кеш
         cache.delete('reservation_stats')
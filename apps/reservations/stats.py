@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from apps.core.services.base import BaseService
+from apps.reservations.models import Reservation, ReservationDailyStats, ReservationStatus
+
+
+class ReservationStatsService(BaseService):
+    """
+    Статистика броней из дневных корзин.
+
+    Создание, смена статуса и архивация брони в своей транзакции
+    меняют корзину (локальный день создания, статус): число и сумму.
+    Общие счетчики по статусам и суммы за период считаются по
+    корзинам без чтения таблицы reservations.
+    """
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        return True
+
+    def record_created(self, reservations: Iterable[Reservation]):
+        deltas: Dict[Tuple[date, str], Tuple[int, Decimal]] = {}
+        for reservation in reservations:
+            self._add(deltas, reservation.created_at, reservation.status, 1, reservation.total_price)
+        self._apply(deltas)
+
+    def record_transitions(self, reservations: Iterable[Reservation], from_status: str):
+        """Перенос броней из корзин from_status в корзины их нового статуса"""
+        deltas: Dict[Tuple[date, str], Tuple[int, Decimal]] = {}
+        for reservation in reservations:
+            self._add(deltas, reservation.created_at, from_status, -1, -reservation.total_price)
+            self._add(deltas, reservation.created_at, reservation.status, 1, reservation.total_price)
+        self._apply(deltas)
+
+    def record_amount_changes(self, changes: Iterable[Tuple[Reservation, Decimal]]):
+        """Изменение суммы броней без смены статуса: пары (бронь, изменение суммы)"""
+        deltas: Dict[Tuple[date, str], Tuple[int, Decimal]] = {}
+        for reservation, amount in changes:
+            self._add(deltas, reservation.created_at, reservation.status, 0, amount)
+        self._apply(deltas)
+
+    def record_removed(self, rows: Iterable[Dict[str, Any]]):
+        """Вычитание удаленных из таблицы броней (строки values() с created_at, status, total_price)"""
+        deltas: Dict[Tuple[date, str], Tuple[int, Decimal]] = {}
+        for row in rows:
+            self._add(deltas, row['created_at'], row['status'], -1, -row['total_price'])
+        self._apply(deltas)
+
+    def _add(self, deltas, created_at, status, count, amount):
+        key = (timezone.localdate(created_at), status)
+        current_count, current_amount = deltas.get(key, (0, Decimal('0')))
+        deltas[key] = (current_count + count, current_amount + amount)
+
+    def _apply(self, deltas: Dict[Tuple[date, str], Tuple[int, Decimal]]):
+        ReservationDailyStats.objects.apply_deltas(deltas, settings.RESERVATION_STATS_SLOTS)
+
+    def by_status(self) -> Dict[str, int]:
+        """Число броней по статусам"""
+        rows = ReservationDailyStats.objects.values('status').annotate(total=Sum('count'))
+        counts = {status: 0 for status in ReservationStatus.values}
+        counts.update({row['status']: row['total'] for row in rows})
+        return counts
+
+    def period(self, since: date, until: Optional[date] = None, with_average: bool = True) -> Dict[str, Any]:
+        """Число, сумма (и средняя сумма) броней, созданных в дни [since, until]"""
+        buckets = ReservationDailyStats.objects.filter(day__gte=since)
+        if until is not None:
+            buckets = buckets.filter(day__lte=until)
+        totals = buckets.aggregate(count=Sum('count'), total_amount=Sum('amount'))
+
+        count = totals['count'] or 0
+        total_amount = totals['total_amount'] if count else None
+        result = {'count': count, 'total_amount': total_amount}
+        if with_average:
+            result['avg_amount'] = total_amount / count if count else None
+        return result
+
+    def overview(self) -> Dict[str, Any]:
+        """Сводка для ReservationStatsView"""
+        today = timezone.localdate()
+        by_status = self.by_status()
+
+        return {
+            'overview': {
+                'total_reservations': sum(by_status.values()),
+                'active_reservations': by_status[ReservationStatus.PENDING],
+            },
+            'by_status': {status: count for status, count in by_status.items() if count},
+            'periods': {
+                'today': self.period(today, today, with_average=False),
+                'week': self.period(today - timedelta(days=7)),
+                'month': self.period(today - timedelta(days=30)),
+            }
+        }
+
+    def compact(self) -> int:
+        """Слияние слотов корзин за прошедшие дни"""
+        return ReservationDailyStats.objects.compact(timezone.localdate())
+
+    def rebuild(self) -> int:
+        """Пересчет корзин с нуля по таблице броней"""
+        with transaction.atomic():
+            buckets = ReservationDailyStats.objects.rebuild(settings.TIME_ZONE)
+
+        self.logger.info(f"Rebuilt reservation stats: {buckets} buckets")
+        return buckets
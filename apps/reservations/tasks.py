@@ -36,34 +36,160 @@ def cleanup_expired_reservations(self):
         raise self.retry(exc=exc, countdown=countdown)
 
 
+@shared_task(bind=True)
+def allocate_waitlist(self, product_id):
+    """
+    Распределение освободившегося остатка товара по очереди ожидания
+    """
+    try:
+        from apps.reservations.waitlist import WaitlistService
+
+        allocated = WaitlistService().allocate(product_id)
+
+        return {
+            'status': 'success',
+            'product_id': product_id,
+            'allocated_count': allocated,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error allocating waitlist for product {product_id}: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def allocate_waitlists(self):
+    """
+    Периодический проход по всем очередям ожидания
+    """
+    try:
+        from apps.reservations.waitlist import WaitlistService
+
+        allocated = WaitlistService().allocate_all()
+
+        return {
+            'status': 'success',
+            'allocated_count': allocated,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error allocating waitlists: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def maintain_reservation_partitions(self):
+    """
+    Создание будущих и отсоединение старых секций таблицы бронирований
+    """
+    try:
+        from apps.reservations.partitions import ReservationPartitionService
+
+        result = ReservationPartitionService().maintain()
+
+        logger.info(f"Reservation partitions maintained: {result}")
+
+        return {
+            'status': 'success',
+            **result,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error maintaining reservation partitions: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def archive_reservations(self):
+    """
+    Перенос старых завершенных бронирований в архив
+    """
+    try:
+        from apps.reservations.archive import ReservationArchiveService
+
+        count = ReservationArchiveService().archive()
+
+        return {
+            'status': 'success',
+            'archived_count': count,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error archiving reservations: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def compact_reservation_stats(self):
+    """
+    Слияние слотов дневных корзин статистики бронирований
+    """
+    try:
+        from apps.reservations.stats import ReservationStatsService
+
+        count = ReservationStatsService().compact()
+
+        return {
+            'status': 'success',
+            'compacted_count': count,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error compacting reservation stats: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def send_reservation_reminders(self):
+    """
+    Отправка напоминаний о скором истечении бронирований пачками
+    """
+    try:
+        service = ReservationService()
+        count = service.send_due_reminders()
+
+        return {
+            'status': 'success',
+            'sent_count': count,
+            'timestamp': timezone.now().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"Error sending reservation reminders: {exc}")
+        raise
+
+
 @shared_task(bind=True)
 def send_reservation_reminder(self, reservation_id):
     """
-    Отправка напоминания о скором истечении бронирования
+    Отправка напоминания об одном бронировании.
+
+    Оставлена для ETA-задач, поставленных до перехода на
+    send_reservation_reminders; новые задачи не ставятся.
     """
     try:
-        reservation = Reservation.objects.get(
+        updated = Reservation.objects.filter(
             id=reservation_id,
-            status=ReservationStatus.PENDING
-        )
-
-        # Проверяем, что бронь еще не истекла
-        if not reservation.is_expired:
-            from apps.notifications.services import NotificationService
-            notification_service = NotificationService()
-
-            # Отправляем напоминание
-            notification_service.send_reservation_reminder(reservation)
-
-            logger.info(f"Reminder sent for reservation {reservation_id}")
-            return {'status': 'success', 'reservation_id': str(reservation_id)}
-        else:
-            logger.info(f"Reservation {reservation_id} already expired, skipping reminder")
-            return {'status': 'skipped', 'reason': 'expired'}
-
-    except Reservation.DoesNotExist:
-        logger.warning(f"Reservation {reservation_id} not found for reminder")
-        return {'status': 'error', 'reason': 'not_found'}
+            status=ReservationStatus.PENDING,
+            reminder_sent_at__isnull=True,
+            expires_at__gt=timezone.now()
+        ).update(reminder_sent_at=timezone.now())
+
+        if not updated:
+            logger.info(f"Reservation {reservation_id} is not pending or already reminded, skipping reminder")
+            return {'status': 'skipped', 'reason': 'not_due'}
+
+        from apps.notifications.services import NotificationService
+        NotificationService().send_reservation_reminders([Reservation.objects.get(id=reservation_id)])
+
+        logger.info(f"Reminder sent for reservation {reservation_id}")
+        return {'status': 'success', 'reservation_id': str(reservation_id)}
+
     except Exception as exc:
         logger.error(f"Error sending reminder for reservation {reservation_id}: {exc}")
         raise
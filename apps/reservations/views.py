@@ -6,15 +6,24 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from apps.core.views import BaseViewSet
-from apps.core.exceptions import BusinessLogicError, InsufficientStockError
-from apps.reservations.serializers import ReservationSerializer, ReservationCreateSerializer
+from apps.core.pagination import KeysetPagination
+from apps.core.exceptions import BusinessLogicError, InsufficientStockError, AdmissionQueuedError
+from apps.core.idempotency import idempotent
+from apps.reservations.serializers import (
+    ReservationSerializer, ReservationCreateSerializer, ReservationBatchCreateSerializer,
+    ReservationIdsSerializer, ReservationBatchResultSerializer,
+    WaitlistJoinSerializer, WaitlistEntrySerializer
+)
 from apps.reservations.services import ReservationService
+from apps.reservations.admission import ReservationAdmissionService
+from apps.reservations.group_commit import ReservationGroupCommitService
+from apps.reservations.waitlist import WaitlistService
+from apps.reservations.read_model import ReservationReadModel
+from apps.reservations.stats import ReservationStatsService
 from apps.reservations.filters import ReservationFilter
 
 from rest_framework.views import APIView
-from django.db.models import Count, Sum, Avg
-from django.utils import timezone
-from datetime import timedelta
+from django.conf import settings
 
 from apps.reservations.models import Reservation, ReservationStatus
 
@@ -30,10 +39,15 @@ class ReservationViewSet(BaseViewSet):
     search_fields = ['product__name', 'product__sku']
     ordering_fields = ['created_at', 'expires_at', 'total_price']
     ordering = ['-created_at']
+    keyset_pagination_class = KeysetPagination
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.reservation_service = ReservationService()
+        self.admission_service = ReservationAdmissionService()
+        self.group_commit_service = ReservationGroupCommitService()
+        self.waitlist_service = WaitlistService()
+        self.read_model = ReservationReadModel()
 
     def get_queryset(self):
         """Пользователь видит только свои бронирования"""
@@ -41,16 +55,43 @@ class ReservationViewSet(BaseViewSet):
 
     @extend_schema(
         request=ReservationCreateSerializer,
-        responses={201: ReservationSerializer, 400: 'Bad Request'},
+        parameters=[
+            OpenApiParameter(
+                name='async',
+                type=OpenApiTypes.BOOL,
+                description='Поставить заявку в очередь товара и вернуть квитанцию (202)'
+            )
+        ],
+        responses={201: ReservationSerializer, 202: 'Accepted', 400: 'Bad Request', 429: 'Queued'},
         description="Создание нового бронирования"
     )
+    @idempotent
     def create(self, request):
         """Создание бронирования"""
         serializer = ReservationCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        if settings.RESERVATION_GROUP_COMMIT_ENABLED and request.query_params.get('async') in ('1', 'true'):
+            ticket = self.group_commit_service.submit(
+                user_id=request.user.id,
+                product_id=serializer.validated_data['product_id'],
+                quantity=serializer.validated_data['quantity'],
+                customer_info=serializer.validated_data.get('customer_info', {})
+            )
+            # Без Redis бронируем синхронно
+            if ticket is not None:
+                return Response(
+                    {
+                        'ticket': ticket,
+                        'status': 'queued',
+                        'status_url': request.build_absolute_uri(f"{request.path}tickets/{ticket}/"),
+                    },
+                    status=status.HTTP_202_ACCEPTED
+                )
+
         try:
-            reservation = self.reservation_service.create_reservation(
+            # Запрос проходит контроль допуска до обращения к БД
+            reservation = self.admission_service.reserve(
                 user_id=request.user.id,
                 product_id=serializer.validated_data['product_id'],
                 quantity=serializer.validated_data['quantity'],
@@ -60,6 +101,64 @@ class ReservationViewSet(BaseViewSet):
             response_serializer = ReservationSerializer(reservation)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
+        except AdmissionQueuedError as e:
+            return Response(
+                {'error': str(e), 'code': 'admission_queued', 'position': e.position},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(settings.RESERVATION_ADMISSION_RETRY_AFTER_SECONDS)}
+            )
+        except InsufficientStockError as e:
+            return Response(
+                {'error': str(e), 'code': 'insufficient_stock'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except BusinessLogicError as e:
+            return Response(
+                {'error': str(e), 'code': 'business_logic_error'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    @extend_schema(
+        responses={200: 'Ticket', 404: 'Not Found'},
+        description="Состояние асинхронной заявки на бронь"
+    )
+    @action(detail=False, methods=['get'], url_path=r'tickets/(?P<ticket>[0-9a-f]{32})')
+    def ticket(self, request, ticket=None):
+        """Состояние заявки, поставленной в очередь через ?async=1"""
+        data = self.group_commit_service.get_ticket(ticket, request.user.id)
+        if data is None:
+            return Response(
+                {'error': 'Заявка не найдена', 'code': 'not_found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if data['reservation_id']:
+            reservation = self.get_queryset().filter(id=data['reservation_id']).first()
+            data['reservation'] = ReservationSerializer(reservation).data if reservation else None
+        return Response(data)
+
+    @extend_schema(
+        request=ReservationBatchCreateSerializer,
+        responses={201: ReservationSerializer(many=True), 400: 'Bad Request'},
+        description="Бронирование нескольких товаров одной транзакцией (все или ничего)"
+    )
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def batch(self, request):
+        """Пакетное бронирование корзины"""
+        serializer = ReservationBatchCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            reservations = self.reservation_service.create_reservations_batch(
+                user_id=request.user.id,
+                items=serializer.validated_data['items'],
+                customer_info=serializer.validated_data.get('customer_info', {})
+            )
+
+            response_serializer = ReservationSerializer(reservations, many=True)
+            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
         except InsufficientStockError as e:
             return Response(
                 {'error': str(e), 'code': 'insufficient_stock'},
@@ -76,6 +175,7 @@ class ReservationViewSet(BaseViewSet):
         description="Подтверждение бронирования"
     )
     @action(detail=True, methods=['post'])
+    @idempotent
     def confirm(self, request, pk=None):
         """Подтверждение бронирования"""
         try:
@@ -98,6 +198,7 @@ class ReservationViewSet(BaseViewSet):
         description="Отмена бронирования"
     )
     @action(detail=True, methods=['post'])
+    @idempotent
     def cancel(self, request, pk=None):
         """Отмена бронирования"""
         try:
@@ -115,6 +216,93 @@ class ReservationViewSet(BaseViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @extend_schema(
+        request=ReservationIdsSerializer,
+        responses={200: ReservationBatchResultSerializer(many=True)},
+        description="Подтверждение нескольких бронирований одной транзакцией"
+    )
+    @action(detail=False, methods=['post'], url_path='confirm-batch')
+    @idempotent
+    def confirm_batch(self, request):
+        """Пакетное подтверждение бронирований"""
+        serializer = ReservationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = self.reservation_service.confirm_reservations_batch(
+            reservation_ids=serializer.validated_data['reservation_ids'],
+            user_id=request.user.id
+        )
+        return Response({'results': results})
+
+    @extend_schema(
+        request=ReservationIdsSerializer,
+        responses={200: ReservationBatchResultSerializer(many=True)},
+        description="Отмена нескольких бронирований одной транзакцией"
+    )
+    @action(detail=False, methods=['post'], url_path='cancel-batch')
+    @idempotent
+    def cancel_batch(self, request):
+        """Пакетная отмена бронирований"""
+        serializer = ReservationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = self.reservation_service.cancel_reservations_batch(
+            reservation_ids=serializer.validated_data['reservation_ids'],
+            user_id=request.user.id
+        )
+        return Response({'results': results})
+
+    @extend_schema(
+        request=WaitlistJoinSerializer,
+        responses={200: WaitlistEntrySerializer(many=True), 201: WaitlistEntrySerializer},
+        description="Очередь ожидания распроданных товаров: список записей или постановка в очередь"
+    )
+    @action(detail=False, methods=['get', 'post'])
+    def waitlist(self, request):
+        """Записи пользователя в очередях ожидания / постановка в очередь"""
+        if request.method == 'GET':
+            entries = self.waitlist_service.get_user_entries(request.user.id)
+            page = self.paginate_queryset(entries)
+            if page is not None:
+                serializer = WaitlistEntrySerializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            return Response(WaitlistEntrySerializer(entries, many=True).data)
+
+        serializer = WaitlistJoinSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            entry = self.waitlist_service.join(
+                user_id=request.user.id,
+                product_id=serializer.validated_data['product_id'],
+                quantity=serializer.validated_data['quantity'],
+                customer_info=serializer.validated_data.get('customer_info', {})
+            )
+        except BusinessLogicError as e:
+            return Response(
+                {'error': str(e), 'code': 'business_logic_error'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        responses={200: WaitlistEntrySerializer, 400: 'Bad Request'},
+        description="Выход из очереди ожидания"
+    )
+    @action(detail=False, methods=['post'], url_path=r'waitlist/(?P<entry_id>\d+)/leave')
+    def waitlist_leave(self, request, entry_id=None):
+        """Выход из очереди ожидания"""
+        try:
+            entry = self.waitlist_service.leave(request.user.id, int(entry_id))
+        except BusinessLogicError as e:
+            return Response(
+                {'error': str(e), 'code': 'business_logic_error'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(WaitlistEntrySerializer(entry).data)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -130,6 +318,15 @@ class ReservationViewSet(BaseViewSet):
     def my_reservations(self, request):
         """Получение бронирований текущего пользователя"""
         status_filter = request.query_params.get('status')
+
+        # Готовые представления из read-модели в Redis; курсорные
+        # страницы читаются из БД по индексу (user, created_at, id)
+        if not KeysetPagination.is_requested(request):
+            items = self.read_model.get_items(request.user.id, status_filter)
+            if items is not None:
+                page = self.paginate_queryset(items)
+                return self.get_paginated_response(self.read_model.present(page, request.user))
+
         reservations = self.reservation_service.get_user_reservations(
             user_id=request.user.id,
             status=status_filter
@@ -149,55 +346,8 @@ class ReservationStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Базовая статистика
-        total_reservations = Reservation.objects.count()
-        active_reservations = Reservation.objects.filter(
-            status=ReservationStatus.PENDING
-        ).count()
-
-        # Статистика по статусам
-        status_stats = Reservation.objects.values('status').annotate(
-            count=Count('id')
-        )
-
-        # Статистика за период
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-
-        today_stats = Reservation.objects.filter(created_at__date=today).aggregate(
-            count=Count('id'),
-            total_amount=Sum('total_price')
-        )
-
-        week_stats = Reservation.objects.filter(
-            created_at__date__gte=week_ago
-        ).aggregate(
-            count=Count('id'),
-            total_amount=Sum('total_price'),
-            avg_amount=Avg('total_price')
-        )
-
-        month_stats = Reservation.objects.filter(
-            created_at__date__gte=month_ago
-        ).aggregate(
-            count=Count('id'),
-            total_amount=Sum('total_price'),
-            avg_amount=Avg('total_price')
-        )
-
-        return Response({
-            'overview': {
-                'total_reservations': total_reservations,
-                'active_reservations': active_reservations,
-            },
-            'by_status': {item['status']: item['count'] for item in status_stats},
-            'periods': {
-                'today': today_stats,
-                'week': week_stats,
-                'month': month_stats,
-            }
-        })
+        # Счетчики и суммы из дневных корзин, без агрегатов по reservations
+        return Response(ReservationStatsService().overview())
 
 
 class UserReservationHistoryView(APIView):
@@ -205,20 +355,39 @@ class UserReservationHistoryView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        from apps.core.pagination import StandardResultsSetPagination
+        from apps.reservations.serializers import ReservationSerializer
+
+        status_filter = request.query_params.get('status')
+        keyset = KeysetPagination.is_requested(request)
+        paginator = KeysetPagination() if keyset else StandardResultsSetPagination()
+
+        # Архивная история читается из сегментов архива по индексу
+        if request.query_params.get('archived') in ('1', 'true'):
+            from apps.reservations.archive import ReservationArchiveService
+
+            paginator = StandardResultsSetPagination()
+            history = ReservationArchiveService().user_history(request.user.id, status_filter or None)
+            page = paginator.paginate_queryset(history, request)
+            return paginator.get_paginated_response(page)
+
+        # Последние брони - из read-модели в Redis
+        if not keyset:
+            read_model = ReservationReadModel()
+            items = read_model.get_items(request.user.id, status_filter)
+            if items is not None:
+                page = paginator.paginate_queryset(items, request)
+                return paginator.get_paginated_response(read_model.present(page, request.user))
+
         reservations = Reservation.objects.filter(
             user=request.user
         ).select_related('product').order_by('-created_at')
 
         # Фильтрация по статусу
-        status_filter = request.query_params.get('status')
         if status_filter:
             reservations = reservations.filter(status=status_filter)
 
         # Пагинация
-        from apps.core.pagination import StandardResultsSetPagination
-        from apps.reservations.serializers import ReservationSerializer
-
-        paginator = StandardResultsSetPagination()
         page = paginator.paginate_queryset(reservations, request)
 
         serializer = ReservationSerializer(page, many=True)
@@ -0,0 +1,228 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction, connection, IntegrityError
+from django.utils import timezone
+from typing import Dict, Any, Iterable, List, Optional
+from redis.exceptions import RedisError
+
+from apps.core.services.base import BaseService
+from apps.core.exceptions import BusinessLogicError, InsufficientStockError
+from apps.core.events import dispatcher
+from apps.products.models import Product
+from apps.reservations.models import WaitlistEntry, WaitlistStatus
+
+
+# Класс advisory-блокировки распределения: второй ключ - id товара,
+# одновременно очередь товара разбирает один воркер
+WAITLIST_ALLOCATION_LOCK_CLASS = 7_411_002
+
+
+class WaitlistService(BaseService):
+    """
+    Очередь ожидания распроданных товаров.
+
+    Вместо повторных попыток брони клиент встает в очередь. Когда
+    остаток освобождается (отмена, истечение, пополнение), задача
+    allocate_waitlist одной транзакцией создает брони ожидающим в
+    порядке очереди, пока хватает остатка. Множество товаров с
+    непустой очередью хранится в Redis, чтобы освобождение остатка
+    товара без очереди не ставило задачу.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._redis = None
+
+    def validate_data(self, data: Dict[str, Any]) -> bool:
+        required_fields = ['user_id', 'product_id', 'quantity']
+        return all(field in data for field in required_fields)
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection('default')
+        return self._redis
+
+    def _key(self) -> str:
+        return cache.make_key('waitlist_products')
+
+    @transaction.atomic
+    def join(self, user_id: int, product_id: int, quantity: int,
+             customer_info: Optional[Dict] = None) -> WaitlistEntry:
+        """Постановка пользователя в очередь ожидания товара"""
+        if not Product.objects.filter(id=product_id, is_active=True).exists():
+            raise BusinessLogicError("Товар не найден или неактивен")
+
+        try:
+            with transaction.atomic():
+                entry = WaitlistEntry.objects.create(
+                    user_id=user_id,
+                    product_id=product_id,
+                    quantity=quantity,
+                    customer_info=customer_info or {}
+                )
+        except IntegrityError:
+            raise BusinessLogicError("Вы уже в очереди ожидания этого товара")
+
+        # Остаток мог освободиться между отказом в брони и постановкой в очередь
+        transaction.on_commit(lambda: self._enqueue([product_id], mark=True))
+
+        self.logger.info(f"User {user_id} joined waitlist for product {product_id}")
+        return entry
+
+    @transaction.atomic
+    def leave(self, user_id: int, entry_id: int) -> WaitlistEntry:
+        """Выход из очереди ожидания"""
+        entry = WaitlistEntry.objects.select_for_update().filter(
+            id=entry_id, user_id=user_id
+        ).first()
+        if entry is None:
+            raise BusinessLogicError("Запись в очереди ожидания не найдена")
+        if entry.status != WaitlistStatus.WAITING:
+            raise BusinessLogicError("Запись в очереди ожидания уже обработана")
+
+        entry.status = WaitlistStatus.CANCELLED
+        entry.cancelled_at = timezone.now()
+        entry.save(update_fields=['status', 'cancelled_at'])
+        return entry
+
+    def position(self, entry: WaitlistEntry) -> Optional[int]:
+        """Позиция в очереди (с 1) для ожидающей записи"""
+        if entry.status != WaitlistStatus.WAITING:
+            return None
+        return WaitlistEntry.objects.filter(
+            product_id=entry.product_id,
+            status=WaitlistStatus.WAITING,
+            id__lte=entry.id
+        ).count()
+
+    def get_user_entries(self, user_id: int) -> List[WaitlistEntry]:
+        """Записи пользователя в очередях ожидания"""
+        return WaitlistEntry.objects.select_related('product').filter(
+            user_id=user_id
+        ).order_by('-created_at')
+
+    def notify_stock_released(self, product_ids: Iterable[int]):
+        """
+        Сообщение об освободившемся остатке. Распределение запускается
+        после commit и только для товаров с непустой очередью.
+        """
+        product_ids = list(product_ids)
+        if product_ids:
+            transaction.on_commit(lambda: self._enqueue(product_ids))
+
+    def _enqueue(self, product_ids: List[int], mark: bool = False):
+        from apps.reservations.tasks import allocate_waitlist
+
+        if mark:
+            self._mark(product_ids)
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for product_id in product_ids:
+                pipe.sismember(self._key(), product_id)
+            waiting = pipe.execute()
+        except RedisError as e:
+            self.logger.warning(f"Failed to check waitlist products in Redis: {e}")
+            waiting = [True] * len(product_ids)
+
+        for product_id, has_waiters in zip(product_ids, waiting):
+            if has_waiters:
+                allocate_waitlist.delay(product_id)
+
+    def _try_lock(self, product_id: int) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_xact_lock(%s, %s)",
+                [WAITLIST_ALLOCATION_LOCK_CLASS, product_id]
+            )
+            return cursor.fetchone()[0]
+
+    @dispatcher.unit_of_work()
+    def allocate(self, product_id: int, batch_size: int = None) -> int:
+        """
+        Распределение освободившегося остатка товара по очереди.
+
+        Брони создаются строго в порядке очереди одной транзакцией:
+        если первому ожидающему не хватает остатка, следующие не
+        обслуживаются. Ожидающие, которым бронь сейчас недоступна по
+        другим причинам (лимит активных броней), пропускаются и
+        остаются в очереди. Возвращает число созданных броней.
+        """
+        from apps.reservations.services import ReservationService
+
+        batch_size = batch_size or settings.WAITLIST_ALLOCATION_BATCH_SIZE
+
+        if not self._try_lock(product_id):
+            return 0
+
+        if not Product.objects.filter(id=product_id, is_active=True).exists():
+            return 0
+
+        entries = list(
+            WaitlistEntry.objects.select_for_update(skip_locked=True).filter(
+                product_id=product_id,
+                status=WaitlistStatus.WAITING
+            ).order_by('id')[:batch_size]
+        )
+
+        reservation_service = ReservationService()
+        allocated = []
+        now = timezone.now()
+        for entry in entries:
+            try:
+                entry.reservation = reservation_service.create_reservation(
+                    user_id=entry.user_id,
+                    product_id=product_id,
+                    quantity=entry.quantity,
+                    customer_info=entry.customer_info
+                )
+            except InsufficientStockError:
+                break
+            except BusinessLogicError as e:
+                self.logger.info(f"Waitlist entry {entry.id} skipped: {e}")
+                continue
+
+            entry.status = WaitlistStatus.ALLOCATED
+            entry.allocated_at = now
+            allocated.append(entry)
+
+        if allocated:
+            WaitlistEntry.objects.bulk_update(allocated, ['status', 'reservation', 'allocated_at'])
+            dispatcher.emit('waitlist_allocated', allocated)
+            self.logger.info(f"Allocated {len(allocated)} waitlist entries for product {product_id}")
+
+        if not WaitlistEntry.objects.filter(product_id=product_id, status=WaitlistStatus.WAITING).exists():
+            transaction.on_commit(lambda: self._unmark(product_id))
+
+        return len(allocated)
+
+    def allocate_all(self) -> int:
+        """Проход по всем товарам с непустой очередью (страховка для задач)"""
+        product_ids = list(
+            WaitlistEntry.objects.filter(
+                status=WaitlistStatus.WAITING
+            ).values_list('product_id', flat=True).distinct()
+        )
+        # Восстанавливаем множество в Redis, если оно было потеряно
+        self._mark(product_ids)
+
+        total = 0
+        for product_id in product_ids:
+            total += self.allocate(product_id)
+        return total
+
+    def _mark(self, product_ids: List[int]):
+        if not product_ids:
+            return
+        try:
+            self.redis.sadd(self._key(), *product_ids)
+        except RedisError as e:
+            self.logger.warning(f"Failed to update waitlist products in Redis: {e}")
+
+    def _unmark(self, product_id: int):
+        try:
+            self.redis.srem(self._key(), product_id)
+        except RedisError as e:
+            self.logger.warning(f"Failed to update waitlist products in Redis: {e}")
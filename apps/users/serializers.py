@@ -28,7 +28,12 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_reservations_count(self, obj):
         """Количество бронирований пользователя"""
-        return getattr(obj, 'reservations_count', obj.reservations.count())
+        counters = getattr(obj, 'reservation_counters', None)
+        if counters is not None:
+            return counters.total
+
+        from apps.reservations.counters import ReservationCounterService
+        return sum(ReservationCounterService().get(obj.id).values())
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -40,9 +40,10 @@ class UserViewSet(BaseViewSet):
 
     def get_queryset(self):
         """Пользователи видят только свой профиль, админы - всех"""
+        queryset = User.objects.select_related('reservation_counters')
         if self.request.user.is_staff:
-            return User.objects.all()
-        return User.objects.filter(id=self.request.user.id)
+            return queryset.all()
+        return queryset.filter(id=self.request.user.id)
 
     @extend_schema(description="Деактивировать аккаунт пользователя")
     @action(detail=True, methods=['post'])
@@ -58,16 +59,13 @@ class UserViewSet(BaseViewSet):
     def stats(self, request, pk=None):
         """Статистика пользователя"""
         user = self.get_object()
-        from apps.reservations.models import Reservation
+        from apps.reservations.counters import ReservationCounterService
 
+        counters = ReservationCounterService().get(user.id)
         stats = {
-            'total_reservations': user.reservations.count(),
-            'active_reservations': user.reservations.filter(
-                status='pending'
-            ).count(),
-            'confirmed_reservations': user.reservations.filter(
-                status='confirmed'
-            ).count(),
+            'total_reservations': sum(counters.values()),
+            'active_reservations': counters['pending'],
+            'confirmed_reservations': counters['confirmed'],
         }
         return Response(stats)
 
@@ -27,7 +27,43 @@ app.conf.update(
 app.conf.beat_schedule = {
     'cleanup-expired-reservations': {
         'task': 'apps.reservations.tasks.cleanup_expired_reservations',
-        'schedule': 60.0,  # каждую минуту
+        'schedule': 60.0,  # страховка для expiry_worker, каждую минуту
+    },
+    'send-reservation-reminders': {
+        'task': 'apps.reservations.tasks.send_reservation_reminders',
+        'schedule': 5.0,  # каждые 5 секунд
+    },
+    'allocate-waitlists': {
+        'task': 'apps.reservations.tasks.allocate_waitlists',
+        'schedule': 30.0,  # страховка для распределения по освобождению остатка
+    },
+    'flush-inventory-counters': {
+        'task': 'apps.products.tasks.flush_inventory_counters',
+        'schedule': 2.0,  # каждые 2 секунды
+    },
+    'reconcile-inventory-counters': {
+        'task': 'apps.products.tasks.reconcile_inventory_counters',
+        'schedule': 300.0,  # каждые 5 минут
+    },
+    'rebalance-stock-slots': {
+        'task': 'apps.products.tasks.rebalance_stock_slots',
+        'schedule': 30.0,  # каждые 30 секунд
+    },
+    'purge-outbox-events': {
+        'task': 'apps.notifications.tasks.purge_outbox_events',
+        'schedule': 3600.0,  # каждый час
+    },
+    'maintain-reservation-partitions': {
+        'task': 'apps.reservations.tasks.maintain_reservation_partitions',
+        'schedule': 86400.0,  # раз в сутки
+    },
+    'archive-reservations': {
+        'task': 'apps.reservations.tasks.archive_reservations',
+        'schedule': 86400.0,  # раз в сутки
+    },
+    'compact-reservation-stats': {
+        'task': 'apps.reservations.tasks.compact_reservation_stats',
+        'schedule': 86400.0,  # раз в сутки
     },
     'update-analytics': {
         'task': 'apps.analytics.tasks.update_daily_analytics',
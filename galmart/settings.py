@@ -4,6 +4,7 @@ import dj_database_url
 import environ
 import os
 from celery import Celery
+from corsheaders.defaults import default_headers
 
 
 env = environ.Env()
@@ -199,6 +200,19 @@ CELERY_RESULT_BACKEND_DB = 'django_celery_results.backends.database:DatabaseBack
 KAFKA_BOOTSTRAP_SERVERS = env('KAFKA_BOOTSTRAP_SERVERS').split(',')
 KAFKA_CONSUMER_GROUP_ID = 'galmart-consumers'
 
+# Общий producer процесса: пачки по linger/batch и ограниченный буфер
+KAFKA_PRODUCER_LINGER_MS = 20
+KAFKA_PRODUCER_BATCH_BYTES = 256 * 1024
+KAFKA_PRODUCER_BUFFER_BYTES = 32 * 1024 * 1024
+KAFKA_PRODUCER_MAX_BLOCK_MS = 100
+
+# Transactional outbox
+OUTBOX_RELAY_BATCH_SIZE = 1000
+OUTBOX_RELAY_POLL_SECONDS = 0.2
+# После стольких неудачных отправок событие уходит в dead letter (failed_at)
+OUTBOX_RELAY_MAX_ATTEMPTS = 10
+OUTBOX_RETENTION_HOURS = 24
+
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -243,6 +257,8 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -295,7 +311,52 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 # Business Logic Settings
 RESERVATION_TIMEOUT_MINUTES = 15
 RESERVATION_CHECK_INTERVAL_SECONDS = 30
+RESERVATION_EXPIRY_CHUNK_SIZE = 500
+RESERVATION_EXPIRY_POLL_SECONDS = 0.5
 MAX_RESERVATION_PER_USER = 5
+RESERVATION_COUNTERS_MIRROR_TTL = 60 * 60
+RESERVATION_REMINDER_LEAD_MINUTES = 5
+RESERVATION_REMINDER_BATCH_SIZE = 500
+# Слоты дневных корзин статистики броней
+RESERVATION_STATS_SLOTS = 16
+# Read-модель списка броней пользователя в Redis
+RESERVATION_READ_MODEL_SIZE = 200
+RESERVATION_READ_MODEL_TTL = 15 * 60
+WAITLIST_ALLOCATION_BATCH_SIZE = 100
+
+# Помесячные секции таблицы reservations
+RESERVATION_HOT_WINDOW_HOURS = 24
+RESERVATION_PARTITIONS_AHEAD = 3
+RESERVATION_PARTITION_RETENTION_MONTHS = 12
+
+# Архив завершенных броней (сжатые NDJSON-сегменты)
+RESERVATION_ARCHIVE_DIR = env('RESERVATION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'reservations'))
+RESERVATION_ARCHIVE_AFTER_DAYS = 90
+RESERVATION_ARCHIVE_CHUNK_SIZE = 5000
+
+# Idempotency-Key для создания/подтверждения/отмены броней
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = 30
+IDEMPOTENCY_WAIT_SECONDS = 5
+
+# Горячие счетчики остатков в Redis (write-behind в ProductStock)
+INVENTORY_HOT_COUNTERS_ENABLED = env.bool('INVENTORY_HOT_COUNTERS_ENABLED', default=False)
+INVENTORY_FLUSH_BATCH_SIZE = 500
+INVENTORY_RECONCILE_QUIET_SECONDS = 30
+
+# Допуск запросов на бронь (корзина токенов и очередь товара в Redis)
+RESERVATION_ADMISSION_ENABLED = env.bool('RESERVATION_ADMISSION_ENABLED', default=False)
+RESERVATION_ADMISSION_BUCKET_TTL = 30
+RESERVATION_ADMISSION_QUEUE_TIMEOUT = 20
+RESERVATION_ADMISSION_PRUNE_LIMIT = 100
+RESERVATION_ADMISSION_RETRY_AFTER_SECONDS = 2
+
+# Асинхронные брони (?async=1) с групповой фиксацией заявок по товару
+RESERVATION_GROUP_COMMIT_ENABLED = env.bool('RESERVATION_GROUP_COMMIT_ENABLED', default=False)
+RESERVATION_GROUP_COMMIT_INTERVAL_MS = 5
+RESERVATION_GROUP_COMMIT_BATCH_SIZE = 200
+RESERVATION_GROUP_COMMIT_LOCK_TIMEOUT = 30
+RESERVATION_GROUP_COMMIT_TICKET_TTL = 10 * 60
 
 # Monitoring
 PROMETHEUS_METRICS_EXPORT_PORT = 8001
\ No newline at end of file
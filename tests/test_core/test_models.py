@@ -0,0 +1,42 @@
+import pytest
+
+from apps.reservations.models import Reservation, ReservationStatus
+from tests.factories import ReservationFactory
+
+
+@pytest.mark.django_db
+class TestChangeTrackingMixin:
+    """Тесты отслеживания изменений полей модели"""
+
+    def test_previous_value_without_extra_queries(self, django_assert_num_queries):
+        """Тест: прежний статус известен без повторного чтения строки"""
+        reservation = Reservation.objects.get(pk=ReservationFactory().pk)
+        assert not reservation.has_changed('status')
+
+        reservation.status = ReservationStatus.CANCELLED
+        assert reservation.has_changed('status')
+        assert reservation.previous_value('status') == ReservationStatus.PENDING
+        assert reservation.changed_fields == {
+            'status': (ReservationStatus.PENDING, ReservationStatus.CANCELLED)
+        }
+
+        with django_assert_num_queries(1):
+            reservation.save(update_fields=['status', 'updated_at'])
+
+        assert not reservation.has_changed('status')
+        assert reservation.previous_value('status') == ReservationStatus.CANCELLED
+
+    def test_unsaved_instance_is_changed(self):
+        """Тест: у нового экземпляра все отслеживаемые поля считаются измененными"""
+        reservation = Reservation(status=ReservationStatus.PENDING)
+        assert reservation.has_changed('status')
+        assert reservation.previous_value('status') is None
+
+    def test_refresh_from_db_resets_snapshot(self):
+        """Тест: после refresh_from_db прежние значения совпадают с БД"""
+        reservation = ReservationFactory()
+        Reservation.objects.filter(pk=reservation.pk).update(status=ReservationStatus.CANCELLED)
+
+        reservation.refresh_from_db()
+        assert reservation.previous_value('status') == ReservationStatus.CANCELLED
+        assert not reservation.has_changed('status')
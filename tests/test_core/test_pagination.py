@@ -0,0 +1,69 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.core.pagination import KeysetPagination
+from apps.products.models import Product
+from tests.factories import ProductFactory
+
+
+def paginate(url):
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(
+        Product.objects.all(), Request(APIRequestFactory().get(url))
+    )
+    return paginator, [product.id for product in page]
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    """Тесты курсорной пагинации"""
+
+    def setup_method(self):
+        now = timezone.now()
+        products = ProductFactory.create_batch(7)
+        # Часть товаров с одинаковым created_at - порядок по id
+        for index, product in enumerate(products):
+            Product.objects.filter(id=product.id).update(created_at=now - timedelta(minutes=index // 2))
+        self.expected = [
+            product.id for product in Product.objects.order_by('-created_at', 'id')
+        ]
+
+    def test_walk_forward_and_back(self):
+        """Тест прохода по страницам вперед и назад по курсорам"""
+        paginator, first = paginate('/products/?cursor=&page_size=3')
+        assert first == self.expected[:3]
+        assert paginator.has_next and not paginator.has_previous
+
+        paginator, second = paginate(paginator.get_next_link())
+        assert second == self.expected[3:6]
+
+        paginator, third = paginate(paginator.get_next_link())
+        assert third == self.expected[6:]
+        assert paginator.get_next_link() is None
+
+        paginator, back = paginate(paginator.get_previous_link())
+        assert back == self.expected[3:6]
+        assert paginator.has_next and paginator.has_previous
+
+        response = paginator.get_paginated_response([])
+        assert 'count' not in response.data['pagination']
+
+    def test_invalid_cursor(self):
+        """Тест неверного курсора"""
+        with pytest.raises(NotFound):
+            paginate('/products/?cursor=not-a-cursor')
+
+    def test_ordering_rejected(self):
+        """Тест запрета ordering: порядок курсора фиксирован"""
+        with pytest.raises(ValidationError):
+            paginate('/products/?cursor=&ordering=price')
+
+    def test_is_requested(self):
+        """Тест включения пагинации параметром запроса"""
+        factory = APIRequestFactory()
+        assert KeysetPagination.is_requested(Request(factory.get('/products/?cursor=')))
+        assert not KeysetPagination.is_requested(Request(factory.get('/products/?page=2')))
@@ -0,0 +1,46 @@
+import pytest
+from unittest.mock import patch
+
+from apps.notifications.consumers import ReservationEventConsumer
+from apps.reservations.models import WaitlistEntry, WaitlistStatus
+from tests.factories import ReservationFactory
+
+
+@pytest.mark.django_db
+class TestReservationEventConsumer:
+    """Тесты обработчика событий бронирования"""
+
+    def test_waitlist_reservation_emailed_once(self):
+        """Тест брони из очереди ожидания: одно письмо на created и waitlist_allocated"""
+        reservation = ReservationFactory()
+        WaitlistEntry.objects.create(
+            user=reservation.user, product=reservation.product, quantity=reservation.quantity,
+            status=WaitlistStatus.ALLOCATED, reservation=reservation
+        )
+        consumer = ReservationEventConsumer()
+
+        with patch('apps.notifications.consumers.send_email_notification.delay') as mock_email:
+            consumer.process_event({
+                'event_type': 'reservation_created',
+                'data': {'reservation_id': str(reservation.id), 'user_id': reservation.user_id},
+            })
+            consumer.process_event({
+                'event_type': 'waitlist_allocated',
+                'data': {'reservation_id': str(reservation.id)},
+            })
+
+        mock_email.assert_called_once()
+        assert mock_email.call_args.kwargs['template_name'] == 'emails/waitlist_allocated.html'
+
+    def test_reduced_reservation_emailed(self):
+        """Тест письма об уменьшении брони после сокращения остатка"""
+        reservation = ReservationFactory()
+
+        with patch('apps.notifications.consumers.send_email_notification.delay') as mock_email:
+            ReservationEventConsumer().process_event({
+                'event_type': 'reservation_reduced',
+                'data': {'reservation_id': str(reservation.id), 'quantity': reservation.quantity},
+            })
+
+        mock_email.assert_called_once()
+        assert mock_email.call_args.kwargs['template_name'] == 'emails/reservation_reduced.html'
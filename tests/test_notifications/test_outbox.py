@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import patch, Mock
+from apps.notifications.models import OutboxEvent
+from apps.notifications import producer as event_producer
+from apps.notifications.outbox import OutboxRelay
+from apps.notifications.services import NotificationService
+from tests.factories import ReservationFactory
+
+
+def make_future(succeeded=True):
+    future = Mock()
+    future.succeeded.return_value = succeeded
+    return future
+
+
+@pytest.mark.django_db
+class TestOutbox:
+    """Тесты для transactional outbox"""
+
+    def teardown_method(self):
+        event_producer._producer = None
+
+    def test_events_written_to_outbox(self):
+        """Тест записи события в outbox вместо отправки в Kafka"""
+        reservation = ReservationFactory()
+        OutboxEvent.objects.all().delete()
+
+        NotificationService().send_reservation_confirmed(reservation)
+
+        event = OutboxEvent.objects.get()
+        assert event.topic == 'reservation_events'
+        assert event.key == str(reservation.user_id)
+        assert event.payload['event_type'] == 'reservation_confirmed'
+        assert event.payload['data']['reservation_id'] == str(reservation.id)
+        assert event.published_at is None
+
+    @patch('apps.notifications.producer.KafkaProducer')
+    def test_relay_publishes_batch(self, mock_producer_class):
+        """Тест публикации пачки событий разных ключей одним flush"""
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(topic='reservation_events', key=str(n), event_type='e', payload={'n': n})
+            for n in range(3)
+        ])
+        producer = mock_producer_class.return_value
+        producer.send.return_value = make_future()
+
+        assert OutboxRelay().relay_batch() == 3
+
+        assert producer.send.call_count == 3
+        producer.flush.assert_called_once()
+        assert not OutboxEvent.objects.filter(published_at__isnull=True).exists()
+
+    @patch('apps.notifications.producer.KafkaProducer')
+    def test_relay_keeps_order_within_key_on_failure(self, mock_producer_class):
+        """Тест: после сбоя первого события ключа второе не отправляется"""
+        first, second, other = OutboxEvent.objects.bulk_create([
+            OutboxEvent(topic='reservation_events', key='1', event_type='e', payload={'n': 1}),
+            OutboxEvent(topic='reservation_events', key='1', event_type='e', payload={'n': 2}),
+            OutboxEvent(topic='reservation_events', key='2', event_type='e', payload={'n': 3}),
+        ])
+        producer = mock_producer_class.return_value
+        producer.send.side_effect = [make_future(False), make_future(True)]
+
+        assert OutboxRelay().relay_batch() == 1
+
+        assert [call.kwargs['value'] for call in producer.send.call_args_list] == [{'n': 1}, {'n': 3}]
+        pending = OutboxEvent.objects.filter(published_at__isnull=True).order_by('id')
+        assert [(event.id, event.attempts) for event in pending] == [(first.id, 1), (second.id, 0)]
+
+        # В следующем проходе события ключа уходят по порядку
+        producer.send.side_effect = None
+        producer.send.return_value = make_future(True)
+        assert OutboxRelay().relay_batch() == 2
+        assert [call.kwargs['value'] for call in producer.send.call_args_list[2:]] == [{'n': 1}, {'n': 2}]
+
+    @patch('apps.notifications.producer.KafkaProducer')
+    def test_relay_dead_letters_event_after_max_attempts(self, mock_producer_class, settings):
+        """Тест: событие после лимита попыток уходит в dead letter и не держит ключ"""
+        settings.OUTBOX_RELAY_MAX_ATTEMPTS = 2
+        stuck, next_event = OutboxEvent.objects.bulk_create([
+            OutboxEvent(topic='reservation_events', key='1', event_type='e', payload={'n': 1}),
+            OutboxEvent(topic='reservation_events', key='1', event_type='e', payload={'n': 2}),
+        ])
+        producer = mock_producer_class.return_value
+        producer.send.return_value = make_future(False)
+
+        assert OutboxRelay().relay_batch() == 0
+        assert OutboxEvent.objects.get(id=stuck.id).failed_at is None
+        assert OutboxRelay().relay_batch() == 0
+
+        stuck.refresh_from_db()
+        assert (stuck.attempts, stuck.published_at) == (2, None)
+        assert stuck.failed_at is not None
+
+        producer.send.return_value = make_future(True)
+        assert OutboxRelay().relay_batch() == 1
+        assert producer.send.call_args.kwargs['value'] == {'n': 2}
+        assert OutboxEvent.objects.get(id=next_event.id).published_at is not None
+
+    def test_empty_batch_not_written(self):
+        """Тест: пустая пачка событий не пишется в outbox"""
+        OutboxEvent.objects.all().delete()
+
+        NotificationService()._send_events('reservation_events', 'reservations_expired', [])
+
+        assert not OutboxEvent.objects.exists()
+
+    @patch('apps.notifications.producer.KafkaProducer')
+    def test_relay_reuses_process_producer(self, mock_producer_class):
+        """Тест: producer создается один раз на процесс"""
+        mock_producer_class.return_value.send.return_value = make_future()
+        OutboxEvent.objects.create(topic='reservation_events', key='1', event_type='e', payload={})
+        OutboxRelay().relay_batch()
+        OutboxEvent.objects.create(topic='reservation_events', key='1', event_type='e', payload={})
+        OutboxRelay().relay_batch()
+
+        mock_producer_class.assert_called_once()
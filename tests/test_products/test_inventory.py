@@ -0,0 +1,72 @@
+import pytest
+from apps.products.inventory import HotInventoryService
+from apps.reservations.models import ReservationStatus
+from tests.factories import ProductFactory, ProductStockFactory, ReservationFactory
+
+
+@pytest.mark.django_db
+class TestHotInventoryService:
+    """Тесты для горячих счетчиков остатков"""
+
+    @pytest.fixture(autouse=True)
+    def enable_hot_counters(self, settings):
+        settings.INVENTORY_HOT_COUNTERS_ENABLED = True
+
+    def setup_method(self):
+        self.product = ProductFactory()
+        self.stock = ProductStockFactory(product=self.product, quantity=10, reserved_quantity=0)
+
+    def teardown_method(self):
+        service = HotInventoryService()
+        service.redis.delete(
+            service._counters_key(self.product.id),
+            service._dirty_key(),
+            service._hot_key()
+        )
+
+    def test_reserve_from_redis(self):
+        """Тест резервирования без записи в БД"""
+        service = HotInventoryService()
+
+        assert service.reserve(self.product.id, 7) == (True, 3)
+        assert service.reserve(self.product.id, 5) == (False, 3)
+        assert service.get_available(self.product.id) == 3
+
+        # БД еще не обновлена
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 0
+
+    def test_flush_writes_pending_changes(self):
+        """Тест записи накопленных изменений в ProductStock"""
+        service = HotInventoryService()
+        service.reserve(self.product.id, 4)
+        service.commit(self.product.id, 1)
+
+        assert service.flush() == 1
+
+        self.stock.refresh_from_db()
+        assert self.stock.quantity == 9
+        assert self.stock.reserved_quantity == 3
+        assert self.stock.version == 2
+
+    def test_reconcile_repairs_drift(self):
+        """Тест исправления расхождения с активными бронями"""
+        ReservationFactory(product=self.product, quantity=2, status=ReservationStatus.PENDING)
+        service = HotInventoryService()
+        service.reserve(self.product.id, 5)
+        service.redis.hset(service._counters_key(self.product.id), 'touched_at', 0)
+
+        result = service.reconcile()
+
+        assert result['repaired'] == 1
+        assert service.get_available(self.product.id) == 8
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 2
+
+    def test_disabled_falls_back_to_sql(self, settings):
+        """Тест отключенного режима"""
+        settings.INVENTORY_HOT_COUNTERS_ENABLED = False
+        service = HotInventoryService()
+
+        assert service.reserve(self.product.id, 1) is None
+        assert service.release(self.product.id, 1) is False
@@ -1,5 +1,6 @@
 import pytest
 from django.core.cache import cache
+from apps.products.models import ProductStock, ProductStockSlot
 from apps.products.services import ProductService
 from tests.factories import ProductFactory, CategoryFactory, ProductStockFactory
 
@@ -68,4 +69,35 @@ class TestProductService:
         updated_stock = self.service.update_stock(product.id, 100)
 
         assert updated_stock.quantity == 100
-        assert updated_stock.version == stock.version + 1
\ No newline at end of file
+        assert updated_stock.version == stock.version + 1
+
+    def test_sharded_stock_reserves_across_slots(self):
+        """Тест резервирования шардированного остатка по слотам"""
+        product = ProductFactory()
+        ProductStockFactory(product=product, quantity=10, reserved_quantity=2)
+
+        stock = self.service.shard_stock(product.id, 4)
+        assert stock.slot_count == 4
+        assert ProductStockSlot.objects.totals(product.id) == (10, 2)
+
+        # Резерв больше любого слота раскладывается по нескольким
+        assert ProductStock.objects.try_reserve(product.id, 5) is not None
+        assert ProductStock.objects.try_reserve(product.id, 4) is None
+        assert ProductStock.objects.try_reserve(product.id, 3) is not None
+
+        stock.refresh_from_db()
+        assert stock.available_quantity == 0
+
+        # Подтверждение списывает остаток и резерв из слотов
+        ProductStock.objects.apply_deltas({product.id: (-5, -5)})
+        assert ProductStockSlot.objects.totals(product.id) == (5, 5)
+
+        assert self.service.rebalance_stock_slots() == 1
+        stock.refresh_from_db()
+        assert (stock.quantity, stock.reserved_quantity) == (5, 5)
+
+        # Возврат в одну строку
+        stock = self.service.shard_stock(product.id, 0)
+        assert stock.slot_count == 0
+        assert not ProductStockSlot.objects.filter(product_id=product.id).exists()
+        assert (stock.quantity, stock.reserved_quantity) == (5, 5)
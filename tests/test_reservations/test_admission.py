@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import patch
+
+from apps.core.exceptions import InsufficientStockError, AdmissionQueuedError
+from apps.reservations.admission import ReservationAdmissionService, ADMITTED, QUEUED, INSUFFICIENT
+from apps.reservations.services import ReservationService
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory
+
+
+@pytest.mark.django_db
+class TestReservationAdmissionService:
+    """Тесты контроля допуска к броням горячего товара"""
+
+    @pytest.fixture(autouse=True)
+    def enable_admission(self, settings):
+        settings.RESERVATION_ADMISSION_ENABLED = True
+        self.service.enabled = True
+
+    def setup_method(self):
+        self.service = ReservationAdmissionService()
+        self.product = ProductFactory()
+        ProductStockFactory(product=self.product, quantity=2, reserved_quantity=0)
+        self.service.reset([self.product.id])
+        self.service.redis.delete(*self.service._queue_keys(self.product.id))
+
+    def test_sold_out_rejected_without_database(self, django_assert_num_queries,
+                                                 django_capture_on_commit_callbacks):
+        """Тест отказа распроданному товару без запросов к БД и открытия после отмены"""
+        first, second, late = UserFactory(), UserFactory(), UserFactory()
+        reservation = self.service.reserve(first.id, self.product.id, 1)
+        self.service.reserve(second.id, self.product.id, 1)
+
+        with django_assert_num_queries(0):
+            with pytest.raises(InsufficientStockError):
+                self.service.reserve(late.id, self.product.id, 1)
+
+        with patch('apps.reservations.tasks.allocate_waitlist.delay'):
+            with django_capture_on_commit_callbacks(execute=True):
+                ReservationService().cancel_reservation(reservation.id, first.id)
+
+        assert self.service.reserve(late.id, self.product.id, 1).user_id == late.id
+
+    def test_excess_requests_queued_in_order(self):
+        """Тест очереди: при возврате токенов первым допускается начало очереди"""
+        self.service.admit(self.product.id, 1, 2)
+
+        assert self.service.admit(self.product.id, 2, 1) == (QUEUED, 1)
+        assert self.service.admit(self.product.id, 3, 1) == (QUEUED, 2)
+
+        # Допущенный запрос не дошел до брони
+        self.service.complete(self.product.id, 2, succeeded=False)
+
+        assert self.service.admit(self.product.id, 4, 1) == (QUEUED, 3)
+        assert self.service.admit(self.product.id, 2, 1) == (ADMITTED, None)
+        assert self.service.admit(self.product.id, 3, 1) == (ADMITTED, None)
+
+    def test_queued_error_carries_position(self):
+        """Тест позиции в очереди в ошибке reserve"""
+        self.service.admit(self.product.id, 1, 2)
+
+        with pytest.raises(AdmissionQueuedError) as error:
+            self.service.reserve(UserFactory().id, self.product.id, 1)
+        assert error.value.position == 1
+
+    def test_request_above_available_rejected_without_queueing(self):
+        """Тест: запрос больше остатка отклоняется и не задерживает меньшие"""
+        self.service.admit(self.product.id, 1, 1)
+
+        assert self.service.admit(self.product.id, 2, 5) == (INSUFFICIENT, 1)
+        assert self.service.admit(self.product.id, 3, 5) == (INSUFFICIENT, 1)
+        assert self.service.admit(self.product.id, 4, 1) == (ADMITTED, None)
+
+        with pytest.raises(InsufficientStockError):
+            self.service.reserve(UserFactory().id, self.product.id, 3)
@@ -0,0 +1,56 @@
+import pytest
+from datetime import timedelta
+from django.core.paginator import Paginator
+from django.utils import timezone
+
+from apps.reservations.archive import ReservationArchiveService
+from apps.reservations.models import Reservation, ReservationStatus, ReservationArchiveEntry
+from tests.factories import UserFactory, ProductFactory, ReservationFactory
+
+
+@pytest.mark.django_db
+class TestReservationArchive:
+    """Тесты архивации завершенных бронирований"""
+
+    @pytest.fixture(autouse=True)
+    def archive_dir(self, settings, tmp_path):
+        settings.RESERVATION_ARCHIVE_DIR = str(tmp_path)
+
+    def setup_method(self):
+        self.service = ReservationArchiveService()
+        self.user = UserFactory()
+        self.other_user = UserFactory()
+        self.product = ProductFactory()
+
+    def _reservation(self, user, status, days_ago):
+        reservation = ReservationFactory(user=user, product=self.product, status=status)
+        Reservation.objects.filter(id=reservation.id).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return reservation
+
+    def test_archive_moves_old_terminal_reservations(self):
+        """Тест переноса старых завершенных броней в сегменты"""
+        archived = [
+            self._reservation(self.user, ReservationStatus.CONFIRMED, 200 + day)
+            for day in range(5)
+        ]
+        self._reservation(self.other_user, ReservationStatus.EXPIRED, 300)
+        pending = self._reservation(self.user, ReservationStatus.PENDING, 200)
+        recent = self._reservation(self.user, ReservationStatus.CANCELLED, 1)
+
+        assert self.service.archive(older_than_days=90, chunk_size=4) == 6
+
+        remaining = set(Reservation.objects.values_list('id', flat=True))
+        assert remaining == {pending.id, recent.id}
+        assert ReservationArchiveEntry.objects.filter(user=self.user).count() == 2
+
+        history = self.service.user_history(self.user.id)
+        assert len(history) == 5
+        assert [row['id'] for row in history[0:5]] == [str(r.id) for r in archived]
+        assert history[0]['product_name'] == self.product.name
+
+        page = Paginator(history, 2).page(2)
+        assert [row['id'] for row in page] == [str(r.id) for r in archived[2:4]]
+
+        assert len(self.service.user_history(self.user.id, ReservationStatus.EXPIRED)) == 0
@@ -0,0 +1,54 @@
+import time
+import pytest
+
+from apps.reservations.benchmark import FlashSaleBenchmark, percentile, _run_worker
+from apps.reservations.models import Reservation, ReservationStatus
+
+
+def test_percentile_nearest_rank():
+    """Тест перцентиля по ближайшему рангу"""
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) is None
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFlashSaleBenchmark:
+    """Тесты нагрузочного стенда распродажи"""
+
+    def setup_method(self):
+        self.benchmark = FlashSaleBenchmark(
+            users=20, hot_products=1, cold_products=0, hot_stock=5,
+            operations=12, mix={'create': 100, 'confirm': 0, 'cancel': 0}
+        )
+        self.benchmark.setup()
+
+    def teardown_method(self):
+        self.benchmark.cleanup()
+
+    def test_worker_stops_at_stock(self):
+        """Тест: воркер получает отказ, когда горячий товар распродан"""
+        result = _run_worker(self.benchmark.worker_options(), 0, time.monotonic() + 60)
+        report = self.benchmark._report([result], elapsed=1.0)
+
+        create = report['operations']['create']
+        assert create['count'] == 12
+        assert create['outcomes'] == {'ok': 5, 'sold_out': 7}
+        assert report['throughput'] == 5.0
+        assert self.benchmark.check_stock() == {'oversold': [], 'stock_drift': []}
+
+    def test_check_stock_reports_oversell(self):
+        """Тест обнаружения перепродажи по активным броням"""
+        _run_worker(self.benchmark.worker_options(), 0, time.monotonic() + 60)
+        reservation = Reservation.objects.filter(product_id__in=self.benchmark.initial_stock).first()
+        Reservation.objects.filter(id=reservation.id).update(
+            quantity=10, status=ReservationStatus.CONFIRMED
+        )
+
+        result = self.benchmark.check_stock()
+
+        assert result['oversold'] == [
+            {'product_id': reservation.product_id, 'stock': 5, 'reserved': 14}
+        ]
@@ -0,0 +1,68 @@
+import pytest
+from decimal import Decimal
+
+from apps.products.services import ProductService
+from apps.reservations.services import ReservationService
+from apps.reservations.stats import ReservationStatsService
+from apps.products.models import ProductStockSlot
+from apps.reservations.models import Reservation, ReservationStatus, UserReservationCounters
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory
+
+
+@pytest.mark.django_db
+class TestProductCascade:
+    """Тесты каскадной отмены броней при деактивации товара и сокращении остатка"""
+
+    def setup_method(self):
+        self.service = ReservationService()
+        self.product = ProductFactory(price=Decimal('10.00'))
+        self.stock = ProductStockFactory(product=self.product, quantity=10, reserved_quantity=0)
+        self.users = [UserFactory() for _ in range(3)]
+        self.reservations = [
+            self.service.create_reservation(user_id=user.id, product_id=self.product.id, quantity=3)
+            for user in self.users
+        ]
+
+    def test_stock_cut_trims_newest_reservations(self):
+        """Тест сокращения остатка: новейшая бронь отменяется, следующая уменьшается"""
+        ProductService().update_stock(self.product.id, 5)
+
+        oldest, middle, newest = [
+            Reservation.objects.get(id=reservation.id) for reservation in self.reservations
+        ]
+        assert (oldest.status, oldest.quantity) == (ReservationStatus.PENDING, 3)
+        assert (middle.status, middle.quantity) == (ReservationStatus.PENDING, 2)
+        assert middle.total_price == Decimal('20.00')
+        assert newest.status == ReservationStatus.CANCELLED
+
+        self.stock.refresh_from_db()
+        assert (self.stock.quantity, self.stock.reserved_quantity) == (5, 5)
+        assert UserReservationCounters.objects.get(user_id=self.users[2].id).pending == 0
+        assert ReservationStatsService().period(oldest.created_at.date())['total_amount'] == Decimal('80.00')
+
+    def test_sharded_stock_cut_below_reserved(self):
+        """Тест сокращения шардированного остатка ниже резерва"""
+        ProductService().shard_stock(self.product.id, 4)
+
+        ProductService().update_stock(self.product.id, 4)
+
+        oldest, middle, newest = [
+            Reservation.objects.get(id=reservation.id) for reservation in self.reservations
+        ]
+        assert (oldest.status, oldest.quantity) == (ReservationStatus.PENDING, 3)
+        assert (middle.status, middle.quantity) == (ReservationStatus.PENDING, 1)
+        assert newest.status == ReservationStatus.CANCELLED
+        assert ProductStockSlot.objects.totals(self.product.id) == (4, 4)
+
+    def test_deactivation_cancels_all_pending(self):
+        """Тест деактивации товара: все активные брони отменяются"""
+        assert ProductService().deactivate_product(self.product.id) == {'cancelled': 3, 'reduced': 0}
+
+        self.product.refresh_from_db()
+        assert not self.product.is_active
+        assert not Reservation.objects.filter(
+            product=self.product, status=ReservationStatus.PENDING
+        ).exists()
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 0
@@ -0,0 +1,62 @@
+import pytest
+
+from apps.core.exceptions import BusinessLogicError, InsufficientStockError
+from apps.reservations.group_commit import ReservationGroupCommitService, RESERVED, REJECTED
+from apps.reservations.models import Reservation, UserReservationCounters
+from apps.reservations.services import ReservationService
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory
+
+
+@pytest.mark.django_db
+class TestReservationGroupCommit:
+    """Тесты групповой фиксации асинхронных броней"""
+
+    def setup_method(self):
+        self.service = ReservationGroupCommitService()
+        self.product = ProductFactory()
+        self.stock = ProductStockFactory(product=self.product, quantity=3, reserved_quantity=0)
+        self.service.redis.delete(
+            self.service._queue_key(self.product.id), self.service._products_key()
+        )
+
+    def test_requests_applied_in_order_within_stock(self, settings):
+        """Тест одной групповой брони: порядок поступления, остаток и лимиты"""
+        settings.MAX_RESERVATION_PER_USER = 1
+        first, second, third = UserFactory(), UserFactory(), UserFactory()
+
+        results = ReservationService().create_product_reservations(self.product.id, [
+            {'user_id': first.id, 'quantity': 2},
+            {'user_id': second.id, 'quantity': 2},
+            {'user_id': third.id, 'quantity': 1},
+            {'user_id': first.id, 'quantity': 1},
+        ])
+
+        assert isinstance(results[0], Reservation) and results[0].user_id == first.id
+        assert isinstance(results[1], InsufficientStockError)
+        assert isinstance(results[2], Reservation) and results[2].user_id == third.id
+        assert isinstance(results[3], BusinessLogicError)
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 3
+        # Место в лимите отклоненной заявки возвращено
+        assert UserReservationCounters.objects.get(user_id=second.id).pending == 0
+
+    def test_submit_and_drain(self):
+        """Тест квитанций: постановка в очередь, обработка и чтение результата"""
+        user, other = UserFactory(), UserFactory()
+        reserved = self.service.submit(user.id, self.product.id, 3)
+        rejected = self.service.submit(other.id, self.product.id, 1)
+
+        assert self.service.get_ticket(reserved, user.id)['status'] == 'queued'
+        assert self.service.get_ticket(reserved, other.id) is None
+
+        assert self.service.run_once() == 2
+        assert self.service.pending_products() == []
+
+        ticket = self.service.get_ticket(reserved, user.id)
+        assert ticket['status'] == RESERVED
+        assert Reservation.objects.get(id=ticket['reservation_id']).quantity == 3
+
+        ticket = self.service.get_ticket(rejected, other.id)
+        assert ticket['status'] == REJECTED
+        assert ticket['code'] == 'insufficient_stock'
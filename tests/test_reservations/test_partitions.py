@@ -0,0 +1,60 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+
+from apps.reservations.partitions import ReservationPartitionService, month_start
+from apps.reservations.services import ReservationService
+from apps.reservations.models import Reservation, ReservationStatus
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory, ReservationFactory
+
+
+@pytest.mark.django_db
+class TestReservationPartitions:
+    """Тесты секционирования таблицы бронирований"""
+
+    def setup_method(self):
+        self.service = ReservationPartitionService()
+        self.user = UserFactory()
+        self.product = ProductFactory()
+        ProductStockFactory(product=self.product, quantity=50, reserved_quantity=0)
+
+    def _partition_of(self, reservation_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM reservations WHERE id = %s",
+                [reservation_id]
+            )
+            return cursor.fetchone()[0]
+
+    def test_month_start(self):
+        """Тест сдвига начала месяца"""
+        value = timezone.now().replace(year=2025, month=11, day=17)
+        assert month_start(value, 2).strftime('%Y-%m-%d') == '2026-01-01'
+        assert month_start(value, -11).strftime('%Y-%m-%d') == '2024-12-01'
+
+    def test_convert_and_maintain(self):
+        """Тест перевода таблицы в секции и обслуживания секций"""
+        old = ReservationFactory(user=self.user, product=self.product, status=ReservationStatus.CONFIRMED)
+        Reservation.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=800))
+
+        self.service.convert()
+        assert self.service.is_partitioned()
+        assert self._partition_of(old.id) == ReservationPartitionService.LEGACY_PARTITION
+
+        names = [name for name, _ in self.service.partitions()]
+        next_month = month_start(timezone.now(), 1)
+        assert self.service.partition_name(next_month) in names
+
+        # Существующие запросы к броням работают поверх секций
+        reservation = ReservationService().create_reservation(
+            user_id=self.user.id, product_id=self.product.id, quantity=2
+        )
+        results = ReservationService().cancel_reservations_batch([reservation.id], self.user.id)
+        assert results[0]['status'] == ReservationStatus.CANCELLED
+
+        # Повторный запуск не создает пересекающихся секций
+        assert self.service.ensure_partitions() == []
+
+        assert self.service.detach_old(retention_months=0) == []
+        assert Reservation.objects.filter(id=old.id).exists()
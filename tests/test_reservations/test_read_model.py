@@ -0,0 +1,62 @@
+import pytest
+
+from apps.reservations.read_model import ReservationReadModel
+from apps.reservations.services import ReservationService
+from apps.reservations.serializers import ReservationSerializer
+from apps.reservations.models import Reservation, ReservationStatus
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory
+
+
+@pytest.mark.django_db
+class TestReservationReadModel:
+    """Тесты read-модели списка броней в Redis"""
+
+    def setup_method(self):
+        self.read_model = ReservationReadModel()
+        self.service = ReservationService()
+        self.user = UserFactory()
+        self.product = ProductFactory()
+        ProductStockFactory(product=self.product, quantity=50, reserved_quantity=0)
+        self.read_model.invalidate(self.user.id)
+
+    def test_present_matches_serializer(self):
+        """Тест: представление из Redis совпадает с ReservationSerializer"""
+        reservation = self.service.create_reservation(
+            user_id=self.user.id, product_id=self.product.id, quantity=2
+        )
+
+        items = self.read_model.get_items(self.user.id)
+        presented = self.read_model.present(items, self.user)
+
+        expected = ReservationSerializer(
+            Reservation.objects.select_related('product', 'user').get(id=reservation.id)
+        ).data
+        assert presented[0].keys() == expected.keys()
+        for field in ('id', 'status', 'total_price', 'expires_at', 'can_confirm', 'product'):
+            assert presented[0][field] == expected[field]
+
+    def test_events_update_warm_view(self, django_capture_on_commit_callbacks):
+        """Тест обновления представления событиями создания и смены статуса"""
+        assert self.read_model.get_items(self.user.id) == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first = self.service.create_reservation(
+                user_id=self.user.id, product_id=self.product.id, quantity=1
+            )
+            second = self.service.create_reservation(
+                user_id=self.user.id, product_id=self.product.id, quantity=1
+            )
+        with django_capture_on_commit_callbacks(execute=True):
+            self.service.confirm_reservation(first.id, self.user.id)
+
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            # Представление читается без обращения к БД
+            monkeypatch.setattr(self.read_model, 'build', None)
+            items = self.read_model.get_items(self.user.id)
+
+        assert [item['id'] for item in items] == [str(second.id), str(first.id)]
+        assert items[1]['status'] == ReservationStatus.CONFIRMED
+        assert items[1]['confirmed_at'] is not None
+
+        confirmed = self.read_model.get_items(self.user.id, ReservationStatus.CONFIRMED)
+        assert [item['id'] for item in confirmed] == [str(first.id)]
@@ -0,0 +1,65 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from apps.reservations.models import ReservationStatus
+from apps.reservations.scheduler import ReservationExpiryScheduler
+from tests.factories import ProductFactory, ProductStockFactory, ReservationFactory
+
+
+@pytest.mark.django_db
+class TestReservationExpiryScheduler:
+    """Тесты для планировщика истечения броней"""
+
+    def setup_method(self):
+        self.product = ProductFactory()
+        self.stock = ProductStockFactory(product=self.product, quantity=10, reserved_quantity=5)
+
+    def teardown_method(self):
+        scheduler = ReservationExpiryScheduler()
+        scheduler.redis.delete(scheduler._key())
+
+    def test_run_once_expires_only_due_reservations(self):
+        """Тест истечения только наступивших броней"""
+        due = ReservationFactory(
+            product=self.product,
+            quantity=2,
+            status=ReservationStatus.PENDING,
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        future = ReservationFactory(
+            product=self.product,
+            quantity=3,
+            status=ReservationStatus.PENDING,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        scheduler = ReservationExpiryScheduler()
+        scheduler.schedule([due, future])
+
+        assert scheduler.run_once() == 1
+
+        due.refresh_from_db()
+        future.refresh_from_db()
+        self.stock.refresh_from_db()
+        assert due.status == ReservationStatus.EXPIRED
+        assert future.status == ReservationStatus.PENDING
+        assert self.stock.reserved_quantity == 3
+
+        # Будущая бронь остается в расписании
+        assert scheduler.redis.zscore(scheduler._key(), str(future.id)) is not None
+        assert scheduler.redis.zscore(scheduler._key(), str(due.id)) is None
+
+    def test_unschedule_skips_confirmed_reservation(self):
+        """Тест удаления обработанной брони из расписания"""
+        reservation = ReservationFactory(
+            product=self.product,
+            status=ReservationStatus.PENDING,
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        scheduler = ReservationExpiryScheduler()
+        scheduler.schedule([reservation])
+        scheduler.unschedule(reservation.id)
+
+        assert scheduler.run_once() == 0
+        assert scheduler.redis.zcard(scheduler._key()) == 0
@@ -1,13 +1,14 @@
 import pytest
 from django.utils import timezone
+from datetime import timedelta
 from django.test import TransactionTestCase
 from decimal import Decimal
 from unittest.mock import patch, Mock
 
 from apps.reservations.services import ReservationService
-from apps.reservations.models import Reservation, ReservationStatus
+from apps.reservations.models import Reservation, ReservationStatus, UserReservationCounters
 from apps.core.exceptions import BusinessLogicError, InsufficientStockError
-from tests.factories import UserFactory, ProductFactory, ProductStockFactory
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory, ReservationFactory
 
 
 @pytest.mark.django_db
@@ -47,6 +48,40 @@ class TestReservationService:
                 quantity=100  # Больше, чем доступно
             )
 
+    def test_create_reservation_takes_exact_remainder(self):
+        """Тест резервирования всего остатка условным UPDATE"""
+        self.service.create_reservation(
+            user_id=self.user.id,
+            product_id=self.product.id,
+            quantity=50
+        )
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 50
+        assert self.stock.version == 2
+
+        other_user = UserFactory()
+        with pytest.raises(InsufficientStockError, match="Доступно: 0"):
+            self.service.create_reservation(
+                user_id=other_user.id,
+                product_id=self.product.id,
+                quantity=1
+            )
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 50
+
+    def test_create_reservation_without_stock_record(self):
+        """Тест создания бронирования для товара без записи об остатках"""
+        product = ProductFactory()
+
+        with pytest.raises(BusinessLogicError, match="Информация об остатках"):
+            self.service.create_reservation(
+                user_id=self.user.id,
+                product_id=product.id,
+                quantity=1
+            )
+
     def test_create_reservation_exceeds_user_limit(self):
         """Тест превышения лимита бронирований на пользователя"""
         # Создаем максимальное количество активных бронирований
@@ -60,6 +95,77 @@ class TestReservationService:
                 quantity=1
             )
 
+    def test_user_counters_follow_status_transitions(self, django_capture_on_commit_callbacks):
+        """Тест счетчиков броней пользователя и их зеркала в Redis"""
+        with django_capture_on_commit_callbacks(execute=True):
+            first = self.service.create_reservation(
+                user_id=self.user.id, product_id=self.product.id, quantity=1
+            )
+            second = self.service.create_reservation(
+                user_id=self.user.id, product_id=self.product.id, quantity=1
+            )
+            self.service.confirm_reservation(first.id, self.user.id)
+            self.service.cancel_reservation(second.id, self.user.id)
+
+        counters = UserReservationCounters.objects.get(user_id=self.user.id)
+        assert counters.as_dict() == {'pending': 0, 'confirmed': 1, 'cancelled': 1, 'expired': 0}
+        assert self.service.counters.get(self.user.id) == counters.as_dict()
+
+    def test_user_counters_mirror_keeps_newest_version(self):
+        """Тест зеркала счетчиков: запоздавшая запись старой версии не затирает новую"""
+        self.service.counters.redis.delete(self.service.counters._key(self.user.id))
+        UserReservationCounters.objects.apply_deltas({self.user.id: {}})
+        older = UserReservationCounters.objects.apply_deltas({self.user.id: {'pending': 1}})
+        newer = UserReservationCounters.objects.apply_deltas({self.user.id: {'pending': 1}})
+
+        self.service.counters._mirror(newer)
+        self.service.counters._mirror(older)
+
+        assert self.service.counters.get(self.user.id)['pending'] == 2
+
+    def test_create_reservations_batch_success(self):
+        """Тест пакетного бронирования корзины"""
+        other_product = ProductFactory()
+        other_stock = ProductStockFactory(product=other_product, quantity=10, reserved_quantity=0)
+
+        reservations = self.service.create_reservations_batch(
+            user_id=self.user.id,
+            items=[
+                {'product_id': other_product.id, 'quantity': 2},
+                {'product_id': self.product.id, 'quantity': 3},
+                {'product_id': other_product.id, 'quantity': 1},
+            ]
+        )
+
+        assert len(reservations) == 2
+        assert {r.product_id: r.quantity for r in reservations} == {
+            self.product.id: 3,
+            other_product.id: 3,
+        }
+
+        self.stock.refresh_from_db()
+        other_stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 3
+        assert other_stock.reserved_quantity == 3
+
+    def test_create_reservations_batch_all_or_nothing(self):
+        """Тест отката всей корзины при нехватке одного товара"""
+        other_product = ProductFactory()
+        ProductStockFactory(product=other_product, quantity=1, reserved_quantity=0)
+
+        with pytest.raises(InsufficientStockError):
+            self.service.create_reservations_batch(
+                user_id=self.user.id,
+                items=[
+                    {'product_id': self.product.id, 'quantity': 3},
+                    {'product_id': other_product.id, 'quantity': 2},
+                ]
+            )
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 0
+        assert not Reservation.objects.filter(user=self.user).exists()
+
     def test_confirm_reservation_success(self):
         """Тест успешного подтверждения бронирования"""
         reservation = self.service.create_reservation(
@@ -101,21 +207,176 @@ class TestReservationService:
         self.stock.refresh_from_db()
         assert self.stock.reserved_quantity == 0
 
-    @patch('apps.reservations.services.NotificationService')
-    @patch('apps.reservations.services.AnalyticsService')
-    def test_create_reservation_with_notifications(self, mock_analytics, mock_notifications):
+    def test_confirm_expired_reservation_expires_it(self):
+        """Тест подтверждения просроченной брони: бронь истекает, резерв освобождается"""
+        reservation = self.service.create_reservation(
+            user_id=self.user.id,
+            product_id=self.product.id,
+            quantity=5,
+            customer_info={'phone': '+77001234567'}
+        )
+        Reservation.objects.filter(id=reservation.id).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        expired = self.service.confirm_reservation(reservation.id, self.user.id)
+        assert expired.status == ReservationStatus.EXPIRED
+        assert expired.customer_info == {'phone': '+77001234567'}
+
+        self.stock.refresh_from_db()
+        assert self.stock.quantity == 50
+        assert self.stock.reserved_quantity == 0
+
+        # Повторный переход не проходит проверку статуса
+        with pytest.raises(BusinessLogicError, match="уже обработанную"):
+            self.service.cancel_reservation(reservation.id, self.user.id)
+        with pytest.raises(BusinessLogicError, match="не найдено"):
+            self.service.confirm_reservation(reservation.id, self.user.id)
+
+    @patch('apps.reservations.events.NotificationService')
+    @patch('apps.reservations.events.AnalyticsService')
+    def test_create_reservation_with_notifications(self, mock_analytics, mock_notifications,
+                                                   django_capture_on_commit_callbacks):
         """Тест создания бронирования с уведомлениями"""
         mock_notification_service = Mock()
         mock_analytics_service = Mock()
         mock_notifications.return_value = mock_notification_service
         mock_analytics.return_value = mock_analytics_service
 
-        reservation = self.service.create_reservation(
-            user_id=self.user.id,
-            product_id=self.product.id,
-            quantity=5
-        )
+        with django_capture_on_commit_callbacks(execute=True):
+            reservation = self.service.create_reservation(
+                user_id=self.user.id,
+                product_id=self.product.id,
+                quantity=5
+            )
 
         # Проверяем, что сервисы были вызваны
         mock_notification_service.send_reservation_created.assert_called_once_with(reservation)
-        mock_analytics_service.track_reservation_created.assert_called_once_with(reservation)
\ No newline at end of file
+        mock_analytics_service.track_reservation_created.assert_called_once_with(reservation)
+
+    @patch('apps.reservations.events.NotificationService')
+    @patch('apps.reservations.events.AnalyticsService')
+    def test_duplicate_events_dispatched_once(self, mock_analytics, mock_notifications,
+                                              django_capture_on_commit_callbacks):
+        """Тест: событие из сервиса и из post_save рассылается один раз"""
+        from apps.core.events import dispatcher
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with dispatcher.unit_of_work():
+                reservation = self.service.create_reservation(
+                    user_id=self.user.id,
+                    product_id=self.product.id,
+                    quantity=5
+                )
+                # Повтор того же события, как из сигнала post_save
+                dispatcher.emit('reservation_created', reservation)
+
+        mock_notifications.return_value.send_reservation_created.assert_called_once_with(reservation)
+        mock_analytics.return_value.track_reservation_created.assert_called_once_with(reservation)
+
+    def test_expire_due_reservations_in_chunks(self):
+        """Тест пакетного истечения броней с освобождением резерва"""
+        reservations = [
+            self.service.create_reservation(
+                user_id=UserFactory().id,
+                product_id=self.product.id,
+                quantity=2
+            )
+            for _ in range(3)
+        ]
+        Reservation.objects.filter(id__in=[r.id for r in reservations[:2]]).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        count = self.service.expire_due_reservations(chunk_size=1)
+
+        assert count == 2
+        assert Reservation.objects.filter(status=ReservationStatus.EXPIRED).count() == 2
+        assert Reservation.objects.get(id=reservations[2].id).status == ReservationStatus.PENDING
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 2
+
+    @patch('apps.notifications.services.NotificationService.send_reservation_reminders')
+    def test_send_due_reminders_once(self, mock_send):
+        """Тест пакетной отправки напоминаний: каждой брони один раз"""
+        due = self.service.create_reservation(
+            user_id=self.user.id, product_id=self.product.id, quantity=1
+        )
+        later = self.service.create_reservation(
+            user_id=self.user.id, product_id=self.product.id, quantity=1
+        )
+        Reservation.objects.filter(id=due.id).update(expires_at=timezone.now() + timedelta(minutes=3))
+
+        assert self.service.send_due_reminders() == 1
+        assert [r.id for r in mock_send.call_args[0][0]] == [due.id]
+        assert Reservation.objects.get(id=due.id).reminder_sent_at is not None
+        assert Reservation.objects.get(id=later.id).reminder_sent_at is None
+
+        assert self.service.send_due_reminders() == 0
+
+    def test_confirm_reservations_batch(self):
+        """Тест пакетного подтверждения с результатом по каждой брони"""
+        active = self.service.create_reservation(
+            user_id=self.user.id, product_id=self.product.id, quantity=2
+        )
+        overdue = self.service.create_reservation(
+            user_id=self.user.id, product_id=self.product.id, quantity=3
+        )
+        Reservation.objects.filter(id=overdue.id).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        foreign = ReservationFactory(status=ReservationStatus.PENDING)
+
+        results = self.service.confirm_reservations_batch(
+            [active.id, overdue.id, foreign.id], self.user.id
+        )
+
+        assert [result['status'] for result in results] == [
+            ReservationStatus.CONFIRMED, ReservationStatus.EXPIRED, 'failed'
+        ]
+        self.stock.refresh_from_db()
+        assert self.stock.quantity == 48
+        assert self.stock.reserved_quantity == 0
+        assert self.service.counters.get(self.user.id)['pending'] == 0
+
+    def test_cancel_reservations_batch(self):
+        """Тест пакетной отмены броней"""
+        reservations = [
+            self.service.create_reservation(
+                user_id=self.user.id, product_id=self.product.id, quantity=2
+            )
+            for _ in range(2)
+        ]
+        ids = [reservation.id for reservation in reservations]
+
+        results = self.service.cancel_reservations_batch(ids, self.user.id)
+        assert {result['status'] for result in results} == {ReservationStatus.CANCELLED}
+
+        # Повторная отмена не меняет остатки
+        results = self.service.cancel_reservations_batch(ids, self.user.id)
+        assert {result['status'] for result in results} == {'failed'}
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 0
+
+    def test_transitions_find_reservations_outside_hot_window(self, settings):
+        """Тест: активные брони старше окна активных подтверждаются и отменяются"""
+        settings.RESERVATION_HOT_WINDOW_HOURS = 1
+        old, fresh, batch_old = [
+            self.service.create_reservation(
+                user_id=self.user.id, product_id=self.product.id, quantity=1
+            )
+            for _ in range(3)
+        ]
+        Reservation.objects.filter(id__in=[old.id, batch_old.id]).update(
+            created_at=timezone.now() - timedelta(hours=2)
+        )
+
+        assert self.service.confirm_reservation(old.id, self.user.id).status == ReservationStatus.CONFIRMED
+
+        results = self.service.cancel_reservations_batch([fresh.id, batch_old.id], self.user.id)
+        assert [result['status'] for result in results] == [ReservationStatus.CANCELLED] * 2
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 0
@@ -0,0 +1,73 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+
+from apps.reservations.services import ReservationService
+from apps.reservations.stats import ReservationStatsService
+from apps.reservations.models import Reservation, ReservationDailyStats, ReservationStatus
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory
+
+
+@pytest.mark.django_db
+class TestReservationStatsService:
+    """Тесты статистики броней по дневным корзинам"""
+
+    def setup_method(self):
+        self.service = ReservationService()
+        self.stats = ReservationStatsService()
+        self.user = UserFactory()
+        self.product = ProductFactory(price=Decimal('10.00'))
+        ProductStockFactory(product=self.product, quantity=50, reserved_quantity=0)
+
+        self.reservations = [
+            self.service.create_reservation(
+                user_id=self.user.id, product_id=self.product.id, quantity=quantity
+            )
+            for quantity in (1, 2, 3)
+        ]
+        self.service.confirm_reservation(self.reservations[0].id, self.user.id)
+        self.service.cancel_reservation(self.reservations[1].id, self.user.id)
+
+    def test_overview_follows_transitions(self):
+        """Тест сводки после создания, подтверждения и отмены"""
+        overview = self.stats.overview()
+
+        assert overview['overview'] == {'total_reservations': 3, 'active_reservations': 1}
+        assert overview['by_status'] == {
+            ReservationStatus.PENDING: 1,
+            ReservationStatus.CONFIRMED: 1,
+            ReservationStatus.CANCELLED: 1,
+        }
+        assert overview['periods']['today'] == {'count': 3, 'total_amount': Decimal('60.00')}
+        assert overview['periods']['week']['avg_amount'] == Decimal('20.00')
+
+    def test_expire_batch_moves_bucket(self):
+        """Тест переноса истекших броней в корзину expired"""
+        Reservation.objects.filter(id=self.reservations[2].id).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        assert self.service.expire_due_reservations() == 1
+
+        by_status = self.stats.by_status()
+        assert by_status[ReservationStatus.PENDING] == 0
+        assert by_status[ReservationStatus.EXPIRED] == 1
+
+    def test_rebuild_and_compact_keep_totals(self):
+        """Тест пересчета и слияния слотов без изменения итогов"""
+        expected = self.stats.overview()
+
+        # Испорченные корзины исправляются пересчетом
+        ReservationDailyStats.objects.update(count=0)
+        self.stats.rebuild()
+        assert self.stats.overview() == expected
+
+        ReservationDailyStats.objects.filter(status=ReservationStatus.CONFIRMED).update(
+            day=timezone.localdate() - timedelta(days=1), slot=5
+        )
+        self.stats.compact()
+        assert not ReservationDailyStats.objects.exclude(slot=0).filter(
+            day__lt=timezone.localdate()
+        ).exists()
+        assert self.stats.by_status()[ReservationStatus.CONFIRMED] == 1
@@ -1,6 +1,9 @@
 import pytest
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+from apps.reservations.views import ReservationViewSet
 from apps.reservations.models import ReservationStatus
 from tests.factories import UserFactory, ProductFactory, ProductStockFactory, ReservationFactory
 
@@ -87,4 +90,46 @@ class TestReservationViewSet:
         url = reverse('reservation-list')
         response = api_client.get(url)
 
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
\ No newline at end of file
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestIdempotencyKey:
+    """Тесты для заголовка Idempotency-Key"""
+
+    def setup_method(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.view = ReservationViewSet.as_view({'post': 'create'})
+        self.user = UserFactory()
+        self.product = ProductFactory()
+        self.stock = ProductStockFactory(product=self.product, quantity=50, reserved_quantity=0)
+
+    def _post(self, data, key):
+        request = self.factory.post(
+            '/api/reservations/', data, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def test_retry_returns_stored_response(self):
+        """Тест: повтор с тем же ключом не создает вторую бронь"""
+        data = {'product_id': self.product.id, 'quantity': 5}
+
+        first = self._post(data, 'retry-1')
+        second = self._post(data, 'retry-1')
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.status_code == status.HTTP_201_CREATED
+        assert second.data['id'] == first.data['id']
+        assert second['Idempotent-Replayed'] == 'true'
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 5
+
+    def test_key_reused_with_different_payload(self):
+        """Тест: ключ нельзя переиспользовать для другого запроса"""
+        self._post({'product_id': self.product.id, 'quantity': 5}, 'retry-2')
+        response = self._post({'product_id': self.product.id, 'quantity': 6}, 'retry-2')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
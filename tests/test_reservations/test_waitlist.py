@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import patch
+
+from apps.reservations.services import ReservationService
+from apps.reservations.waitlist import WaitlistService
+from apps.reservations.models import ReservationStatus, WaitlistEntry, WaitlistStatus
+from apps.core.exceptions import BusinessLogicError
+from tests.factories import UserFactory, ProductFactory, ProductStockFactory
+
+
+@pytest.mark.django_db
+class TestWaitlistService:
+    """Тесты очереди ожидания распроданных товаров"""
+
+    def setup_method(self):
+        self.service = WaitlistService()
+        self.reservation_service = ReservationService()
+        self.product = ProductFactory()
+        self.stock = ProductStockFactory(product=self.product, quantity=4, reserved_quantity=0)
+        self.owner = UserFactory()
+        self.holder = self.reservation_service.create_reservation(
+            user_id=self.owner.id, product_id=self.product.id, quantity=4
+        )
+
+    def test_join_twice_rejected(self):
+        """Тест повторной постановки в очередь того же товара"""
+        user = UserFactory()
+        self.service.join(user.id, self.product.id, 1)
+
+        with pytest.raises(BusinessLogicError):
+            self.service.join(user.id, self.product.id, 1)
+
+    def test_allocate_in_fifo_order(self, django_capture_on_commit_callbacks):
+        """Тест распределения освободившегося остатка по очереди"""
+        first, second, third = UserFactory(), UserFactory(), UserFactory()
+        with patch('apps.reservations.tasks.allocate_waitlist.delay') as mock_delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                entries = [
+                    self.service.join(first.id, self.product.id, 3),
+                    self.service.join(second.id, self.product.id, 2),
+                    self.service.join(third.id, self.product.id, 1),
+                ]
+            mock_delay.reset_mock()
+
+            with django_capture_on_commit_callbacks(execute=True):
+                self.reservation_service.cancel_reservation(self.holder.id, self.owner.id)
+        mock_delay.assert_called_once_with(self.product.id)
+        assert self.service.position(entries[2]) == 3
+
+        # Второму не хватает остатка, третий не обходит его в очереди
+        assert self.service.allocate(self.product.id) == 1
+
+        for entry in entries:
+            entry.refresh_from_db()
+        assert [entry.status for entry in entries] == [
+            WaitlistStatus.ALLOCATED, WaitlistStatus.WAITING, WaitlistStatus.WAITING
+        ]
+        assert entries[0].reservation.user_id == first.id
+        assert entries[0].reservation.status == ReservationStatus.PENDING
+        assert self.service.position(entries[2]) == 2
+
+        self.stock.refresh_from_db()
+        assert self.stock.reserved_quantity == 3
+
+    def test_leave_waitlist(self):
+        """Тест выхода из очереди"""
+        user = UserFactory()
+        entry = self.service.join(user.id, self.product.id, 1)
+
+        self.service.leave(user.id, entry.id)
+        self.reservation_service.cancel_reservation(self.holder.id, self.owner.id)
+
+        assert self.service.allocate(self.product.id) == 0
+        assert WaitlistEntry.objects.get(id=entry.id).status == WaitlistStatus.CANCELLED